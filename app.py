@@ -54,6 +54,8 @@ def create_app():
         from models.user import User
         from models.product_analysis import ProductAnalysis
         from models.points import PointsHistory, LoginStreak
+        from models.ingredient import IngredientImpact
+        from models.bulk import BulkJob, BulkResult
     
     # Register blueprints
     from auth.routes import auth_bp
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Aura - Performance benchmarks
+Results are printed as JSON so they can be saved and compared across commits.
+
+Usage:
+  python benchmark.py startup [--runs N] [--output results.json]
+  python benchmark.py ocr [--size N] [--seed S] [--variants basic,pipeline] [--output results.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: child CPU time is not available
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Each snippet runs in a fresh interpreter, like a newly forked gunicorn worker
+STARTUP_SNIPPETS = {
+    'create_app': """
+import time
+started = time.perf_counter()
+from app import create_app
+create_app()
+print('TIMING', time.perf_counter() - started)
+""",
+    'ocr_first_use': """
+import time
+from services.ocr_service import ocr_service
+started = time.perf_counter()
+ocr_service.warm_up()
+print('TIMING', time.perf_counter() - started)
+""",
+}
+
+def _time_snippet(code, env):
+    """Run ``code`` in a new interpreter and return the seconds it reports"""
+    completed = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, env=env,
+        capture_output=True, text=True, timeout=300
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith('TIMING '):
+            return float(line.split()[1])
+    raise RuntimeError(f"benchmark snippet failed: {completed.stderr.strip()[-500:]}")
+
+def _summary(samples):
+    return {
+        'runs': len(samples),
+        'median': round(statistics.median(samples), 4),
+        'min': round(min(samples), 4),
+        'max': round(max(samples), 4)
+    }
+
+def benchmark_startup(args):
+    """Worker cold start: app creation, and first OCR use with a cold vs cached Tesseract probe"""
+    env = dict(os.environ)
+    env.setdefault('GROQ_API_KEY', 'benchmark')
+    results = {'create_app': _summary([_time_snippet(STARTUP_SNIPPETS['create_app'], env) for _ in range(args.runs)])}
+
+    cold, cached = [], []
+    for _ in range(args.runs):
+        # Fresh state dir per run so the first OCR use has to probe Tesseract
+        with tempfile.TemporaryDirectory() as state_dir:
+            run_env = dict(env, AURA_STATE_DIR=state_dir)
+            cold.append(_time_snippet(STARTUP_SNIPPETS['ocr_first_use'], run_env))
+            cached.append(_time_snippet(STARTUP_SNIPPETS['ocr_first_use'], run_env))
+    results['ocr_first_use_cold_probe'] = _summary(cold)
+    results['ocr_first_use_cached_probe'] = _summary(cached)
+    return results
+
+def _cpu_time():
+    """CPU seconds used by this process plus finished children (pytesseract runs tesseract as a child)"""
+    total = time.process_time()
+    if resource:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += children.ru_utime + children.ru_stime
+    return total
+
+def _ocr_variants(service):
+    """Every pipeline variant as name -> fn(gray) returning (text, {stage: seconds})"""
+    from services.spell_correction import spell_checker
+
+    techniques = {
+        'original': lambda gray: gray,
+        'basic': service._basic_preprocessing,
+        'advanced': service._advanced_preprocessing,
+        'adaptive': service._adaptive_threshold
+    }
+
+    def single(technique, psm):
+        def run(gray):
+            started = time.perf_counter()
+            processed = techniques[technique](gray)
+            preprocessed = time.perf_counter()
+            text = service.engine.image_to_string(processed, psm=psm)
+            return text, {'preprocess': preprocessed - started, 'ocr': time.perf_counter() - preprocessed}
+        return run
+
+    def pipeline(strategy, region, merge_mode=None, spell=True):
+        def run(gray):
+            spell_enabled = service.spell_correction
+            service.spell_correction = spell and spell_enabled
+            try:
+                started = time.perf_counter()
+                if region:
+                    gray, _ = service._crop_to_text(gray)
+                cropped = time.perf_counter()
+                if strategy == 'adaptive':
+                    reading = service._adaptive_extract(gray)
+                    text = service._clean_text(reading['text'] if reading else '')
+                else:
+                    processed, psm6_reading = service._preprocess_image(gray)
+                    text = service._clean_text(service._extract_text_with_tesseract(processed, psm6_reading, merge_mode))
+                    if service.spell_correction:
+                        text = spell_checker.correct(text)['text']
+                return text, {'region': cropped - started, 'ocr': time.perf_counter() - cropped}
+            finally:
+                service.spell_correction = spell_enabled
+        return run
+
+    variants = {}
+    for technique in techniques:
+        for psm in (6, 4, 8, 13, 11):
+            variants[f'{technique}/psm{psm}'] = single(technique, psm)
+    for strategy in ('exhaustive', 'adaptive'):
+        variants[f'pipeline/{strategy}'] = pipeline(strategy, False)
+        variants[f'pipeline/{strategy}+region'] = pipeline(strategy, True)
+    # Consensus merging against the old newline concatenation of every distinct read
+    variants['pipeline/exhaustive+concat'] = pipeline('exhaustive', False, 'concat')
+    variants['pipeline/exhaustive+consensus'] = pipeline('exhaustive', False, 'consensus')
+    # Spell correction lets the adaptive strategy accept reads after fewer passes
+    variants['pipeline/adaptive+nospell'] = pipeline('adaptive', False, spell=False)
+    return variants
+
+def _estimate_tokens(text):
+    """Rough LLM prompt token count: words and punctuation marks"""
+    return len(re.findall(r'\w+|[^\w\s]', text or ''))
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def benchmark_ocr(args):
+    """Accuracy and latency of every OCR pipeline variant on a synthetic label corpus"""
+    # Isolated state (no cached results, fresh learned path order) and the bundled language data
+    os.environ['AURA_STATE_DIR'] = tempfile.mkdtemp(prefix='aura_bench_')
+    os.environ.setdefault('TESSDATA_PREFIX', os.path.join(ROOT, 'Tesseract-OCR', 'tessdata'))
+    os.environ.setdefault('GROQ_API_KEY', 'benchmark')
+
+    from services.ocr_service import ocr_service
+    from services.ocr_image import OCRImage
+    from services.ocr_pool import percentile
+    from utils.ocr_benchmark import generate_corpus, character_error_rate, word_error_rate
+
+    if not ocr_service.tesseract_available:
+        raise RuntimeError('Tesseract is not available')
+
+    corpus = generate_corpus(args.size, args.seed)
+    if args.save_corpus:
+        os.makedirs(args.save_corpus, exist_ok=True)
+        for sample in corpus:
+            stem = os.path.join(args.save_corpus, f"{sample['id']:03d}_{sample['distortion']}")
+            with open(stem + '.png', 'wb') as f:
+                f.write(sample['image'])
+            with open(stem + '.txt', 'w') as f:
+                f.write(sample['text'])
+    grays = [OCRImage(sample['image']).gray for sample in corpus]
+
+    variants = _ocr_variants(ocr_service)
+    if args.variants:
+        wanted = args.variants.split(',')
+        variants = {name: fn for name, fn in variants.items() if any(w in name for w in wanted)}
+
+    results = {}
+    for name, run in variants.items():
+        stages, cers, wers, tokens, by_distortion = {}, [], [], [], {}
+        cpu_started = _cpu_time()
+        for sample, gray in zip(corpus, grays):
+            started = time.perf_counter()
+            text, timings = run(gray)
+            timings['total'] = time.perf_counter() - started
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds)
+            cer = character_error_rate(sample['text'], text)
+            cers.append(cer)
+            wers.append(word_error_rate(sample['text'], text))
+            tokens.append(_estimate_tokens(text))
+            by_distortion.setdefault(sample['distortion'], []).append(cer)
+        cpu_seconds = _cpu_time() - cpu_started
+
+        results[name] = {
+            'cer': round(statistics.mean(cers), 4),
+            'wer': round(statistics.mean(wers), 4),
+            'cer_by_distortion': {d: round(statistics.mean(v), 4) for d, v in sorted(by_distortion.items())},
+            'latency': {
+                stage: {
+                    'p50': round(percentile(values, 50), 4),
+                    'p90': round(percentile(values, 90), 4),
+                    'p99': round(percentile(values, 99), 4),
+                    'mean': round(statistics.mean(values), 4)
+                }
+                for stage, values in stages.items()
+            },
+            'cpu_seconds_per_image': round(cpu_seconds / len(corpus), 4),
+            'tokens_per_image': round(statistics.mean(tokens), 1)
+        }
+        print(f"📊 {name}: CER {results[name]['cer']:.3f}, WER {results[name]['wer']:.3f}, "
+              f"p50 {results[name]['latency']['total']['p50']:.3f}s")
+
+    summary = {}
+    concat, consensus = results.get('pipeline/exhaustive+concat'), results.get('pipeline/exhaustive+consensus')
+    if concat and consensus:
+        summary['consensus_vs_concat'] = {
+            'token_reduction': round(1 - consensus['tokens_per_image'] / max(1.0, concat['tokens_per_image']), 4),
+            'cer_change': round(consensus['cer'] - concat['cer'], 4),
+            'wer_change': round(consensus['wer'] - concat['wer'], 4)
+        }
+
+    return {
+        'commit': _git_commit(),
+        'engine': ocr_service.engine.name,
+        'execution_mode': ocr_service.execution_mode,
+        'corpus': {'size': len(corpus), 'seed': args.seed},
+        'variants': results,
+        'summary': summary
+    }
+
+def main():
+    commands = {
+        'startup': benchmark_startup,
+        'ocr': benchmark_ocr,
+    }
+
+    parser = argparse.ArgumentParser(description='Aura performance benchmarks')
+    parser.add_argument('command', choices=sorted(commands))
+    parser.add_argument('--runs', type=int, default=5, help='Repetitions per measurement')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    parser.add_argument('--size', type=int, default=30, help='ocr: number of synthetic label images')
+    parser.add_argument('--seed', type=int, default=1234, help='ocr: corpus random seed')
+    parser.add_argument('--variants', help='ocr: comma-separated name filters, e.g. basic,pipeline')
+    parser.add_argument('--save-corpus', help='ocr: also write the images and ground truth here')
+    args = parser.parse_args()
+
+    # Service logging goes to stderr so stdout is only the JSON document
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            results = {'benchmark': args.command, 'results': commands[args.command](args)}
+    except Exception as e:
+        print(f"❌ Benchmark '{args.command}' failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
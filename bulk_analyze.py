@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Aura - Bulk catalogue analysis
+Scores every product of a CSV (with product_name and ingredients columns) or
+JSONL file and stores the results in the bulk_results table. Progress is
+printed as NDJSON; an interrupted job continues with --resume.
+
+Usage:
+  python bulk_analyze.py catalogue.csv [--workers N] [--rate R]
+  python bulk_analyze.py catalogue.csv --resume JOB_ID
+  python bulk_analyze.py --export JOB_ID [--output results.jsonl]
+"""
+import argparse
+import contextlib
+import json
+import sys
+
+def export_results(args, stdout):
+    from models.bulk import BulkResult
+    out = open(args.output, 'w') if args.output else stdout
+    try:
+        for result in BulkResult.query.filter_by(job_id=args.export).order_by(BulkResult.item_index):
+            out.write(json.dumps(result.to_dict()) + '\n')
+    finally:
+        if args.output:
+            out.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Aura bulk catalogue analysis')
+    parser.add_argument('catalogue', nargs='?', help='CSV or JSONL file of products')
+    parser.add_argument('--resume', help='Job id of an interrupted run of the same file')
+    parser.add_argument('--workers', type=int, help='Concurrent analyses (default BULK_WORKERS)')
+    parser.add_argument('--rate', type=float, help='Groq requests per second (default BULK_GROQ_RATE)')
+    parser.add_argument('--export', help='Write the stored results of this job as JSONL')
+    parser.add_argument('--output', help='--export: file to write instead of stdout')
+    args = parser.parse_args()
+    if not args.catalogue and not args.export:
+        parser.error('a catalogue file or --export JOB_ID is required')
+
+    # Service logging, also from worker threads, goes to stderr so stdout is only NDJSON
+    stdout = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        run(args, stdout)
+
+def run(args, stdout):
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.export:
+            export_results(args, stdout)
+            return
+
+        from models.bulk import BulkJob
+        from services.bulk_analysis import BulkAnalyzer, parse_items
+
+        with open(args.catalogue, 'rb') as f:
+            items = parse_items(f.read(), args.catalogue)
+        analyzer = BulkAnalyzer(workers=args.workers, rate=args.rate)
+
+        if args.resume:
+            job = BulkJob.query.get(args.resume)
+            if not job or job.total_items != len(items):
+                print(f"❌ Job {args.resume} not found or started with a different file")
+                sys.exit(1)
+            if not analyzer.claim(job):
+                print(f"❌ Job {args.resume} is still running")
+                sys.exit(1)
+        else:
+            job = analyzer.create_job(items, args.catalogue)
+
+        events = analyzer.run(job, items)
+        try:
+            for event in events:
+                stdout.write(json.dumps(event) + '\n')
+                stdout.flush()
+        finally:
+            # Ctrl-C: checkpoint finished items so --resume can continue
+            events.close()
+            if job.status != 'done':
+                print(f"⏸️ Job {job.id} interrupted; continue with --resume {job.id}")
+
+if __name__ == '__main__':
+    main()
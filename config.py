@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -50,7 +51,119 @@ class Config:
     # API Keys
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
     OCR_SPACE_API_KEY = os.environ.get('OCR_SPACE_API_KEY')  # Get from environment variable
+    OCR_SPACE_ENDPOINT = os.environ.get('OCR_SPACE_ENDPOINT', 'https://api.ocr.space/parse/image')
+    OCR_SPACE_RATE = float(os.environ.get('OCR_SPACE_RATE', 1.0))  # Requests per second across all workers
+    OCR_SPACE_BURST = int(os.environ.get('OCR_SPACE_BURST', 1))
+    OCR_SPACE_DAILY_LIMIT = int(os.environ.get('OCR_SPACE_DAILY_LIMIT', 25000))  # OCR.Space free tier limit
+    OCR_SPACE_POOL_SIZE = int(os.environ.get('OCR_SPACE_POOL_SIZE', 10))  # Keep-alive connections
+    OCR_SPACE_SHRINK = os.environ.get('OCR_SPACE_SHRINK', 'true').lower() == 'true'  # Downscale/re-encode before upload
+    OCR_SPACE_MAX_EDGE = int(os.environ.get('OCR_SPACE_MAX_EDGE', 2000))  # Longest edge sent to OCR.Space
+    OCR_SPACE_MAX_BYTES = int(os.environ.get('OCR_SPACE_MAX_BYTES', 1024 * 1024))  # OCR.Space free tier file limit
+    OCR_SPACE_JPEG_QUALITY = int(os.environ.get('OCR_SPACE_JPEG_QUALITY', 85))
+    OCR_CLIENT_MAX_EDGE = int(os.environ.get('OCR_CLIENT_MAX_EDGE', 2000))  # Browser downscales photos to this edge before upload
+    OCR_CLIENT_JPEG_QUALITY = float(os.environ.get('OCR_CLIENT_JPEG_QUALITY', 0.85))
+    OCR_BREAKER_WINDOW = int(os.environ.get('OCR_BREAKER_WINDOW', 60))  # Rolling window of OCR.Space calls (seconds)
+    OCR_BREAKER_MIN_CALLS = int(os.environ.get('OCR_BREAKER_MIN_CALLS', 5))  # Calls in the window before it can open
+    OCR_BREAKER_ERROR_RATE = float(os.environ.get('OCR_BREAKER_ERROR_RATE', 0.5))  # Failed or slow share that opens it
+    OCR_BREAKER_SLOW_CALL = float(os.environ.get('OCR_BREAKER_SLOW_CALL', 15))  # Seconds; slower calls count as failures
+    OCR_BREAKER_COOLDOWN = int(os.environ.get('OCR_BREAKER_COOLDOWN', 30))  # Seconds open before a probe is allowed
+    OCR_BREAKER_PROBE_TIMEOUT = int(os.environ.get('OCR_BREAKER_PROBE_TIMEOUT', 35))  # Give up on a probe that never reports
+
+    # OCR Execution
+    OCR_EXECUTION_MODE = os.environ.get('OCR_EXECUTION_MODE', 'parallel')  # 'parallel' or 'sequential'
+    OCR_POOL_SIZE = int(os.environ.get('OCR_POOL_SIZE', os.cpu_count() or 2))  # Global Tesseract concurrency
+    OCR_MAX_PARALLEL_PER_REQUEST = int(os.environ.get('OCR_MAX_PARALLEL_PER_REQUEST', 6))
+    OCR_TESSERACT_BACKEND = os.environ.get('OCR_TESSERACT_BACKEND', 'auto')  # 'auto', 'tesserocr' or 'pytesseract'
+    OCR_ENGINE_POOL_SIZE = int(os.environ.get('OCR_ENGINE_POOL_SIZE', OCR_POOL_SIZE))  # Warm engine handles per process
+    OCR_STRATEGY = os.environ.get('OCR_STRATEGY', 'adaptive')  # 'adaptive' (early exit) or 'exhaustive'
+    OCR_MIN_CONFIDENCE = float(os.environ.get('OCR_MIN_CONFIDENCE', 70))  # Mean word confidence to stop early
+    OCR_MIN_INGREDIENT_SCORE = float(os.environ.get('OCR_MIN_INGREDIENT_SCORE', 0.6))
+    OCR_ADAPTIVE_MAX_PASSES = int(os.environ.get('OCR_ADAPTIVE_MAX_PASSES', 6))
+    OCR_MERGE_MODE = os.environ.get('OCR_MERGE_MODE', 'consensus')  # 'consensus' (voted) or 'concat' (every distinct read)
+    OCR_SPELL_CORRECTION = os.environ.get('OCR_SPELL_CORRECTION', 'true').lower() == 'true'
+    OCR_SPELL_VOCABULARY = os.environ.get('OCR_SPELL_VOCABULARY') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'services', 'data', 'ingredient_words.txt')
+    OCR_SPELL_MAX_DISTANCE = int(os.environ.get('OCR_SPELL_MAX_DISTANCE', 2))
+    OCR_SPELL_LONG_WORD = int(os.environ.get('OCR_SPELL_LONG_WORD', 8))  # Words this long may be two edits away; shorter ones one
+    OCR_SPELL_MIN_SIMILARITY = float(os.environ.get('OCR_SPELL_MIN_SIMILARITY', 0.75))  # 1 - edits / length a correction must reach
+    OCR_SPELL_UNKNOWN_CONFIDENCE = float(os.environ.get('OCR_SPELL_UNKNOWN_CONFIDENCE', 0.5))  # Score of a plain word that is not in the vocabulary (brands, places)
+    OCR_SPELL_MIN_CONFIDENCE = float(os.environ.get('OCR_SPELL_MIN_CONFIDENCE', 0.85))  # Accept a read early when this much of it is known vocabulary
+    OCR_REGION_DETECTION = os.environ.get('OCR_REGION_DETECTION', 'true').lower() == 'true'  # Crop to the text block first
+    OCR_REGION_MAX_EDGE = int(os.environ.get('OCR_REGION_MAX_EDGE', 800))  # Longest edge of the detection copy
+    OCR_WARM_UP = os.environ.get('OCR_WARM_UP', 'false').lower() == 'true'  # Initialize Tesseract when a worker boots
+    OCR_HEDGE_ENABLED = os.environ.get('OCR_HEDGE_ENABLED', 'true').lower() == 'true'  # Race Tesseract against slow OCR.Space
+    OCR_HEDGE_DELAY = float(os.environ.get('OCR_HEDGE_DELAY', 0))  # Seconds; 0 = observed p90 of OCR.Space latency
+    OCR_HEDGE_WORKERS = int(os.environ.get('OCR_HEDGE_WORKERS', 8))
+    
+    # Shared state (SQLite files shared by all workers on the host)
+    STATE_DIR = os.environ.get('AURA_STATE_DIR') or os.path.join(tempfile.gettempdir(), 'aura_state')
+    
+    # OCR Result Cache
+    OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+    OCR_CACHE_MEMORY_ITEMS = int(os.environ.get('OCR_CACHE_MEMORY_ITEMS', 256))
+    OCR_CACHE_MAX_BYTES = int(os.environ.get('OCR_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # Disk tier budget
+    OCR_CACHE_TTL = int(os.environ.get('OCR_CACHE_TTL', 7 * 86400))  # 7 days
+    OCR_PHASH_ENABLED = os.environ.get('OCR_PHASH_ENABLED', 'true').lower() == 'true'
+    OCR_PHASH_MAX_DISTANCE = int(os.environ.get('OCR_PHASH_MAX_DISTANCE', 6))  # Hamming bits for a near-duplicate
+    OCR_PHASH_TTL = int(os.environ.get('OCR_PHASH_TTL', 7 * 86400))  # 7 days
+    OCR_PHASH_MAX_ENTRIES = int(os.environ.get('OCR_PHASH_MAX_ENTRIES', 50000))
     
+    # Background OCR Jobs
+    OCR_JOB_WORKERS = int(os.environ.get('OCR_JOB_WORKERS', 2))  # Concurrent jobs per process
+    OCR_JOB_MAX_PENDING = int(os.environ.get('OCR_JOB_MAX_PENDING', 32))  # Reject new jobs beyond this depth
+    OCR_JOB_TTL = int(os.environ.get('OCR_JOB_TTL', 3600))  # Keep finished jobs for 1 hour
+    OCR_JOB_TIMEOUT = int(os.environ.get('OCR_JOB_TIMEOUT', 300))  # Report stuck jobs as failed
+    
+    # Batch OCR (several photos of one label)
+    OCR_BATCH_MAX_IMAGES = int(os.environ.get('OCR_BATCH_MAX_IMAGES', 4))
+    OCR_BATCH_WORKERS = int(os.environ.get('OCR_BATCH_WORKERS', 4))  # Images OCR'd concurrently per process
+
+    # Analysis Result Cache (LLM analyses keyed by canonical product)
+    ANALYSIS_CACHE_ENABLED = os.environ.get('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+    ANALYSIS_CACHE_MEMORY_ITEMS = int(os.environ.get('ANALYSIS_CACHE_MEMORY_ITEMS', 512))
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', 50000))  # Disk tier budget
+    ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', 30 * 86400))  # 30 days
+
+    # Ingredient Knowledge Base (per-ingredient scores learned from LLM analyses)
+    INGREDIENT_KB_ENABLED = os.environ.get('INGREDIENT_KB_ENABLED', 'true').lower() == 'true'
+    INGREDIENT_KB_MIN_SAMPLES = int(os.environ.get('INGREDIENT_KB_MIN_SAMPLES', 3))  # Assessments before an ingredient is scored locally
+    INGREDIENT_KB_MAX_STDDEV = float(os.environ.get('INGREDIENT_KB_MAX_STDDEV', 10))  # Points; assessments must agree this closely
+    INGREDIENT_KB_MAX_AGE = int(os.environ.get('INGREDIENT_KB_MAX_AGE', 30 * 86400))  # Re-assess with the LLM after 30 days without a sample
+    INGREDIENT_KB_REFRESH = int(os.environ.get('INGREDIENT_KB_REFRESH', 60))  # Seconds between pulls of other workers' rows
+
+    # Idempotent analysis submissions (shared by all workers on the host)
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 3600))  # Replay a finished submission with the same key for 1 hour
+    IDEMPOTENCY_CONTENT_WINDOW = int(os.environ.get('IDEMPOTENCY_CONTENT_WINDOW', 30))  # Same user + same product within this many seconds is a duplicate
+    IDEMPOTENCY_WAIT = int(os.environ.get('IDEMPOTENCY_WAIT', 5))  # Seconds a duplicate waits for the in-flight original before being told to retry
+    IDEMPOTENCY_RETRY_AFTER = int(os.environ.get('IDEMPOTENCY_RETRY_AFTER', 5))  # Retry-After hint for a duplicate of a running analysis
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 120))  # Take over claims of a worker that died
+
+    # Bulk Catalogue Analysis
+    BULK_WORKERS = int(os.environ.get('BULK_WORKERS', 8))  # Concurrent analyses per bulk job
+    BULK_GROQ_RATE = float(os.environ.get('BULK_GROQ_RATE', 0.5))  # Groq requests per second for bulk jobs, across all workers (30 RPM)
+    BULK_GROQ_BURST = int(os.environ.get('BULK_GROQ_BURST', 4))
+    BULK_MAX_RETRIES = int(os.environ.get('BULK_MAX_RETRIES', 2))  # Retries per item after an unparseable answer (request errors are retried by the LLM call layer)
+    BULK_STALE_AFTER = int(os.environ.get('BULK_STALE_AFTER', 600))  # A 'running' job that has not advanced for this long may be resumed
+    BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 25))  # Results per batched insert (one checkpoint each)
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 10000))  # Largest upload the API accepts
+
+    # LLM Gateway and Call Layer (every Groq request)
+    LLM_INITIAL_CONCURRENCY = int(os.environ.get('LLM_INITIAL_CONCURRENCY', 4))  # Starting limit; adapts to the provider's rate limits
+    LLM_MIN_CONCURRENCY = int(os.environ.get('LLM_MIN_CONCURRENCY', 1))
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))  # Per worker process
+    LLM_INTERACTIVE_RESERVE = int(os.environ.get('LLM_INTERACTIVE_RESERVE', 1))  # Slots bulk jobs leave free for chat and analyses
+    LLM_ATTEMPT_TIMEOUT = float(os.environ.get('LLM_ATTEMPT_TIMEOUT', 20))  # Seconds per request attempt
+    LLM_INTERACTIVE_DEADLINE = float(os.environ.get('LLM_INTERACTIVE_DEADLINE', 30))  # Total seconds incl. waiting and retries
+    LLM_BULK_DEADLINE = float(os.environ.get('LLM_BULK_DEADLINE', 120))
+    LLM_BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', 0.5))  # Seconds; doubles per retry, with full jitter
+    LLM_BACKOFF_MAX = float(os.environ.get('LLM_BACKOFF_MAX', 8))
+    LLM_ANALYSIS_MODEL = os.environ.get('LLM_ANALYSIS_MODEL', 'llama-3.1-8b-instant')
+    LLM_CHAT_MODEL = os.environ.get('LLM_CHAT_MODEL', 'llama-3.1-8b-instant')
+    LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', 20))  # Shared Groq connection pool per worker process
+    LLM_KEEPALIVE_CONNECTIONS = int(os.environ.get('LLM_KEEPALIVE_CONNECTIONS', 10))
+    LLM_KEEPALIVE_EXPIRY = float(os.environ.get('LLM_KEEPALIVE_EXPIRY', 60))  # Seconds an idle connection stays open
+    LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 5))
+
     # Google OAuth
     GOOGLE_OAUTH_CLIENT_ID = os.environ.get('GOOGLE_OAUTH_CLIENT_ID')
     GOOGLE_OAUTH_CLIENT_SECRET = os.environ.get('GOOGLE_OAUTH_CLIENT_SECRET')
@@ -2,6 +2,8 @@ from app import create_app, db
 from models.user import User
 from models.product_analysis import ProductAnalysis
 from models.points import PointsHistory, LoginStreak
+from models.ingredient import IngredientImpact
+from models.bulk import BulkJob, BulkResult
 import sqlalchemy as sa
 from sqlalchemy import inspect, text
 
@@ -58,11 +60,24 @@ def add_missing_columns():
         else:
             print("✅ product_name column already exists")
 
+    # Agreement of ingredient assessments (knowledge base)
+    if 'ingredient_impacts' in inspector.get_table_names():
+        existing_columns = [col['name'] for col in inspector.get_columns('ingredient_impacts')]
+        if 'spread' not in existing_columns:
+            print("🔄 Adding spread column to ingredient_impacts table...")
+            try:
+                db.session.execute(text('ALTER TABLE ingredient_impacts ADD COLUMN spread FLOAT'))
+                db.session.commit()
+                print("✅ Successfully added spread column")
+            except Exception as e:
+                print(f"❌ Failed to add spread column: {e}")
+                db.session.rollback()
+
 def verify_tables():
     """Verify that all expected tables were created"""
     inspector = inspect(db.engine)
     tables = inspector.get_table_names()
-    expected_tables = ['users', 'product_analyses', 'points_history', 'login_streaks']
+    expected_tables = ['users', 'product_analyses', 'points_history', 'login_streaks', 'ingredient_impacts', 'bulk_jobs', 'bulk_results']
     
     created_tables = [table for table in expected_tables if table in tables]
     missing_tables = [table for table in expected_tables if table not in tables]
@@ -0,0 +1,15 @@
+"""
+Gunicorn hooks for Aura.
+Picked up automatically by ``gunicorn app:app`` when run from the project root.
+"""
+
+def post_worker_init(worker):
+    """Optionally initialize Tesseract before the worker takes its first request"""
+    from config import Config
+    if not Config.OCR_WARM_UP:
+        return
+    try:
+        from services.ocr_service import ocr_service
+        ocr_service.warm_up()
+    except Exception as e:
+        worker.log.warning(f"OCR warm-up failed: {e}")
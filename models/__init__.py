@@ -1,5 +1,7 @@
 from .user import User
 from .product_analysis import ProductAnalysis
 from .points import PointsHistory, LoginStreak
+from .ingredient import IngredientImpact
+from .bulk import BulkJob, BulkResult
 
-__all__ = ['User', 'ProductAnalysis', 'PointsHistory', 'LoginStreak']
\ No newline at end of file
+__all__ = ['User', 'ProductAnalysis', 'PointsHistory', 'LoginStreak', 'IngredientImpact', 'BulkJob', 'BulkResult']
\ No newline at end of file
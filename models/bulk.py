@@ -0,0 +1,60 @@
+from app import db
+from datetime import datetime
+
+class BulkJob(db.Model):
+    __tablename__ = 'bulk_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, also the resume token
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # None for jobs started from the CLI
+    source = db.Column(db.String(200))  # Uploaded file name
+    total_items = db.Column(db.Integer, nullable=False)
+    completed_items = db.Column(db.Integer, default=0)
+    failed_items = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='running')  # 'running', 'interrupted', 'done'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'source': self.source,
+            'total_items': self.total_items,
+            'completed_items': self.completed_items,
+            'failed_items': self.failed_items,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class BulkResult(db.Model):
+    __tablename__ = 'bulk_results'
+    __table_args__ = (db.UniqueConstraint('job_id', 'item_index'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('bulk_jobs.id'), nullable=False, index=True)
+    item_index = db.Column(db.Integer, nullable=False)  # Row number in the uploaded file
+    product_name = db.Column(db.String(200))
+    ingredients_text = db.Column(db.Text)
+    environmental_rating = db.Column(db.String(20))
+    points = db.Column(db.Integer)
+    analysis_result = db.Column(db.Text)
+    alternative_suggestions = db.Column(db.Text)
+    error = db.Column(db.Text)  # Set when every attempt failed
+    attempts = db.Column(db.Integer, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'item_index': self.item_index,
+            'product_name': self.product_name,
+            'environmental_rating': self.environmental_rating,
+            'points': self.points,
+            'analysis_result': self.analysis_result,
+            'alternative_suggestions': self.alternative_suggestions,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
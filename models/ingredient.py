@@ -0,0 +1,24 @@
+from app import db
+from datetime import datetime
+
+class IngredientImpact(db.Model):
+    __tablename__ = 'ingredient_impacts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), unique=True, nullable=False, index=True)  # Canonical (lowercased) ingredient name
+    points = db.Column(db.Float, nullable=False)  # Mean impact score 0-100 over all samples
+    note = db.Column(db.Text)
+    samples = db.Column(db.Integer, default=1)  # LLM assessments averaged into points
+    spread = db.Column(db.Float, default=0.0)  # Sum of squared deviations from the mean (variance * (samples - 1))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'points': self.points,
+            'note': self.note,
+            'samples': self.samples,
+            'spread': self.spread,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
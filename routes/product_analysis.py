@@ -1,65 +1,96 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, Response, stream_with_context
 from flask_login import login_required, current_user
 from flask_wtf.csrf import validate_csrf, CSRFError
-from app import db
+from app import db, csrf
+from config import Config
 from models.product_analysis import ProductAnalysis
 from models.points import PointsHistory
+from models.bulk import BulkJob
 from services.groq_client import groq_client
+from services.llm_gateway import llm_gateway
 from services.ocr_service import ocr_service
+from services.ocr_jobs import ocr_jobs
+from services.ocr_batch import ocr_batch
 from services.points_calculator import points_calculator
+from services.analysis_cache import analysis_cache, canonical_ingredients, canonical_product_name
+from services.idempotency import single_flight
+from services.bulk_analysis import bulk_analyzer, parse_items
+from services.ingredient_knowledge import ingredient_kb
+import csv
+import hashlib
 import json
+import uuid
 
 analysis_bp = Blueprint('analysis', __name__)
 
 @analysis_bp.route('/input', methods=['GET'])
 @login_required
 def input_form():
-    return render_template('product_analysis/input.html')
+    return render_template('product_analysis/input.html',
+                           ocr_client_max_edge=Config.OCR_CLIENT_MAX_EDGE,
+                           ocr_client_quality=Config.OCR_CLIENT_JPEG_QUALITY,
+                           idempotency_key=uuid.uuid4().hex)
 
-@analysis_bp.route('/process-ocr', methods=['POST'])
-@login_required
-def process_ocr():
+def _validate_csrf():
+    """Check the CSRF token of an upload; returns an error response or None"""
     try:
         # Validate CSRF token from form data or headers
         csrf_token = request.form.get('csrf_token') or request.headers.get('X-CSRFToken')
         if not csrf_token:
-            return jsonify({
+            return (jsonify({
                 'success': False,
                 'error': 'CSRF token missing',
                 'extracted_text': None
-            }), 400
+            }), 400)
             
         validate_csrf(csrf_token)
         
     except CSRFError as e:
         print(f"❌ CSRF validation failed: {e}")
-        return jsonify({
+        return (jsonify({
             'success': False,
             'error': 'CSRF token invalid',
             'extracted_text': None
-        }), 400
+        }), 400)
     except Exception as e:
         print(f"❌ CSRF validation error: {e}")
-        return jsonify({
+        return (jsonify({
             'success': False,
             'error': 'CSRF validation failed',
             'extracted_text': None
-        }), 400
+        }), 400)
+    
+    return None
+
+def _validate_ocr_upload():
+    """Check the CSRF token and uploaded image; returns (image_file, error_response)"""
+    error_response = _validate_csrf()
+    if error_response:
+        return None, error_response
     
     if 'image' not in request.files:
-        return jsonify({
+        return None, (jsonify({
             'success': False,
             'error': 'No image file provided',
             'extracted_text': None
-        }), 400
+        }), 400)
     
     image_file = request.files['image']
     if image_file.filename == '':
-        return jsonify({
+        return None, (jsonify({
             'success': False,
             'error': 'No image selected',
             'extracted_text': None
-        }), 400
+        }), 400)
+    
+    return image_file, None
+
+@analysis_bp.route('/process-ocr', methods=['POST'])
+@login_required
+def process_ocr():
+    image_file, error_response = _validate_ocr_upload()
+    if error_response:
+        return error_response
     
     # Process OCR and get result dict
     ocr_result = ocr_service.process_image(image_file)
@@ -69,7 +100,8 @@ def process_ocr():
         return jsonify({
             'success': True,
             'error': None,
-            'extracted_text': ocr_result['text']
+            'extracted_text': ocr_result['text'],
+            'region': ocr_result.get('region')  # Detected text block, for debugging
         })
     else:
         return jsonify({
@@ -78,25 +110,101 @@ def process_ocr():
             'extracted_text': None
         }), 500
 
-@analysis_bp.route('/analyze', methods=['POST'])
+@analysis_bp.route('/process-ocr-batch', methods=['POST'])
 @login_required
-def analyze_ingredients():
-    product_name = request.form.get('product_name', '').strip()
-    ingredients_text = request.form.get('ingredients', '').strip()
+def process_ocr_batch():
+    """OCR several photos of one label in parallel and merge their text"""
+    error_response = _validate_csrf()
+    if error_response:
+        return error_response
     
-    if not ingredients_text:
-        flash('Please provide ingredient list', 'error')
-        return redirect(url_for('analysis.input_form'))
+    image_files = [f for f in request.files.getlist('images') if f.filename]
+    if not image_files:
+        return jsonify({
+            'success': False,
+            'error': 'No images provided',
+            'extracted_text': None
+        }), 400
     
-    print(f"🧪 Starting analysis for user {current_user.id}")
-    print(f"📦 Product: {product_name}")
-    print(f"📝 Ingredients: {ingredients_text}")
+    if len(image_files) > ocr_batch.max_images:
+        return jsonify({
+            'success': False,
+            'error': f'Too many images. Upload at most {ocr_batch.max_images} photos at once.',
+            'extracted_text': None
+        }), 400
     
-    # Analyze with Groq API
-    analysis_result = groq_client.analyze_ingredients(product_name, ingredients_text)
+    result = ocr_batch.process([(f.filename, f.read()) for f in image_files])
+    return jsonify({
+        'success': result['success'],
+        'error': result['error'],
+        'extracted_text': result['text'],
+        'images': result['images'],
+        'total_time': result['total_time']
+    }), 200 if result['success'] else 500
+
+@analysis_bp.route('/ocr-jobs', methods=['POST'])
+@login_required
+def create_ocr_job():
+    """Queue OCR in the background and return a job id right away"""
+    image_file, error_response = _validate_ocr_upload()
+    if error_response:
+        return error_response
     
-    print(f"📊 Analysis result: {analysis_result.get('detected_product_name', 'N/A')} - {analysis_result['rating']} - {analysis_result['points']} points")
+    job_id = ocr_jobs.submit(current_user.id, image_file.read())
+    if not job_id:
+        return jsonify({
+            'success': False,
+            'error': 'OCR service is busy. Please try again in a moment.',
+            'extracted_text': None
+        }), 503
     
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('analysis.ocr_job_status', job_id=job_id)
+    }), 202
+
+@analysis_bp.route('/ocr-jobs/<job_id>', methods=['GET'])
+@login_required
+def ocr_job_status(job_id):
+    """Poll an OCR job; the extracted text is included once it is done"""
+    job = ocr_jobs.get(job_id, current_user.id)
+    if not job:
+        return jsonify({'success': False, 'error': 'OCR job not found'}), 404
+    
+    result = job['result'] or {}
+    return jsonify({
+        'success': bool(result.get('success')),
+        'status': job['status'],
+        'error': result.get('error'),
+        'extracted_text': result.get('text'),
+        'region': result.get('region'),
+        'queue_wait': job['queue_wait'],
+        'ocr_time': job.get('ocr_time')
+    })
+
+@analysis_bp.route('/ocr-stats', methods=['GET'])
+@login_required
+def ocr_stats():
+    """OCR execution metrics for monitoring"""
+    stats = ocr_service.get_stats()
+    stats['jobs'] = ocr_jobs.get_stats()
+    return jsonify(stats)
+
+@analysis_bp.route('/analysis-stats', methods=['GET'])
+@login_required
+def analysis_stats():
+    """Ingredient analysis metrics for monitoring"""
+    return jsonify({
+        'cache': analysis_cache.get_stats(),
+        'knowledge_base': ingredient_kb.get_stats(),
+        'streaming': groq_client.get_stream_stats(),
+        'idempotency': single_flight.get_stats(),
+        'llm': llm_gateway.get_stats()
+    })
+
+def _save_analysis(user_id, product_name, ingredients_text, analysis_result):
+    """Store an analysis and award its points; returns the ProductAnalysis or None on a database error"""
     # Calculate final points
     final_points = points_calculator.calculate_points(
         analysis_result['rating'], 
@@ -123,7 +231,7 @@ def analyze_ingredients():
     
     # Save analysis to database
     product_analysis = ProductAnalysis(
-        user_id=current_user.id,
+        user_id=user_id,
         product_name=product_name,
         ingredients_text=ingredients_text,
         environmental_rating=rating,
@@ -135,7 +243,7 @@ def analyze_ingredients():
     
     # Award points
     points_history = PointsHistory(
-        user_id=current_user.id,
+        user_id=user_id,
         points=final_points,
         source_type='analysis',
         source_id=product_analysis.id
@@ -144,18 +252,222 @@ def analyze_ingredients():
     
     try:
         db.session.commit()
-        print(f"✅ Analysis saved successfully for user {current_user.id}")
+        print(f"✅ Analysis saved successfully for user {user_id}")
+        return product_analysis
     except Exception as e:
         db.session.rollback()
         print(f"❌ Database error: {e}")
-        flash('Error saving analysis. Please try again.', 'error')
-        return redirect(url_for('analysis.input_form'))
-    
+        return None
+
+def _render_results(product_analysis):
+    rating = product_analysis.environmental_rating
     return render_template('product_analysis/results.html',
                          analysis=product_analysis,
                          rating_color=points_calculator.get_rating_color(rating),
                          rating_description=points_calculator.get_rating_description(rating))
 
+def _idempotency_claims(user_id, product_name, ingredients_text):
+    """Single-flight claims of a submission: its form key, and the same user + same product"""
+    fingerprint = hashlib.sha256('|'.join([
+        canonical_product_name(product_name), canonical_ingredients(ingredients_text)
+    ]).encode('utf-8')).hexdigest()
+    claims = [(f'content:{user_id}:{fingerprint}', Config.IDEMPOTENCY_CONTENT_WINDOW)]
+    form_key = request.form.get('idempotency_key', '').strip()[:64]
+    if form_key:
+        claims.append((f'form:{user_id}:{form_key}', Config.IDEMPOTENCY_TTL))
+    return claims, fingerprint
+
+def _claimed_analysis(outcome, analysis_id, user_id):
+    """The stored analysis a duplicate submission replays, if there is one"""
+    if outcome != 'done' or not analysis_id:
+        return None
+    product_analysis = ProductAnalysis.query.filter_by(id=analysis_id, user_id=user_id).first()
+    if product_analysis:
+        print(f"🔁 Duplicate submission for user {user_id}: replaying analysis {analysis_id}")
+    return product_analysis
+
+@analysis_bp.route('/analyze', methods=['POST'])
+@login_required
+def analyze_ingredients():
+    product_name = request.form.get('product_name', '').strip()
+    ingredients_text = request.form.get('ingredients', '').strip()
+    
+    if not ingredients_text:
+        flash('Please provide ingredient list', 'error')
+        return redirect(url_for('analysis.input_form'))
+    
+    # A double click or browser retry attaches to (or replays) the original submission
+    claims, fingerprint = _idempotency_claims(current_user.id, product_name, ingredients_text)
+    outcome, analysis_id = single_flight.begin(claims, fingerprint)
+    if outcome == 'busy':
+        flash('This analysis is still running. It will appear in your history shortly.', 'info')
+        response = redirect(url_for('analysis.history'))
+        response.headers['Retry-After'] = str(Config.IDEMPOTENCY_RETRY_AFTER)
+        return response
+    replayed = _claimed_analysis(outcome, analysis_id, current_user.id)
+    if replayed:
+        return _render_results(replayed)
+    
+    print(f"🧪 Starting analysis for user {current_user.id}")
+    print(f"📦 Product: {product_name}")
+    print(f"📝 Ingredients: {ingredients_text}")
+    
+    product_analysis = None
+    try:
+        # Analyze with Groq API
+        analysis_result = groq_client.analyze_ingredients(product_name, ingredients_text)
+        
+        print(f"📊 Analysis result: {analysis_result.get('detected_product_name', 'N/A')} - {analysis_result['rating']} - {analysis_result['points']} points")
+        
+        product_analysis = _save_analysis(current_user.id, product_name, ingredients_text, analysis_result)
+    finally:
+        # Only real results are replayed; after a fallback a retry runs the analysis again
+        if product_analysis is not None and 'fallback_reason' not in analysis_result:
+            single_flight.complete(claims, product_analysis.id)
+        else:
+            single_flight.abandon(claims)
+    
+    if product_analysis is None:
+        flash('Error saving analysis. Please try again.', 'error')
+        return redirect(url_for('analysis.input_form'))
+    
+    return _render_results(product_analysis)
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@analysis_bp.route('/analyze-stream', methods=['POST'])
+@login_required
+def analyze_stream():
+    """Streaming variant of /analyze as Server-Sent Events; the analysis is saved when the stream ends"""
+    product_name = request.form.get('product_name', '').strip()
+    ingredients_text = request.form.get('ingredients', '').strip()
+    
+    if not ingredients_text:
+        return jsonify({'success': False, 'error': 'Please provide ingredient list'}), 400
+    
+    user_id = current_user.id
+    claims, fingerprint = _idempotency_claims(user_id, product_name, ingredients_text)
+    outcome, analysis_id = single_flight.begin(claims, fingerprint)
+    if outcome == 'busy':
+        return jsonify({
+            'success': False,
+            'error': 'This analysis is still running. It will appear in your history shortly.',
+            'retry_after': Config.IDEMPOTENCY_RETRY_AFTER
+        }), 409, {'Retry-After': str(Config.IDEMPOTENCY_RETRY_AFTER)}
+    owned = {'open': outcome == 'owner'}
+    
+    def result_event(product_analysis):
+        return _sse('result', {
+            'detected_product_name': product_analysis.product_name,
+            'rating': product_analysis.environmental_rating,
+            'rating_description': points_calculator.get_rating_description(product_analysis.environmental_rating),
+            'points_awarded': product_analysis.points_awarded,
+            'analysis': product_analysis.analysis_result,
+            'alternatives': product_analysis.alternative_suggestions,
+            'url': url_for('analysis.view_result', analysis_id=product_analysis.id)
+        })
+    
+    def release():
+        # Runs when the response closes, also if the browser went away before or during the stream
+        if owned['open']:
+            owned['open'] = False
+            single_flight.abandon(claims)
+    
+    def generate():
+        replayed = _claimed_analysis(outcome, analysis_id, user_id)
+        if replayed:
+            yield result_event(replayed)
+            return
+        
+        print(f"🧪 Starting streamed analysis for user {user_id}")
+        for event, data in groq_client.stream_analysis(product_name, ingredients_text):
+            if event != 'result':
+                yield _sse(event, data)
+                continue
+            
+            product_analysis = _save_analysis(user_id, product_name, ingredients_text, data)
+            if product_analysis is None:
+                yield _sse('error', {'error': 'Error saving analysis. Please try again.'})
+                return
+            # Only real results are replayed; after a fallback a retry runs the analysis again
+            if 'fallback_reason' not in data:
+                single_flight.complete(claims, product_analysis.id)
+                owned['open'] = False
+            else:
+                release()
+            yield result_event(product_analysis)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(release)
+    return response
+
+@analysis_bp.route('/results/<int:analysis_id>')
+@login_required
+def view_result(analysis_id):
+    product_analysis = ProductAnalysis.query.filter_by(id=analysis_id, user_id=current_user.id).first_or_404()
+    return _render_results(product_analysis)
+
+# Bodies a page on another site can post without a CORS preflight
+FORM_MIMETYPES = ('', 'multipart/form-data', 'application/x-www-form-urlencoded', 'text/plain')
+
+@analysis_bp.route('/bulk', methods=['POST'])
+@csrf.exempt
+@login_required
+def bulk_analyze():
+    """Score a CSV/JSONL catalogue (product_name, ingredients), streaming NDJSON progress.
+
+    Scripts post the file as the raw body with its own content type (e.g.
+    ``text/csv`` or ``application/x-ndjson``) and the session cookie; no
+    CSRF token is needed for those, since browsers cannot send them cross-site.
+    Form uploads still need the ``csrf_token`` field or ``X-CSRFToken`` header.
+    Pass ``job_id`` with the same file to resume an interrupted job.
+    """
+    if request.mimetype in FORM_MIMETYPES:
+        error_response = _validate_csrf()
+        if error_response:
+            return error_response
+    
+    upload = request.files.get('file')
+    data = upload.read() if upload else request.get_data()
+    filename = upload.filename if upload else ''
+    try:
+        items = parse_items(data, filename)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'success': False, 'error': f'Could not read catalogue: {e}'}), 400
+    if not items:
+        return jsonify({'success': False, 'error': 'No products found'}), 400
+    if len(items) > Config.BULK_MAX_ITEMS:
+        return jsonify({'success': False, 'error': f'At most {Config.BULK_MAX_ITEMS} products per job'}), 400
+    
+    job_id = request.values.get('job_id')
+    if job_id:
+        job = BulkJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        if job.total_items != len(items):
+            return jsonify({'success': False, 'error': 'Resume with the same file the job was started with'}), 400
+        if not bulk_analyzer.claim(job):
+            return jsonify({'success': False, 'error': 'This job is still running'}), 409
+    else:
+        job = bulk_analyzer.create_job(items, filename, current_user.id)
+    
+    print(f"📦 Bulk job {job.id} for user {current_user.id}: {len(items)} products")
+    
+    def generate():
+        for event in bulk_analyzer.run(job, items):
+            yield json.dumps(event) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@analysis_bp.route('/bulk/<job_id>', methods=['GET'])
+@login_required
+def bulk_status(job_id):
+    job = BulkJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return jsonify(job.to_dict())
+
 @analysis_bp.route('/history')
 @login_required
 def history():
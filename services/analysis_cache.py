@@ -0,0 +1,209 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from config import Config
+from services.state_store import StateDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_results_accessed ON analysis_results (accessed_at);
+CREATE TABLE IF NOT EXISTS product_aliases (
+    alias TEXT PRIMARY KEY,
+    canonical TEXT NOT NULL
+);
+"""
+
+_HEADER = re.compile(r'^\s*(ingredients?|contains|composition|inci)\s*[:\-]\s*')
+_SEPARATORS = re.compile(r'[;\n\r\t•·|]+')
+_ITEM_NOISE = re.compile(r'^[\s.*†‡:\-]+|[\s.*†‡:\-]+$')
+_NAME_SIZE = re.compile(r'\b\d+(?:[.,]\d+)?\s*(?:ml|l|g|kg|mg|oz|fl\s*oz|lb|lbs|ct|pack|pk|x)\b')
+_NAME_PUNCTUATION = re.compile(r'[^\w\s]')
+
+def canonical_ingredient(item):
+    """One ingredient lowercased, with collapsed whitespace and without label marks ('Parfum*')"""
+    item = unicodedata.normalize('NFKC', item or '').lower()
+    item = _ITEM_NOISE.sub('', ' '.join(item.split()))
+    return re.sub(r'\s*([()\[\]/-])\s*', r'\1', item)
+
+def ingredient_items(text):
+    """Canonical ingredients of a label in label order, without duplicates"""
+    text = _HEADER.sub('', unicodedata.normalize('NFKC', text or '').lower())
+    items = []
+    for item in _SEPARATORS.sub(',', text).split(','):
+        item = canonical_ingredient(item)
+        if item and item not in items:
+            items.append(item)
+    return items
+
+def canonical_ingredients(text):
+    """Order-insensitive form of an ingredient list: lowercased, deduplicated, sorted items"""
+    return ','.join(sorted(ingredient_items(text)))
+
+def canonical_product_name(name):
+    """Product name without case, punctuation, pack sizes or '&' vs 'and' differences"""
+    name = unicodedata.normalize('NFKC', name or '').lower().replace('&', ' and ')
+    name = _NAME_SIZE.sub(' ', name)
+    return ' '.join(_NAME_PUNCTUATION.sub(' ', name).split())
+
+class AnalysisResultCache:
+    """Cache of LLM ingredient analyses keyed by the canonical product.
+
+    Submissions that only differ in case, separators, item order, duplicates
+    or the spelling of the product name share one entry. The key also holds
+    the model and prompt version, so changing either starts a fresh cache.
+    A bounded in-memory LRU sits in front of a SQLite file in the shared
+    state directory; entries expire after ``ttl`` seconds and the disk tier
+    keeps at most ``max_entries`` rows, dropping the least recently used.
+    """
+
+    def __init__(self, memory_items=None, max_entries=None, ttl=None, filename='analysis_cache.db'):
+        self.memory_items = memory_items or Config.ANALYSIS_CACHE_MEMORY_ITEMS
+        self.max_entries = max_entries or Config.ANALYSIS_CACHE_MAX_ENTRIES
+        self.ttl = ttl or Config.ANALYSIS_CACHE_TTL
+        self.db = StateDB(filename, SCHEMA)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0,
+                          'evictions': 0, 'tokens_saved': 0}
+
+    def _resolve_name(self, name):
+        """Follow a learned alias ('dove' -> 'dove beauty bar soap')"""
+        if not name:
+            return name
+        try:
+            row = self.db.execute('SELECT canonical FROM product_aliases WHERE alias = ?', (name,)).fetchone()
+            return row[0] if row else name
+        except Exception:
+            return name
+
+    def make_key(self, product_name, ingredients_text, model, prompt_version):
+        """Key of a submission; ``product_name`` may already be canonical"""
+        canonical = {
+            'product': self._resolve_name(canonical_product_name(product_name)),
+            'ingredients': canonical_ingredients(ingredients_text),
+            'model': model,
+            'prompt_version': prompt_version
+        }
+        return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, product_name, ingredients_text, model, prompt_version):
+        """Cached analysis of this product, or None"""
+        key = self.make_key(product_name, ingredients_text, model, prompt_version)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                self._counters['tokens_saved'] += entry[2]
+                return dict(entry[1])
+            if entry:
+                del self._memory[key]
+
+        try:
+            row = self.db.execute(
+                'SELECT result, tokens, created_at FROM analysis_results WHERE key = ?', (key,)
+            ).fetchone()
+            if row and row[2] + self.ttl > now:
+                self.db.execute('UPDATE analysis_results SET accessed_at = ?, hits = hits + 1 WHERE key = ?',
+                                (now, key))
+                result = json.loads(row[0])
+                self._remember(key, result, row[1], row[2] + self.ttl)
+                with self._lock:
+                    self._counters['disk_hits'] += 1
+                    self._counters['tokens_saved'] += row[1]
+                return dict(result)
+        except Exception as e:
+            print(f"⚠️ Analysis cache read failed: {e}")
+
+        self._count('misses')
+        return None
+
+    def _remember(self, key, result, tokens, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, result, tokens)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def set(self, product_name, ingredients_text, model, prompt_version, result, tokens=0):
+        """Store an analysis and the tokens it cost.
+
+        When the model expanded a shorter submitted name ('dove' ->
+        'dove beauty bar soap') the short name becomes an alias, and the
+        entry is stored under both names.
+        """
+        now = time.time()
+        payload = json.dumps(result)
+        submitted = self._resolve_name(canonical_product_name(product_name))
+        detected = canonical_product_name(result.get('detected_product_name'))
+        keys = [self.make_key(submitted, ingredients_text, model, prompt_version)]
+        learn_alias = submitted and detected != submitted and detected.startswith(submitted)
+        if learn_alias:
+            keys.append(self.make_key(detected, ingredients_text, model, prompt_version))
+        for key in keys:
+            self._remember(key, dict(result), tokens, now + self.ttl)
+
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO analysis_results (key, result, tokens, hits, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, 0, ?, ?)',
+                    [(key, payload, tokens, now, now) for key in keys]
+                )
+                if learn_alias:
+                    conn.execute('INSERT OR IGNORE INTO product_aliases (alias, canonical) VALUES (?, ?)',
+                                 (submitted, detected))
+                self._evict(conn, now)
+            self._count('stores')
+        except Exception as e:
+            print(f"⚠️ Analysis cache write failed: {e}")
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then least recently used rows beyond the entry budget"""
+        evicted = conn.execute('DELETE FROM analysis_results WHERE created_at <= ?', (now - self.ttl,)).rowcount
+        excess = conn.execute('SELECT COUNT(*) FROM analysis_results').fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted += conn.execute(
+                'DELETE FROM analysis_results WHERE key IN '
+                '(SELECT key FROM analysis_results ORDER BY accessed_at LIMIT ?)', (excess,)
+            ).rowcount
+        if evicted:
+            self._count('evictions', evicted)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        try:
+            count, hits, saved = self.db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * tokens), 0) FROM analysis_results'
+            ).fetchone()
+            stats['disk_entries'] = count
+            # Every worker on the host, but only hits that reached the disk tier
+            stats['disk_hits_all_workers'] = hits
+            stats['disk_tokens_saved_all_workers'] = saved
+        except Exception:
+            pass
+        return stats
+
+# Global instance
+analysis_cache = AnalysisResultCache()
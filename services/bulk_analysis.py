@@ -0,0 +1,193 @@
+import csv
+import io
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from flask import current_app
+from app import db
+from config import Config
+from models.bulk import BulkJob, BulkResult
+from services.groq_client import groq_client
+from services.rate_limiter import SharedTokenBucket
+
+NAME_COLUMNS = ('product_name', 'name', 'product')
+INGREDIENT_COLUMNS = ('ingredients', 'ingredients_text', 'ingredient_list')
+# Malformed model answers; transport errors and rate limits are already retried by the LLM call layer
+RETRYABLE_REASONS = ('Failed to parse API response', 'Invalid response format from API')
+
+def parse_items(data, filename=''):
+    """[{'product_name', 'ingredients'}] from CSV (with a header row) or JSONL"""
+    text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+    if filename.lower().endswith(('.jsonl', '.ndjson')) or text.lstrip().startswith('{'):
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+
+    items = []
+    for row in rows:
+        row = {str(key).strip().lower(): value for key, value in row.items() if key}
+        name = next((row[column] for column in NAME_COLUMNS if row.get(column)), '')
+        ingredients = next((row[column] for column in INGREDIENT_COLUMNS if row.get(column)), '')
+        items.append({'product_name': str(name).strip(), 'ingredients': str(ingredients).strip()})
+    return items
+
+class BulkAnalyzer:
+    """Scores a product catalogue through GroqClient.analyze_ingredients.
+
+    Items run on a bounded thread pool; model requests wait for a token from
+    a host-wide bucket sized to the provider's rate limit, so throughput is
+    set by that limit rather than by round-trips. Items whose answer could
+    not be parsed are retried with jittered exponential backoff; failed
+    requests are not, the call layer has retried them already. Results are inserted in batches, and
+    each batch commit is a checkpoint: resuming a job skips the items that
+    already have a row.
+    """
+
+    def __init__(self, workers=None, rate=None, burst=None, max_retries=None, batch_size=None):
+        self.workers = workers or Config.BULK_WORKERS
+        self.max_retries = Config.BULK_MAX_RETRIES if max_retries is None else max_retries
+        self.batch_size = batch_size or Config.BULK_BATCH_SIZE
+        self.limiter = SharedTokenBucket('groq.bulk', rate or Config.BULK_GROQ_RATE,
+                                         burst or Config.BULK_GROQ_BURST)
+
+    def create_job(self, items, source=None, user_id=None):
+        job = BulkJob(id=uuid.uuid4().hex, user_id=user_id, source=(source or '')[:200] or None,
+                      total_items=len(items), completed_items=0, failed_items=0, status='running')
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def claim(self, job):
+        """Mark a job running again for a resume; False while another run is still working on it.
+
+        A run that died without checkpointing leaves the job 'running'; it is
+        taken over once it has not advanced for ``BULK_STALE_AFTER`` seconds.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=Config.BULK_STALE_AFTER)
+        claimed = BulkJob.query.filter(
+            BulkJob.id == job.id,
+            db.or_(BulkJob.status != 'running', BulkJob.updated_at.is_(None), BulkJob.updated_at < stale)
+        ).update({'status': 'running', 'updated_at': now}, synchronize_session=False)
+        db.session.commit()
+        return bool(claimed)
+
+    def _wait_for_slot(self):
+        while not self.limiter.try_acquire():
+            time.sleep(random.uniform(0.5, 1.0) / self.limiter.rate)
+
+    def _analyze(self, app, item):
+        """Worker thread: returns (result, error, attempts) for one item"""
+        if not item['ingredients']:
+            return None, 'No ingredients provided', 0
+        with app.app_context():
+            for attempt in range(1, self.max_retries + 2):
+                result = groq_client.analyze_ingredients(item['product_name'], item['ingredients'],
+                                                         before_model_call=self._wait_for_slot,
+                                                         priority='bulk')
+                if 'fallback_reason' not in result:
+                    return result, None, attempt
+                if result['fallback_reason'] not in RETRYABLE_REASONS:
+                    break
+                if attempt <= self.max_retries:
+                    time.sleep(min(30.0, 2.0 ** attempt) * random.uniform(0.5, 1.0))
+            return None, result['fallback_reason'], attempt
+
+    def _flush(self, job, rows):
+        """Insert a batch of results and advance the job's counters in one commit"""
+        if not rows:
+            return
+        db.session.bulk_insert_mappings(BulkResult, rows)
+        failed = sum(1 for row in rows if row['error'])
+        job.completed_items = (job.completed_items or 0) + len(rows) - failed
+        job.failed_items = (job.failed_items or 0) + failed
+        db.session.commit()
+
+    def run(self, job, items):
+        """Process the job's outstanding items, yielding NDJSON-ready progress events"""
+        app = current_app._get_current_object()
+        # A streamed response runs after the view's session was removed
+        job = db.session.merge(job)
+        done = {index for (index,) in db.session.query(BulkResult.item_index).filter_by(job_id=job.id)}
+        pending = [(index, item) for index, item in enumerate(items) if index not in done]
+        started = time.perf_counter()
+        processed = 0
+        job.status = 'running'
+        db.session.commit()
+        yield {'type': 'start', 'job_id': job.id, 'total': len(items), 'remaining': len(pending), 'resumed': len(done)}
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk')
+        queue = iter(pending)
+        in_flight = {}
+        batch = []
+        try:
+            while True:
+                # Keep the pool busy without queueing the whole catalogue
+                while len(in_flight) < self.workers * 2:
+                    entry = next(queue, None)
+                    if entry is None:
+                        break
+                    in_flight[executor.submit(self._analyze, app, entry[1])] = entry
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index, item = in_flight.pop(future)
+                    try:
+                        result, error, attempts = future.result()
+                    except Exception as e:
+                        result, error, attempts = None, str(e), 1
+                    result = result or {}
+                    batch.append({
+                        'job_id': job.id,
+                        'item_index': index,
+                        'product_name': (item['product_name'] or result.get('detected_product_name') or '')[:200],
+                        'ingredients_text': item['ingredients'],
+                        'environmental_rating': result.get('rating'),
+                        'points': result.get('points'),
+                        'analysis_result': result.get('analysis'),
+                        'alternative_suggestions': result.get('alternatives'),
+                        'error': error,
+                        'attempts': attempts
+                    })
+                    processed += 1
+                    yield {'type': 'item', 'index': index, 'product_name': batch[-1]['product_name'],
+                           'rating': result.get('rating'), 'points': result.get('points'),
+                           'error': error, 'attempts': attempts}
+
+                if len(batch) >= self.batch_size:
+                    self._flush(job, batch)
+                    batch = []
+                    elapsed = time.perf_counter() - started
+                    yield {'type': 'progress', 'job_id': job.id, 'completed': job.completed_items,
+                           'failed': job.failed_items, 'total': job.total_items,
+                           'items_per_minute': round(processed * 60.0 / elapsed, 1) if elapsed else 0.0}
+
+            self._flush(job, batch)
+            batch = []
+            job.status = 'done'
+            db.session.commit()
+            elapsed = time.perf_counter() - started
+            print(f"📦 Bulk job {job.id} done: {job.completed_items} scored, {job.failed_items} failed")
+            yield {'type': 'done', 'job_id': job.id, 'completed': job.completed_items, 'failed': job.failed_items,
+                   'total': job.total_items, 'seconds': round(elapsed, 1),
+                   'items_per_minute': round(processed * 60.0 / elapsed, 1) if elapsed else 0.0}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if job.status != 'done':
+                # Client went away or a batch failed: keep what finished so the job can resume
+                try:
+                    db.session.rollback()
+                    self._flush(job, batch)
+                    job.status = 'interrupted'
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"⚠️ Could not checkpoint bulk job {job.id}: {e}")
+
+# Global instance
+bulk_analyzer = BulkAnalyzer()
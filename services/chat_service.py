@@ -1,29 +1,13 @@
-import groq
-from config import Config
+from services.llm_gateway import llm_gateway
 
 class ChatService:
     def __init__(self):
-        self.client = groq.Groq(api_key=Config.GROQ_API_KEY)
         self.conversation_history = {}
     
     def get_response(self, user_id, message):
         # Initialize or get conversation history for user
         if user_id not in self.conversation_history:
-            self.conversation_history[user_id] = [
-                {
-                    "role": "system",
-                    "content": """You are Aura, an environmental assistant focused on carbon footprint and sustainability. 
-                    Help users understand:
-                    - Carbon footprint calculation
-                    - Sustainable product choices
-                    - Environmental impact of ingredients
-                    - Eco-friendly alternatives
-                    - Climate change and sustainability topics
-                    
-                    Keep responses informative, practical, and encouraging. 
-                    Suggest specific actions users can take to reduce their environmental impact."""
-                }
-            ]
+            self.conversation_history[user_id] = [llm_gateway.system_message('chat')]
         
         # Add user message to history
         self.conversation_history[user_id].append({
@@ -33,12 +17,7 @@ class ChatService:
         
         try:
             # Get AI response
-            response = self.client.chat.completions.create(
-                messages=self.conversation_history[user_id],
-                model="llama-3.1-8b-instant",
-                temperature=0.7,
-                max_tokens=500
-            )
+            response = llm_gateway.complete('chat', self.conversation_history[user_id])
             
             ai_response = response.choices[0].message.content
             
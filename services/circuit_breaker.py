@@ -0,0 +1,146 @@
+import time
+from config import Config
+from services.state_store import StateDB
+from services.ocr_pool import percentile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS breaker_state (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    opened_at REAL,
+    probe_started_at REAL
+);
+CREATE TABLE IF NOT EXISTS breaker_calls (
+    name TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    latency REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_breaker_calls ON breaker_calls (name, finished_at);
+CREATE TABLE IF NOT EXISTS breaker_transitions (
+    name TEXT NOT NULL,
+    transition TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, transition)
+);
+"""
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+class CircuitBreaker:
+    """Circuit breaker for a remote backend, shared by every worker on the host.
+
+    Calls are recorded in a rolling window. When enough of them fail, or are
+    slower than ``slow_call``, the breaker opens and callers skip the backend.
+    After ``cooldown`` seconds one caller is let through as a probe
+    (half-open): its success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, name, window=None, min_calls=None, error_rate=None, slow_call=None,
+                 cooldown=None, probe_timeout=None, db=None):
+        self.name = name
+        self.window = window or Config.OCR_BREAKER_WINDOW
+        self.min_calls = min_calls or Config.OCR_BREAKER_MIN_CALLS
+        self.error_rate = error_rate or Config.OCR_BREAKER_ERROR_RATE
+        self.slow_call = slow_call or Config.OCR_BREAKER_SLOW_CALL
+        self.cooldown = cooldown or Config.OCR_BREAKER_COOLDOWN
+        self.probe_timeout = probe_timeout or Config.OCR_BREAKER_PROBE_TIMEOUT
+        self.db = db or StateDB('circuit_breakers.db', SCHEMA)
+
+    def _load(self, conn):
+        row = conn.execute(
+            'SELECT state, opened_at, probe_started_at FROM breaker_state WHERE name = ?', (self.name,)
+        ).fetchone()
+        return row or (CLOSED, None, None)
+
+    def _transition(self, conn, state, to_state, opened_at=None, probe_started_at=None):
+        conn.execute(
+            'INSERT OR REPLACE INTO breaker_state (name, state, opened_at, probe_started_at) VALUES (?, ?, ?, ?)',
+            (self.name, to_state, opened_at, probe_started_at)
+        )
+        if state != to_state:
+            conn.execute(
+                'INSERT INTO breaker_transitions (name, transition, count) VALUES (?, ?, 1) '
+                'ON CONFLICT (name, transition) DO UPDATE SET count = count + 1',
+                (self.name, f'{state}->{to_state}')
+            )
+            print(f"🔌 Circuit breaker '{self.name}': {state} -> {to_state}")
+
+    def allow_request(self):
+        """True if the backend may be called now (closed, or this caller is the half-open probe)"""
+        now = time.time()
+        try:
+            with self.db.transaction() as conn:
+                state, opened_at, probe_started_at = self._load(conn)
+                if state == CLOSED:
+                    return True
+                if state == OPEN and now - (opened_at or 0) < self.cooldown:
+                    return False
+                if state == HALF_OPEN and probe_started_at and now - probe_started_at < self.probe_timeout:
+                    return False  # Another worker's probe is still in flight
+                self._transition(conn, state, HALF_OPEN, opened_at, now)
+                return True
+        except Exception as e:
+            print(f"⚠️ Circuit breaker '{self.name}' unavailable: {e}")
+            return True
+
+    def release_probe(self):
+        """Hand back a half-open probe that was granted but never made a call"""
+        try:
+            with self.db.transaction() as conn:
+                state, opened_at, _ = self._load(conn)
+                if state == HALF_OPEN:
+                    self._transition(conn, state, HALF_OPEN, opened_at, None)
+        except Exception as e:
+            print(f"⚠️ Circuit breaker '{self.name}' could not release a probe: {e}")
+
+    def record(self, ok, latency):
+        """Record a finished call and move the breaker if the window says so"""
+        now = time.time()
+        ok = bool(ok) and latency < self.slow_call
+        try:
+            with self.db.transaction() as conn:
+                conn.execute('INSERT INTO breaker_calls (name, finished_at, ok, latency) VALUES (?, ?, ?, ?)',
+                             (self.name, now, int(ok), latency))
+                conn.execute('DELETE FROM breaker_calls WHERE name = ? AND finished_at < ?',
+                             (self.name, now - self.window))
+                state, opened_at, _ = self._load(conn)
+
+                if state == HALF_OPEN:
+                    if ok:
+                        # Start the new closed period with a clean window
+                        conn.execute('DELETE FROM breaker_calls WHERE name = ?', (self.name,))
+                        self._transition(conn, state, CLOSED)
+                    else:
+                        self._transition(conn, state, OPEN, now)
+                elif state == CLOSED:
+                    calls, failures = conn.execute(
+                        'SELECT COUNT(*), COALESCE(SUM(1 - ok), 0) FROM breaker_calls WHERE name = ?', (self.name,)
+                    ).fetchone()
+                    if calls >= self.min_calls and failures / float(calls) >= self.error_rate:
+                        self._transition(conn, state, OPEN, now)
+        except Exception as e:
+            print(f"⚠️ Circuit breaker '{self.name}' could not record a call: {e}")
+
+    def get_stats(self):
+        try:
+            state, opened_at, _ = self._load(self.db.conn)
+            rows = self.db.execute(
+                'SELECT ok, latency FROM breaker_calls WHERE name = ? AND finished_at >= ?',
+                (self.name, time.time() - self.window)
+            ).fetchall()
+            transitions = dict(self.db.execute(
+                'SELECT transition, count FROM breaker_transitions WHERE name = ?', (self.name,)
+            ).fetchall())
+        except Exception as e:
+            return {'state': 'unknown', 'error': str(e)}
+
+        latencies = [latency for _, latency in rows]
+        return {
+            'state': state,
+            'opened_at': opened_at if state != CLOSED else None,
+            'window_calls': len(rows),
+            'window_error_rate': round(sum(1 - ok for ok, _ in rows) / float(len(rows)), 3) if rows else 0.0,
+            'window_p90_latency': round(percentile(latencies, 90), 3),
+            'transitions': transitions
+        }
@@ -1,21 +1,31 @@
-import groq
 import json
 import re
+import threading
+import time
+from collections import deque
 from config import Config
+from services.analysis_cache import analysis_cache
+from services.ingredient_knowledge import ingredient_kb
+from services.points_calculator import points_calculator
+from services.json_stream import JSONFieldStream
+from services.llm_gateway import llm_gateway
+from services.ocr_pool import percentile
 
 class GroqClient:
+    ANALYSIS_PROMPT_VERSION = 2  # Bump when the analysis prompt changes so cached results are not reused
+
     def __init__(self):
-        try:
-            self.client = groq.Groq(api_key=Config.GROQ_API_KEY)
-            print("✅ Groq client initialized successfully")
-        except Exception as e:
-            print(f"❌ Failed to initialize Groq client: {e}")
-            self.client = None
+        self._stream_lock = threading.Lock()
+        self._stream_latencies = {'first_field': deque(maxlen=500), 'total': deque(maxlen=500)}
     
-    def analyze_ingredients(self, product_name, ingredients_text):
-        if not self.client:
-            return self._get_fallback_response("Groq client not initialized")
-        
+    def analyze_ingredients(self, product_name, ingredients_text, before_model_call=None, priority='interactive'):
+        """Analysis result dict; fallback results carry 'fallback_reason'.
+
+        ``before_model_call`` runs right before the Groq request, after the
+        cache and knowledge base had their chance (bulk jobs wait for their
+        rate limit there). ``priority`` is the LLM call layer class of the
+        request; bulk work passes 'bulk'.
+        """
         # Clean and prepare the inputs
         product_name = (product_name or "").strip()
         ingredients_text = ingredients_text.strip()
@@ -23,50 +33,25 @@ class GroqClient:
         if not ingredients_text:
             return self._get_fallback_response("No ingredients provided")
         
-        prompt = f"""Analyze this product for environmental impact and carbon footprint. 
-
-Product Name: {product_name}
-Ingredients: {ingredients_text}
-
-First, identify the main product type from the name and ingredients. Then analyze for environmental impact considering factors like resource consumption, manufacturing process, biodegradability, toxicity, and overall sustainability.
-
-Return your analysis as a valid JSON object with exactly these fields:
-- "detected_product_name": the main product name you identified (use the provided name if clear, otherwise infer from ingredients)
-- "rating": one of "friendly", "moderate", "harmful", "hazardous"
-- "points": a number between 0-100
-- "analysis": detailed explanation of environmental impact, mentioning the product name naturally in the analysis
-- "alternatives": suggestions for more eco-friendly alternatives AS A PLAIN TEXT STRING
-
-IMPORTANT: 
-- The "analysis" field should naturally incorporate the product name in the explanation
-- The "alternatives" field must be a plain text string, NOT a dictionary or list
-- Use the provided product name when relevant in your analysis
-
-Rating guidelines:
-- "friendly": Minimal environmental impact, sustainable ingredients (80-100 points)
-- "moderate": Some concerning ingredients but overall acceptable (40-79 points) 
-- "harmful": Significant environmental concerns (10-39 points)
-- "hazardous": Severe environmental impact, highly unsustainable (0-9 points)
-
-Return ONLY the JSON object, no additional text or formatting."""
+        context = {}
+        result = self._answer_without_model(product_name, ingredients_text, context)
+        if result:
+            return result
+        
+        if not llm_gateway.available:
+            return self._get_fallback_response("Groq client not initialized")
+        
+        if before_model_call:
+            before_model_call()
         
         try:
-            print(f"🔍 Analyzing product: '{product_name}' with {len(ingredients_text)} chars of ingredients")
+            print(f"🔍 Analyzing product: '{product_name}' with {len(context['prompt_ingredients'])} chars of ingredients "
+                  f"({len(context['known'])} of {len(context['names'])} already known)")
             
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an environmental scientist analyzing products. Always return valid JSON with product name detection and natural language analysis that includes the product name."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.1-8b-instant",
-                temperature=0.1,
-                max_tokens=800,
+            response = llm_gateway.complete(
+                'analysis',
+                self._analysis_messages(product_name, context['prompt_ingredients']),
+                priority=priority,
                 response_format={"type": "json_object"}
             )
             
@@ -76,87 +61,248 @@ Return ONLY the JSON object, no additional text or formatting."""
             # Parse JSON response
             try:
                 result_data = json.loads(result_text)
-                
-                # Validate required fields
-                required_fields = ['detected_product_name', 'rating', 'points', 'analysis', 'alternatives']
-                if all(field in result_data for field in required_fields):
-                    
-                    # Validate rating value
-                    valid_ratings = ['friendly', 'moderate', 'harmful', 'hazardous']
-                    if result_data['rating'] not in valid_ratings:
-                        result_data['rating'] = 'moderate'
-                    
-                    # Validate points range
-                    try:
-                        points = int(result_data['points'])
-                        result_data['points'] = max(0, min(100, points))
-                    except (ValueError, TypeError):
-                        result_data['points'] = 50
-                    
-                    # Use provided product name if detected name is generic
-                    detected_name = result_data['detected_product_name']
-                    if (not detected_name or 
-                        detected_name.lower() in ['product', 'item', 'unknown', 'unidentified'] or
-                        (product_name and len(product_name) > len(detected_name))):
-                        result_data['detected_product_name'] = product_name or detected_name
-                    
-                    # ENSURE alternatives is a string, not a dictionary or list
-                    if isinstance(result_data['alternatives'], (dict, list)):
-                        # Convert dictionary/list to readable string
-                        if isinstance(result_data['alternatives'], dict):
-                            alternatives_text = ""
-                            for category, items in result_data['alternatives'].items():
-                                if isinstance(items, list):
-                                    alternatives_text += f"{category}: {', '.join(items)}. "
-                                else:
-                                    alternatives_text += f"{category}: {items}. "
-                            result_data['alternatives'] = alternatives_text.strip()
-                        elif isinstance(result_data['alternatives'], list):
-                            result_data['alternatives'] = ". ".join([str(item) for item in result_data['alternatives']])
-                    elif not isinstance(result_data['alternatives'], str):
-                        # Convert any other type to string
-                        result_data['alternatives'] = str(result_data['alternatives'])
-                    
-                    # Ensure analysis is also a string
-                    if not isinstance(result_data['analysis'], str):
-                        result_data['analysis'] = str(result_data['analysis'])
-                    
-                    print(f"✅ Analysis successful: {result_data['detected_product_name']} - {result_data['rating']} ({result_data['points']} points)")
-                    return result_data
-                else:
-                    print(f"❌ Missing fields in response. Found: {list(result_data.keys())}")
-                    return self._get_fallback_response("Invalid response format from API", product_name)
-                    
             except json.JSONDecodeError as e:
                 print(f"❌ JSON decode error: {e}")
                 print(f"❌ Response was: {result_text}")
                 return self._get_fallback_response("Failed to parse API response", product_name)
             
+            usage = getattr(response, 'usage', None)
+            return self._finish_analysis(result_data, product_name, ingredients_text, context,
+                                         getattr(usage, 'total_tokens', 0) or 0)
+            
         except Exception as e:
             print(f"❌ Groq API error: {e}")
             return self._get_fallback_response(f"API error: {str(e)}", product_name)
     
+    def stream_analysis(self, product_name, ingredients_text):
+        """Analyze ingredients with a streamed completion, yielding (event, data) pairs.
+
+        ('field', {name: value, 'provisional': True}) is yielded as soon as the
+        model has written the product name, rating or points. These are the
+        model's own values; the final ones can differ once known ingredient
+        scores are folded in and the points multiplier applied.
+        ('delta', {'field', 'text'}) is yielded as the
+        analysis and alternatives text arrives. The last event is always
+        ('result', analysis) with the validated values analyze_ingredients
+        would have returned. Cached and locally scored products yield the
+        result straight away.
+        """
+        product_name = (product_name or "").strip()
+        ingredients_text = (ingredients_text or "").strip()
+        
+        if not ingredients_text:
+            yield 'result', self._get_fallback_response("No ingredients provided")
+            return
+        
+        context = {}
+        result = self._answer_without_model(product_name, ingredients_text, context)
+        if result:
+            yield 'result', result
+            return
+        
+        if not llm_gateway.available:
+            yield 'result', self._get_fallback_response("Groq client not initialized")
+            return
+        
+        started = time.perf_counter()
+        first_field = None
+        chunks = []
+        tokens = 0
+        try:
+            print(f"🔍 Streaming analysis: '{product_name}' ({len(context['known'])} of {len(context['names'])} ingredients already known)")
+            # JSON mode cannot be streamed; the prompt asks for bare JSON and the parser skips anything before it
+            stream = llm_gateway.stream('analysis', self._analysis_messages(product_name, context['prompt_ingredients']))
+            
+            parser = JSONFieldStream()
+            for chunk in stream:
+                usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or getattr(chunk, 'usage', None)
+                if usage:
+                    tokens = getattr(usage, 'total_tokens', 0) or tokens
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if not text:
+                    continue
+                chunks.append(text)
+                for kind, key, value in parser.feed(text):
+                    if kind == 'delta' and key in ('analysis', 'alternatives'):
+                        yield 'delta', {'field': key, 'text': value}
+                    elif kind == 'field' and key in ('detected_product_name', 'rating', 'points'):
+                        if first_field is None:
+                            first_field = time.perf_counter() - started
+                        yield 'field', {key: value, 'provisional': True}
+        except Exception as e:
+            print(f"❌ Groq streaming error: {e}")
+            yield 'result', self._get_fallback_response(f"API error: {str(e)}", product_name)
+            return
+        
+        result_text = ''.join(chunks).strip()
+        print(f"📨 Streamed API response: {result_text}")
+        try:
+            result_data = json.loads(result_text[result_text.find('{'):result_text.rfind('}') + 1])
+        except ValueError as e:
+            print(f"❌ JSON decode error: {e}")
+            yield 'result', self._get_fallback_response("Failed to parse API response", product_name)
+            return
+        
+        self._record_stream(first_field, time.perf_counter() - started)
+        yield 'result', self._finish_analysis(result_data, product_name, ingredients_text, context, tokens)
+    
+    def _answer_without_model(self, product_name, ingredients_text, context):
+        """Cached or locally scored result, or None; fills ``context`` for the model call"""
+        if Config.ANALYSIS_CACHE_ENABLED:
+            cached = analysis_cache.get(product_name, ingredients_text,
+                                        llm_gateway.model('analysis'), self.ANALYSIS_PROMPT_VERSION)
+            if cached:
+                print(f"⚡ Analysis cache hit: {cached['detected_product_name']} - {cached['rating']}")
+                return cached
+        
+        context.update(started=time.perf_counter(), names=[], known={}, unknown=[])
+        if Config.INGREDIENT_KB_ENABLED:
+            names = ingredient_kb.names(ingredients_text)
+            known, unknown = ingredient_kb.split(names)
+            context.update(names=names, known=known, unknown=unknown)
+            if names and not unknown:
+                result = ingredient_kb.local_analysis(product_name, names, known)
+                ingredient_kb.record(True, len(names), len(known), time.perf_counter() - context['started'])
+                print(f"📚 Scored locally from {len(names)} known ingredients: {result['rating']} ({result['points']} points)")
+                return result
+        
+        # Only the ingredients the knowledge base has not seen go to the model
+        context['prompt_ingredients'] = ', '.join(context['unknown']) if context['known'] else ingredients_text
+        return None
+    
+    def _analysis_messages(self, product_name, ingredients_text):
+        return [
+            llm_gateway.system_message('analysis'),
+            {
+                "role": "user", 
+                "content": llm_gateway.render('analysis', product_name=product_name, ingredients_text=ingredients_text)
+            }
+        ]
+    
+    def _finish_analysis(self, result_data, product_name, ingredients_text, context, tokens):
+        """Validate a parsed model response, fold in known ingredient scores and cache it"""
+        # Validate required fields
+        required_fields = ['detected_product_name', 'rating', 'points', 'analysis', 'alternatives']
+        if not isinstance(result_data, dict) or not all(field in result_data for field in required_fields):
+            print(f"❌ Missing fields in response. Found: {list(result_data.keys()) if isinstance(result_data, dict) else result_data}")
+            return self._get_fallback_response("Invalid response format from API", product_name)
+        
+        # Validate rating value
+        valid_ratings = ['friendly', 'moderate', 'harmful', 'hazardous']
+        if result_data['rating'] not in valid_ratings:
+            result_data['rating'] = 'moderate'
+        
+        # Validate points range
+        try:
+            points = int(result_data['points'])
+            result_data['points'] = max(0, min(100, points))
+        except (ValueError, TypeError):
+            result_data['points'] = 50
+        
+        # Use provided product name if detected name is generic
+        detected_name = result_data['detected_product_name']
+        if (not detected_name or 
+            detected_name.lower() in ['product', 'item', 'unknown', 'unidentified'] or
+            (product_name and len(product_name) > len(detected_name))):
+            result_data['detected_product_name'] = product_name or detected_name
+        
+        # ENSURE alternatives is a string, not a dictionary or list
+        if isinstance(result_data['alternatives'], (dict, list)):
+            # Convert dictionary/list to readable string
+            if isinstance(result_data['alternatives'], dict):
+                alternatives_text = ""
+                for category, items in result_data['alternatives'].items():
+                    if isinstance(items, list):
+                        alternatives_text += f"{category}: {', '.join(items)}. "
+                    else:
+                        alternatives_text += f"{category}: {items}. "
+                result_data['alternatives'] = alternatives_text.strip()
+            elif isinstance(result_data['alternatives'], list):
+                result_data['alternatives'] = ". ".join([str(item) for item in result_data['alternatives']])
+        elif not isinstance(result_data['alternatives'], str):
+            # Convert any other type to string
+            result_data['alternatives'] = str(result_data['alternatives'])
+        
+        # Ensure analysis is also a string
+        if not isinstance(result_data['analysis'], str):
+            result_data['analysis'] = str(result_data['analysis'])
+        
+        if Config.INGREDIENT_KB_ENABLED:
+            self._combine_ingredient_scores(result_data, context['names'], context['known'])
+            ingredient_kb.record(False, len(context['names']), len(context['known']),
+                                 time.perf_counter() - context['started'])
+        result_data.pop('ingredients', None)
+        
+        print(f"✅ Analysis successful: {result_data['detected_product_name']} - {result_data['rating']} ({result_data['points']} points)")
+        if Config.ANALYSIS_CACHE_ENABLED:
+            analysis_cache.set(product_name, ingredients_text, llm_gateway.model('analysis'),
+                               self.ANALYSIS_PROMPT_VERSION, result_data, tokens)
+        return result_data
+    
+    def _record_stream(self, first_field, total):
+        with self._stream_lock:
+            if first_field is not None:
+                self._stream_latencies['first_field'].append(first_field)
+            self._stream_latencies['total'].append(total)
+    
+    def get_stream_stats(self):
+        """Time to the first streamed rating/points field vs the whole completion"""
+        with self._stream_lock:
+            latencies = {name: list(values) for name, values in self._stream_latencies.items()}
+        return {
+            'streams': len(latencies['total']),
+            'p50_first_field': round(percentile(latencies['first_field'], 50), 4),
+            'p50_total': round(percentile(latencies['total'], 50), 4)
+        }
+    
+    def _combine_ingredient_scores(self, result_data, names, known):
+        """Learn the model's per-ingredient scores and score the product from all of them"""
+        assessments = []
+        # Only ingredients that were submitted; other names are usually renamed or made up by the model
+        submitted = set(names or ())
+        for item in result_data.get('ingredients') or []:
+            if not isinstance(item, dict) or not item.get('name'):
+                continue
+            try:
+                points = max(0, min(100, float(item.get('points'))))
+            except (ValueError, TypeError):
+                continue
+            name = ingredient_kb.normalize(str(item['name']))
+            if name in submitted and name not in known:
+                # One sample per ingredient per answer, also when synonyms repeat it
+                submitted.discard(name)
+                assessments.append((name, points, str(item.get('note') or '').strip() or None))
+        ingredient_kb.learn(assessments)
+        
+        scores = {name: entry['points'] for name, entry in known.items()}
+        scores.update((name, points) for name, points, _ in assessments)
+        if names and all(name in scores for name in names):
+            result_data['points'] = points_calculator.combine_ingredient_scores([scores[name] for name in names])
+            result_data['rating'] = points_calculator.rating_for_points(result_data['points'])
+        elif known:
+            # The model skipped some ingredients: blend its product score with what is known
+            result_data['points'] = points_calculator.combine_ingredient_scores(
+                [result_data['points']] + [entry['points'] for entry in known.values()])
+            result_data['rating'] = points_calculator.rating_for_points(result_data['points'])
+        
+        concerns = sorted((entry['points'], name) for name, entry in known.items() if entry['points'] < 40)[:3]
+        if concerns:
+            result_data['analysis'] += ' Previously assessed ingredients of concern: ' + ' '.join(
+                f"{name.title()}: {known[name]['note'] or 'significant environmental impact.'}" for _, name in concerns)
+    
     def chat_response(self, message):
         """Method used by chatbot - simpler prompt, no JSON requirement"""
-        if not self.client:
+        if not llm_gateway.available:
             return "I'm having trouble connecting right now. Please try again later."
         
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are Aura, an environmental assistant focused on carbon footprint and sustainability. Help users understand carbon footprint calculation, sustainable product choices, environmental impact of ingredients, and eco-friendly alternatives. Keep responses informative, practical, and encouraging."
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
-                model="llama-3.1-8b-instant",
-                temperature=0.7,
-                max_tokens=500
-            )
+            response = llm_gateway.complete('chat', [
+                llm_gateway.system_message('chat'),
+                {
+                    "role": "user",
+                    "content": message
+                }
+            ])
             
             return response.choices[0].message.content
             
@@ -174,7 +320,8 @@ Return ONLY the JSON object, no additional text or formatting."""
             "rating": "moderate",
             "points": 50,
             "analysis": f"Unable to complete analysis{product_ref} at this time. {reason} Please try again in a moment. For now, consider products with natural, biodegradable ingredients and minimal synthetic chemicals.",
-            "alternatives": "Look for products with certified organic ingredients, minimal packaging, and clear sustainability certifications. Consider DIY alternatives using natural ingredients."
+            "alternatives": "Look for products with certified organic ingredients, minimal packaging, and clear sustainability certifications. Consider DIY alternatives using natural ingredients.",
+            "fallback_reason": reason or "unknown"
         }
 
 # Global instance
@@ -0,0 +1,166 @@
+import threading
+import time
+from config import Config
+from services.state_store import StateDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL,
+    analysis_id INTEGER,
+    replay_window REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+PENDING, DONE = 'pending', 'done'
+
+class SingleFlight:
+    """Idempotency keys and in-flight deduplication shared by every worker on the host.
+
+    A request claims one or more keys, each with a replay window. The first
+    claimant owns the computation; concurrent claimants of any of its keys
+    wait for it and then get its result instead of computing again. Once
+    finished, a key replays that result for its window. A key claimed with
+    different content (``fingerprint``) is treated as new. Pending claims
+    older than ``lock_timeout`` belong to a worker that died and are taken over.
+    Waiting is short and read-only: a duplicate polls with plain reads,
+    backing off from ``poll_interval`` to ``max_poll_interval``, and only
+    takes the write lock again once the original has finished.
+    """
+
+    def __init__(self, wait=None, lock_timeout=None, poll_interval=0.1, max_poll_interval=1.0, db=None):
+        self.wait = wait or Config.IDEMPOTENCY_WAIT
+        self.lock_timeout = lock_timeout or Config.IDEMPOTENCY_LOCK_TIMEOUT
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.db = db or StateDB('idempotency.db', SCHEMA)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._counters = {'owned': 0, 'replayed': 0, 'attached': 0, 'timeouts': 0, 'takeovers': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _try_claim(self, claims, fingerprint):
+        """One claim attempt: ('owner', None), ('done', analysis_id) or ('pending', None)"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            takeover = False
+            for key, _ in claims:
+                row = conn.execute('SELECT fingerprint, state, analysis_id, replay_window, updated_at '
+                                   'FROM idempotency_keys WHERE key = ?', (key,)).fetchone()
+                if not row or row[0] != fingerprint:
+                    continue
+                _, state, analysis_id, replay_window, updated_at = row
+                if state == DONE and updated_at + replay_window > now:
+                    return DONE, analysis_id
+                if state == PENDING:
+                    if updated_at + self.lock_timeout > now:
+                        return PENDING, None
+                    takeover = True
+
+            conn.executemany(
+                'INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, state, analysis_id, replay_window, updated_at) '
+                'VALUES (?, ?, ?, NULL, ?, ?)',
+                [(key, fingerprint, PENDING, window, now) for key, window in claims]
+            )
+            conn.execute('DELETE FROM idempotency_keys WHERE updated_at + replay_window < ? AND state = ?', (now, DONE))
+        if takeover:
+            self._count('takeovers')
+        return 'owner', None
+
+    def _still_pending(self, claims, fingerprint):
+        """Read-only check whether a live pending claim still blocks ours"""
+        now = time.time()
+        for key, _ in claims:
+            row = self.db.execute('SELECT fingerprint, state, updated_at FROM idempotency_keys WHERE key = ?',
+                                  (key,)).fetchone()
+            if row and row[0] == fingerprint and row[1] == PENDING and row[2] + self.lock_timeout > now:
+                return True
+        return False
+
+    def begin(self, claims, fingerprint):
+        """Claim [(key, replay_window)]; returns ('owner', None), ('done', analysis_id) or ('busy', None).
+
+        'done' comes from a finished original (replayed) or one this call
+        waited for (attached); 'busy' means the original is still running
+        after ``wait`` seconds and the caller should ask the client to retry.
+        The owner must call complete() or abandon().
+        """
+        deadline = time.time() + self.wait
+        interval = self.poll_interval
+        waited = False
+        while True:
+            try:
+                outcome, analysis_id = self._try_claim(claims, fingerprint)
+            except Exception as e:
+                print(f"⚠️ Idempotency store unavailable: {e}")
+                return 'owner', None
+
+            if outcome == 'owner':
+                self._count('owned')
+                return outcome, None
+            if outcome == DONE:
+                self._count('attached' if waited else 'replayed')
+                return outcome, analysis_id
+            if time.time() >= deadline:
+                self._count('timeouts')
+                return 'busy', None
+
+            if not waited:
+                print("⏳ Duplicate request attached to in-flight analysis")
+            waited = True
+            try:
+                while time.time() < deadline:
+                    # Owners in this process wake us at once; other workers' are noticed by polling
+                    with self._released:
+                        self._released.wait(min(interval, max(0.0, deadline - time.time())))
+                    interval = min(interval * 2, self.max_poll_interval)
+                    if not self._still_pending(claims, fingerprint):
+                        break
+            except Exception as e:
+                print(f"⚠️ Idempotency store unavailable: {e}")
+
+    def _release(self):
+        with self._released:
+            self._released.notify_all()
+
+    def complete(self, claims, analysis_id):
+        """Record the owner's result; waiting and later duplicates get ``analysis_id``"""
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    'UPDATE idempotency_keys SET state = ?, analysis_id = ?, updated_at = ? WHERE key = ?',
+                    [(DONE, analysis_id, time.time(), key) for key, _ in claims]
+                )
+        except Exception as e:
+            print(f"⚠️ Could not record idempotent result: {e}")
+        self._release()
+
+    def abandon(self, claims):
+        """Owner failed: drop the claims so a retry computes again"""
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany('DELETE FROM idempotency_keys WHERE key = ? AND state = ?',
+                                 [(key, PENDING) for key, _ in claims])
+        except Exception as e:
+            print(f"⚠️ Could not release idempotency keys: {e}")
+        self._release()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        try:
+            stats['pending'], stats['replayable'] = self.db.execute(
+                'SELECT COALESCE(SUM(state = ?), 0), COALESCE(SUM(state = ?), 0) FROM idempotency_keys',
+                (PENDING, DONE)
+            ).fetchone()
+        except Exception:
+            pass
+        return stats
+
+# Global instance
+single_flight = SingleFlight()
@@ -0,0 +1,202 @@
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from flask import has_app_context
+from sqlalchemy.exc import IntegrityError
+from app import db
+from config import Config
+from models.ingredient import IngredientImpact
+from services.analysis_cache import canonical_ingredient, ingredient_items
+from services.ocr_pool import percentile
+from services.points_calculator import points_calculator
+
+# Label names that mean the same ingredient share one knowledge base entry
+SYNONYMS = {
+    'aqua': 'water',
+    'eau': 'water',
+    'parfum': 'fragrance',
+    'sodium chloride': 'salt',
+}
+
+class IngredientKnowledgeBase:
+    """Per-ingredient environmental impact scores learned from LLM analyses.
+
+    Rows live in the ``ingredient_impacts`` table; each process keeps an
+    in-memory index of them and pulls rows other workers added every
+    ``refresh`` seconds. An ingredient counts as known once it has been
+    assessed ``min_samples`` times with a standard deviation of at most
+    ``max_stddev`` points; its score is the mean of those assessments. An
+    entry without a new assessment for ``max_age`` seconds is unknown again,
+    so the next product containing it asks the LLM and refreshes it. Needs
+    an application context, without one every ingredient is reported as
+    unknown.
+    """
+
+    def __init__(self, refresh=None, min_samples=None, max_stddev=None, max_age=None):
+        self.refresh = refresh or Config.INGREDIENT_KB_REFRESH
+        self.min_samples = min_samples or Config.INGREDIENT_KB_MIN_SAMPLES
+        self.max_stddev = Config.INGREDIENT_KB_MAX_STDDEV if max_stddev is None else max_stddev
+        self.max_age = max_age or Config.INGREDIENT_KB_MAX_AGE
+        self._index = {}  # name -> {'points', 'note', 'samples', 'spread', 'updated_at'}
+        self._synced_until = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._counters = {'analyses': 0, 'local': 0, 'llm_calls': 0, 'items': 0, 'items_known': 0, 'learned': 0}
+        self._latencies = {'local': deque(maxlen=500), 'llm': deque(maxlen=500)}
+
+    @staticmethod
+    def normalize(name):
+        item = canonical_ingredient(name)
+        return SYNONYMS.get(item, item)
+
+    def names(self, ingredients_text):
+        """Normalized ingredient names of a label in label order"""
+        names = []
+        for item in ingredient_items(ingredients_text):
+            name = self.normalize(item)
+            if name not in names:
+                names.append(name)
+        return names
+
+    def _sync(self):
+        """Pull rows added or updated since the last sync; False if the table is unreachable"""
+        if not has_app_context():
+            return False
+        if time.time() - self._checked < self.refresh:
+            return True
+        with self._lock:
+            if time.time() - self._checked < self.refresh:
+                return True
+            try:
+                query = IngredientImpact.query
+                if self._synced_until:
+                    query = query.filter(IngredientImpact.updated_at >= self._synced_until)
+                for row in query.all():
+                    self._index[row.name] = self._entry(row)
+                    if row.updated_at and (not self._synced_until or row.updated_at > self._synced_until):
+                        self._synced_until = row.updated_at
+            except Exception as e:
+                print(f"⚠️ Ingredient knowledge base unavailable: {e}")
+                return False
+            self._checked = time.time()
+        return True
+
+    @staticmethod
+    def _entry(row):
+        return {'points': row.points, 'note': row.note, 'samples': row.samples,
+                'spread': row.spread, 'updated_at': row.updated_at}
+
+    def _trusted(self, entry):
+        """Enough recent assessments that agree with each other"""
+        if not entry or entry['samples'] < self.min_samples or entry['spread'] is None:
+            return False
+        if entry['updated_at'] and entry['updated_at'] < datetime.utcnow() - timedelta(seconds=self.max_age):
+            return False
+        stddev = math.sqrt(entry['spread'] / (entry['samples'] - 1)) if entry['samples'] > 1 else 0.0
+        return stddev <= self.max_stddev
+
+    def split(self, names):
+        """Return ({name: entry} of known ingredients, [unknown names] in label order)"""
+        if not self._sync():
+            return {}, list(names)
+        known, unknown = {}, []
+        for name in names:
+            entry = self._index.get(name)
+            if self._trusted(entry):
+                known[name] = entry
+            else:
+                unknown.append(name)
+        return known, unknown
+
+    def learn(self, assessments):
+        """Average LLM assessments [(name, points, note)] into the table and the index.
+
+        Mean and spread are updated incrementally (Welford), so agreement
+        can be checked without keeping every assessment.
+        """
+        if not assessments or not has_app_context():
+            return
+        for attempt in range(2):
+            try:
+                rows = {row.name: row for row in IngredientImpact.query.filter(
+                    IngredientImpact.name.in_([name for name, _, _ in assessments])).all()}
+                for name, points, note in assessments:
+                    row = rows.get(name)
+                    if row:
+                        delta = points - row.points
+                        row.samples += 1
+                        row.points += delta / row.samples
+                        row.spread = (row.spread or 0.0) + delta * (points - row.points)
+                        row.note = row.note or note
+                    else:
+                        row = rows[name] = IngredientImpact(name=name, points=points, note=note, samples=1, spread=0.0)
+                        db.session.add(row)
+                db.session.commit()
+                break
+            except IntegrityError:
+                # Another worker inserted one of these ingredients first: average into its row instead
+                db.session.rollback()
+                if attempt:
+                    print("⚠️ Could not update ingredient knowledge base: concurrent inserts")
+                    return
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ Could not update ingredient knowledge base: {e}")
+                return
+
+        with self._lock:
+            for name, row in rows.items():
+                self._index[name] = self._entry(row)
+            self._counters['learned'] += len(assessments)
+
+    def local_analysis(self, product_name, names, known):
+        """Analysis result for a product whose ingredients are all known, without an LLM call"""
+        product = product_name or 'This product'
+        points = points_calculator.combine_ingredient_scores([known[name]['points'] for name in names])
+        concerns = sorted((known[name]['points'], name) for name in names if known[name]['points'] < 80)[:3]
+
+        analysis = f"{product} was scored from {len(names)} ingredients already assessed in earlier analyses."
+        if concerns:
+            analysis += ' Main concerns: ' + ' '.join(
+                f"{name.title()}: {known[name]['note'] or 'moderate environmental impact.'}" for _, name in concerns)
+            alternatives = (f"Look for versions of {product} without {', '.join(name for _, name in concerns)}, "
+                            "and prefer certified organic or biodegradable formulations with minimal packaging.")
+        else:
+            analysis += ' None of its ingredients raised significant environmental concerns.'
+            alternatives = 'This formulation already scores well; prefer refills or recyclable packaging to reduce waste further.'
+
+        return {
+            'detected_product_name': product_name or 'Product',
+            'rating': points_calculator.rating_for_points(points),
+            'points': points,
+            'analysis': analysis,
+            'alternatives': alternatives
+        }
+
+    def record(self, local, items, known, seconds):
+        """Count one analysis: scored locally or with an LLM call for the unknown residue"""
+        with self._lock:
+            self._counters['analyses'] += 1
+            self._counters['local' if local else 'llm_calls'] += 1
+            self._counters['items'] += items
+            self._counters['items_known'] += known
+            self._latencies['local' if local else 'llm'].append(seconds)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['index_entries'] = len(self._index)
+            stats['index_trusted'] = sum(1 for entry in self._index.values() if self._trusted(entry))
+            latencies = {path: list(values) for path, values in self._latencies.items()}
+        stats['llm_calls_per_analysis'] = stats['llm_calls'] / float(stats['analyses']) if stats['analyses'] else 0.0
+        stats['known_item_ratio'] = stats['items_known'] / float(stats['items']) if stats['items'] else 0.0
+        everything = latencies['local'] + latencies['llm']
+        stats['p50_latency'] = round(percentile(everything, 50), 4)
+        stats['p50_latency_local'] = round(percentile(latencies['local'], 50), 4)
+        stats['p50_latency_llm'] = round(percentile(latencies['llm'], 50), 4)
+        return stats
+
+# Global instance
+ingredient_kb = IngredientKnowledgeBase()
@@ -0,0 +1,152 @@
+import json
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '/': '/', '\\': '\\', '"': '"'}
+
+class JSONFieldStream:
+    """Incremental parser for the top-level fields of a JSON object arriving in chunks.
+
+    ``feed(chunk)`` returns the events the new text completes:
+    ('delta', key, text) while a top-level string value is streaming, and
+    ('field', key, value) once any top-level value is complete. Nested
+    objects and lists are reported whole. Text before the opening brace
+    (such as a code fence) is skipped.
+    """
+
+    def __init__(self):
+        self.state = 'start'
+        self._key = []
+        self._text = []  # String value chunk not yet reported as a delta
+        self._value = []  # Whole string value so far
+        self._escape = None  # None, '' right after a backslash, or the hex digits of a \u escape
+        self._surrogate = None
+        self._raw = []
+        self._depth = 0
+        self._raw_string = False
+        self._raw_escape = False
+
+    @property
+    def done(self):
+        return self.state == 'done'
+
+    def feed(self, chunk):
+        events = []
+        for char in chunk:
+            self._step(char, events)
+        if self.state == 'string' and self._text:
+            events.append(('delta', ''.join(self._key), ''.join(self._text)))
+            self._text = []
+        return events
+
+    def _step(self, char, events):
+        state = self.state
+        if state == 'start':
+            if char == '{':
+                self.state = 'key_wait'
+        elif state == 'key_wait':
+            if char == '"':
+                self._key = []
+                self.state = 'key'
+            elif char == '}':
+                self.state = 'done'
+        elif state == 'key':
+            if char == '"' and not self._raw_escape:
+                self.state = 'colon'
+            else:
+                self._raw_escape = char == '\\' and not self._raw_escape
+                self._key.append(char)
+        elif state == 'colon':
+            if char == ':':
+                self.state = 'value_wait'
+        elif state == 'value_wait':
+            if char == '"':
+                self._text, self._value = [], []
+                self.state = 'string'
+            elif not char.isspace():
+                self._raw = [char]
+                self._depth = 1 if char in '{[' else 0
+                self._raw_string = False
+                self._raw_escape = False
+                self.state = 'raw'
+        elif state == 'string':
+            self._string_char(char, events)
+        elif state == 'raw':
+            self._raw_char(char, events)
+        elif state == 'after_value':
+            if char == ',':
+                self.state = 'key_wait'
+            elif char == '}':
+                self.state = 'done'
+
+    def _emit(self, text):
+        self._text.append(text)
+        self._value.append(text)
+
+    def _string_char(self, char, events):
+        if self._escape is not None:
+            if self._escape == '':
+                if char == 'u':
+                    self._escape = 'u'  # Collect the four hex digits of \uXXXX
+                else:
+                    self._emit(_ESCAPES.get(char, char))
+                    self._escape = None
+                return
+            self._escape += char
+            if len(self._escape) == 5:
+                code = int(self._escape[1:], 16)
+                self._escape = None
+                if 0xD800 <= code < 0xDC00:
+                    self._surrogate = code
+                elif 0xDC00 <= code < 0xE000 and self._surrogate:
+                    self._emit(chr(0x10000 + ((self._surrogate - 0xD800) << 10) + (code - 0xDC00)))
+                    self._surrogate = None
+                else:
+                    self._emit(chr(code))
+            return
+
+        if char == '\\':
+            self._escape = ''
+        elif char == '"':
+            key = ''.join(self._key)
+            if self._text:
+                events.append(('delta', key, ''.join(self._text)))
+            events.append(('field', key, ''.join(self._value)))
+            self._text, self._value = [], []
+            self.state = 'after_value'
+        else:
+            self._emit(char)
+
+    def _raw_char(self, char, events):
+        if self._raw_string:
+            self._raw.append(char)
+            if self._raw_escape:
+                self._raw_escape = False
+            elif char == '\\':
+                self._raw_escape = True
+            elif char == '"':
+                self._raw_string = False
+            return
+
+        if (char == ',' or char in '}]') and self._depth == 0:
+            # End of a scalar value, or the closing brace of the whole object
+            self._finish_raw(events)
+            self.state = 'key_wait' if char == ',' else 'done'
+            return
+        self._raw.append(char)
+        if char == '"':
+            self._raw_string = True
+        elif char in '{[':
+            self._depth += 1
+        elif char in '}]':
+            self._depth -= 1
+            if self._depth == 0:
+                self._finish_raw(events)
+                self.state = 'after_value'
+
+    def _finish_raw(self, events):
+        raw = ''.join(self._raw).strip()
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        events.append(('field', ''.join(self._key), value))
+        self._raw = []
@@ -0,0 +1,292 @@
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from collections import deque
+import groq
+from config import Config
+from services.ocr_pool import percentile
+
+# Lower rank is served first; bulk work never takes the slots reserved for people waiting on a page
+PRIORITIES = {'interactive': 0, 'bulk': 1}
+
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_UNITS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+def parse_duration(value):
+    """Seconds in a rate-limit header value ('7.66s', '2m59.56s', '120ms' or plain seconds), or None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    return sum(float(amount) * _UNITS[unit] for amount, unit in parts) if parts else None
+
+def _header_int(headers, name):
+    try:
+        return int(float(headers.get(name)))
+    except (TypeError, ValueError):
+        return None
+
+class AIMDLimiter:
+    """Concurrency limit for model requests that adapts to the provider (additive increase, multiplicative decrease).
+
+    Every successful request raises the limit by 1/limit, roughly one slot
+    per round of requests; a 429, or rate-limit headers reporting an
+    exhausted budget, halves it (at most once per ``cooldown`` seconds) and
+    pauses new requests until the reset time the provider gave. Waiting
+    callers are served by priority, then arrival, and bulk callers leave
+    ``reserve`` slots free for interactive ones.
+    """
+
+    def __init__(self, initial=None, minimum=None, maximum=None, reserve=None, cooldown=1.0):
+        self.minimum = float(minimum or Config.LLM_MIN_CONCURRENCY)
+        self.maximum = float(maximum or Config.LLM_MAX_CONCURRENCY)
+        self.limit = min(self.maximum, max(self.minimum, float(initial or Config.LLM_INITIAL_CONCURRENCY)))
+        self.reserve = Config.LLM_INTERACTIVE_RESERVE if reserve is None else reserve
+        self.cooldown = cooldown
+        self._cond = threading.Condition()
+        self._in_flight = {priority: 0 for priority in PRIORITIES}
+        self._waiting = []  # heap of (rank, sequence)
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._headers = {}
+        self._counters = {'increases': 0, 'decreases': 0, 'pauses': 0, 'wait_timeouts': 0}
+
+    def _has_room(self, priority):
+        slots = int(self.limit)
+        if priority != 'interactive':
+            slots = max(1, slots - self.reserve)
+        return sum(self._in_flight.values()) < slots and time.time() >= self._paused_until
+
+    def acquire(self, priority, deadline):
+        """Block until a slot is free for ``priority``; False if ``deadline`` passes first"""
+        ticket = (PRIORITIES[priority], next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] == ticket and self._has_room(priority):
+                        heapq.heappop(self._waiting)
+                        self._in_flight[priority] += 1
+                        return True
+                    now = time.time()
+                    if now >= deadline:
+                        self._counters['wait_timeouts'] += 1
+                        return False
+                    # Releases wake us at once; the end of a pause is noticed by the timeout
+                    timeout = min(deadline - now, 0.5)
+                    if self._paused_until > now:
+                        timeout = min(timeout, max(0.01, self._paused_until - now))
+                    self._cond.wait(timeout)
+            finally:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def release(self, priority, throttled=False, headers=None, retry_after=None):
+        """Return a slot and adapt the limit to how the request went"""
+        with self._cond:
+            self._in_flight[priority] -= 1
+            exhausted = self._observe(headers or {})
+            if throttled or exhausted:
+                self._decrease(retry_after)
+            elif self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                self._counters['increases'] += 1
+            self._cond.notify_all()
+
+    def _observe(self, headers):
+        """Remember the provider's remaining budget; True when it is used up"""
+        state = {
+            'remaining_requests': _header_int(headers, 'x-ratelimit-remaining-requests'),
+            'remaining_tokens': _header_int(headers, 'x-ratelimit-remaining-tokens'),
+            'reset_requests': parse_duration(headers.get('x-ratelimit-reset-requests')),
+            'reset_tokens': parse_duration(headers.get('x-ratelimit-reset-tokens')),
+        }
+        if not any(value is not None for value in state.values()):
+            return False
+        self._headers = state
+
+        resets = []
+        if state['remaining_requests'] == 0 and state['reset_requests']:
+            resets.append(state['reset_requests'])
+        if state['remaining_tokens'] == 0 and state['reset_tokens']:
+            resets.append(state['reset_tokens'])
+        if resets:
+            self._pause(max(resets))
+        return bool(resets)
+
+    def _pause(self, seconds):
+        until = time.time() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self._counters['pauses'] += 1
+
+    def _decrease(self, retry_after=None):
+        if retry_after:
+            self._pause(retry_after)
+        now = time.time()
+        # One decrease per congestion event, not one per request that was already in flight
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit / 2.0)
+            self._last_decrease = now
+            self._counters['decreases'] += 1
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            stats['limit'] = round(self.limit, 2)
+            stats['in_flight'] = dict(self._in_flight)
+            stats['waiting'] = len(self._waiting)
+            stats['paused_for'] = round(max(0.0, self._paused_until - time.time()), 2)
+            stats['rate_limit_headers'] = dict(self._headers)
+        return stats
+
+class LLMCallLayer:
+    """Every Groq chat completion goes through here.
+
+    A request waits for an ``AIMDLimiter`` slot in its priority class, then
+    is tried until it succeeds or its deadline (``LLM_INTERACTIVE_DEADLINE``
+    or ``LLM_BULK_DEADLINE`` seconds) would pass. Rate limits, timeouts,
+    connection errors and 5xx responses are retried with full-jitter
+    exponential backoff, or after the provider's retry-after if that is
+    longer; other errors are raised at once. Clients should be built with
+    ``max_retries=0`` so the SDK does not retry underneath. Latency, token
+    and 429 counts are kept per model.
+    """
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter or AIMDLimiter()
+        self.deadlines = {'interactive': Config.LLM_INTERACTIVE_DEADLINE, 'bulk': Config.LLM_BULK_DEADLINE}
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _model_stats(self, model):
+        stats = self._models.get(model)
+        if stats is None:
+            stats = self._models[model] = {
+                'calls': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'throttled': 0, 'timeouts': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0, 'latencies': deque(maxlen=500)
+            }
+        return stats
+
+    def _count(self, model, name, amount=1):
+        with self._lock:
+            self._model_stats(model)[name] += amount
+
+    def _record_success(self, model, seconds, usage):
+        with self._lock:
+            stats = self._model_stats(model)
+            stats['succeeded'] += 1
+            stats['latencies'].append(seconds)
+            if usage is not None:
+                stats['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+                stats['completion_tokens'] += getattr(usage, 'completion_tokens', 0) or 0
+
+    @staticmethod
+    def _retryable(error):
+        if isinstance(error, (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)):
+            return True
+        return isinstance(error, groq.APIStatusError) and error.status_code in (408, 409)
+
+    @staticmethod
+    def _error_headers(error):
+        response = getattr(error, 'response', None)
+        return getattr(response, 'headers', None) or {}
+
+    def _backoff(self, attempt, retry_after):
+        delay = random.uniform(0, min(Config.LLM_BACKOFF_MAX, Config.LLM_BACKOFF_BASE * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _call(self, client, model, messages, priority, params):
+        """Run one request through the limiter and retry policy; returns (raw response, started)"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority: {priority}")
+        self._count(model, 'calls')
+        deadline = time.time() + self.deadlines[priority]
+        attempt = 0
+        while True:
+            if not self.limiter.acquire(priority, deadline):
+                self._count(model, 'failed')
+                raise TimeoutError(f"No Groq capacity for {model} within {self.deadlines[priority]}s")
+
+            started = time.perf_counter()
+            timeout = max(0.1, min(Config.LLM_ATTEMPT_TIMEOUT, deadline - time.time()))
+            try:
+                raw = client.chat.completions.with_raw_response.create(
+                    messages=messages, model=model, timeout=timeout, **params)
+            except Exception as e:
+                throttled = isinstance(e, groq.RateLimitError)
+                headers = self._error_headers(e)
+                retry_after = parse_duration(headers.get('retry-after'))
+                self.limiter.release(priority, throttled=throttled, headers=headers, retry_after=retry_after)
+                if throttled:
+                    self._count(model, 'throttled')
+                elif isinstance(e, groq.APITimeoutError):
+                    self._count(model, 'timeouts')
+
+                delay = self._backoff(attempt, retry_after)
+                if not self._retryable(e) or time.time() + delay >= deadline:
+                    self._count(model, 'failed')
+                    raise
+                print(f"⏳ Groq {model} {type(e).__name__}, retry {attempt + 1} in {delay:.1f}s")
+                self._count(model, 'retries')
+                time.sleep(delay)
+                attempt += 1
+                continue
+            return raw, started
+
+    def complete(self, client, model, messages, priority='interactive', **params):
+        """Chat completion for ``messages``; raises the last error once retries or the deadline run out"""
+        raw, started = self._call(client, model, messages, priority, params)
+        try:
+            response = raw.parse()
+        except Exception:
+            self.limiter.release(priority, headers=raw.headers)
+            self._count(model, 'failed')
+            raise
+        self.limiter.release(priority, headers=raw.headers)
+        self._record_success(model, time.perf_counter() - started, getattr(response, 'usage', None))
+        return response
+
+    def stream(self, client, model, messages, priority='interactive', **params):
+        """Streamed chat completion chunks; the slot is held until the stream ends or is closed.
+
+        Only opening the stream is retried: once chunks have been handed
+        out, an error is raised to the caller.
+        """
+        raw, started = self._call(client, model, messages, priority, dict(params, stream=True))
+        usage = None
+        succeeded = False
+        try:
+            for chunk in raw.parse():
+                usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or getattr(chunk, 'usage', None) or usage
+                yield chunk
+            succeeded = True
+        finally:
+            self.limiter.release(priority, headers=raw.headers)
+            if succeeded:
+                self._record_success(model, time.perf_counter() - started, usage)
+            else:
+                self._count(model, 'failed')
+
+    def get_stats(self):
+        models = {}
+        with self._lock:
+            for model, stats in self._models.items():
+                latencies = list(stats['latencies'])
+                models[model] = {name: value for name, value in stats.items() if name != 'latencies'}
+                models[model]['p50_latency'] = round(percentile(latencies, 50), 4)
+                models[model]['p95_latency'] = round(percentile(latencies, 95), 4)
+        return {'limiter': self.limiter.get_stats(), 'models': models}
+
+# Global instance
+llm_calls = LLMCallLayer()
@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import deque
+from string import Template
+import groq
+import httpx
+from config import Config
+from services.llm_calls import llm_calls
+from services.ocr_pool import percentile
+
+# What each kind of request asks for: change a model or a sampling setting here
+TASKS = {
+    'analysis': {'model': Config.LLM_ANALYSIS_MODEL, 'system': 'analysis_system', 'temperature': 0.1, 'max_tokens': 800},
+    'chat': {'model': Config.LLM_CHAT_MODEL, 'system': 'chat_system', 'temperature': 0.7, 'max_tokens': 500},
+}
+
+# Prompt templates; $names are filled in by LLMGateway.render()
+PROMPTS = {
+    'analysis_system': Template(
+        "You are an environmental scientist analyzing products. Always return valid JSON with product name "
+        "detection and natural language analysis that includes the product name."
+    ),
+    'analysis': Template("""Analyze this product for environmental impact and carbon footprint. 
+
+Product Name: $product_name
+Ingredients: $ingredients_text
+
+First, identify the main product type from the name and ingredients. Then analyze for environmental impact considering factors like resource consumption, manufacturing process, biodegradability, toxicity, and overall sustainability.
+
+Return your analysis as a valid JSON object with exactly these fields:
+- "detected_product_name": the main product name you identified (use the provided name if clear, otherwise infer from ingredients)
+- "rating": one of "friendly", "moderate", "harmful", "hazardous"
+- "points": a number between 0-100
+- "analysis": detailed explanation of environmental impact, mentioning the product name naturally in the analysis
+- "alternatives": suggestions for more eco-friendly alternatives AS A PLAIN TEXT STRING
+- "ingredients": a list with one object per listed ingredient: {"name": the ingredient as listed, "points": its own impact score 0-100 on the same scale, "note": one sentence on its environmental impact}
+
+IMPORTANT: 
+- The "analysis" field should naturally incorporate the product name in the explanation
+- The "alternatives" field must be a plain text string, NOT a dictionary or list
+- Use the provided product name when relevant in your analysis
+
+Rating guidelines:
+- "friendly": Minimal environmental impact, sustainable ingredients (80-100 points)
+- "moderate": Some concerning ingredients but overall acceptable (40-79 points) 
+- "harmful": Significant environmental concerns (10-39 points)
+- "hazardous": Severe environmental impact, highly unsustainable (0-9 points)
+
+Return ONLY the JSON object, no additional text or formatting."""),
+    'chat_system': Template("""You are Aura, an environmental assistant focused on carbon footprint and sustainability.
+Help users understand:
+- Carbon footprint calculation
+- Sustainable product choices
+- Environmental impact of ingredients
+- Eco-friendly alternatives
+- Climate change and sustainability topics
+
+Keep responses informative, practical, and encouraging.
+Suggest specific actions users can take to reduce their environmental impact."""),
+}
+
+class LLMGateway:
+    """The one way this process talks to Groq.
+
+    Owns a single Groq client, built on first use, over a keep-alive
+    connection pool shared by every service and thread, so workers start
+    without a network client and requests reuse warm TLS connections. Models,
+    sampling settings and prompts come from ``TASKS`` and ``PROMPTS``;
+    requests run through the LLM call layer for concurrency, retries and
+    deadlines, and are counted per task.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._init_seconds = None
+        self._tasks = {task: {'calls': 0, 'failed': 0, 'latencies': deque(maxlen=500)} for task in TASKS}
+
+    @property
+    def client(self):
+        """The shared Groq client, or None if it cannot be built"""
+        if self._client is None and not self._failed:
+            with self._lock:
+                if self._client is None and not self._failed:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self):
+        started = time.perf_counter()
+        try:
+            http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=Config.LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=Config.LLM_KEEPALIVE_CONNECTIONS,
+                                    keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY),
+                timeout=httpx.Timeout(Config.LLM_ATTEMPT_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT)
+            )
+            # Retries and backoff are done by the LLM call layer
+            client = groq.Groq(api_key=Config.GROQ_API_KEY, http_client=http_client, max_retries=0)
+        except Exception as e:
+            print(f"❌ Failed to initialize Groq client: {e}")
+            self._failed = True
+            return None
+        self._init_seconds = time.perf_counter() - started
+        print("✅ Groq client initialized successfully")
+        return client
+
+    @property
+    def available(self):
+        return self.client is not None
+
+    @staticmethod
+    def model(task):
+        return TASKS[task]['model']
+
+    @staticmethod
+    def render(prompt, **values):
+        return PROMPTS[prompt].substitute(**values)
+
+    def system_message(self, task):
+        return {"role": "system", "content": self.render(TASKS[task]['system'])}
+
+    def _settings(self, task, overrides):
+        settings = {name: value for name, value in TASKS[task].items() if name not in ('model', 'system')}
+        settings.update(overrides)
+        return settings
+
+    def _record(self, task, seconds=None):
+        with self._lock:
+            stats = self._tasks[task]
+            stats['calls'] += 1
+            if seconds is None:
+                stats['failed'] += 1
+            else:
+                stats['latencies'].append(seconds)
+
+    def complete(self, task, messages, priority='interactive', **overrides):
+        """Chat completion for ``task``; ``overrides`` replace its sampling settings"""
+        client = self.client
+        if client is None:
+            raise RuntimeError("Groq client not initialized")
+        started = time.perf_counter()
+        try:
+            response = llm_calls.complete(client, self.model(task), messages, priority=priority,
+                                          **self._settings(task, overrides))
+        except Exception:
+            self._record(task)
+            raise
+        self._record(task, time.perf_counter() - started)
+        return response
+
+    def stream(self, task, messages, priority='interactive', **overrides):
+        """Streamed chat completion chunks for ``task``"""
+        client = self.client
+        if client is None:
+            raise RuntimeError("Groq client not initialized")
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            for chunk in llm_calls.stream(client, self.model(task), messages, priority=priority,
+                                          **self._settings(task, overrides)):
+                yield chunk
+            succeeded = True
+        finally:
+            self._record(task, time.perf_counter() - started if succeeded else None)
+
+    def get_stats(self):
+        """LLM call layer metrics plus the gateway's per-task counts"""
+        stats = llm_calls.get_stats()
+        with self._lock:
+            tasks = {task: {'calls': values['calls'], 'failed': values['failed'],
+                            'p50_latency': round(percentile(list(values['latencies']), 50), 4)}
+                     for task, values in self._tasks.items()}
+        stats['gateway'] = {
+            'client_initialized': self._client is not None,
+            'client_init_seconds': round(self._init_seconds, 4) if self._init_seconds is not None else None,
+            'models': {task: settings['model'] for task, settings in TASKS.items()},
+            'tasks': tasks
+        }
+        return stats
+
+# Global instance
+llm_gateway = LLMGateway()
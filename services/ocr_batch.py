@@ -0,0 +1,119 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from services.ocr_service import ocr_service
+from services.ocr_image import OCRImage
+
+_HEADER = re.compile(r'^\s*ingredients?\s*[:\-]?\s*', re.IGNORECASE)
+_SEPARATORS = re.compile(r'[,;\n]+')
+_WORD = re.compile(r'[a-z0-9]+')
+
+def _normalize(text):
+    return ' '.join(_WORD.findall(text.lower()))
+
+def _completes_item(left, right):
+    """True when the one word repeated at the seam is a whole item of either text"""
+    left_item = len(left) == 1 or left[-2].endswith((',', ';'))
+    right_item = len(right) == 1 or right[0].endswith((',', ';'))
+    return left_item or right_item
+
+def _join_overlap(merged, text, min_overlap=2):
+    """Append ``text`` to ``merged``, dropping words already at the end of ``merged``.
+
+    Photos of a wrapped label usually repeat a few words at the seam; the
+    longest run of at least ``min_overlap`` words that ends ``merged`` and
+    starts ``text`` is kept once, with the punctuation ``text`` has for it.
+    A single repeated word only counts when it completes an item ('...,
+    Cocamidopropyl' + 'Cocamidopropyl Betaine, ...'). Texts that do not
+    overlap are joined as separate items.
+    """
+    left, right = merged.split(), text.split()
+    left_keys = [_normalize(word) for word in left]
+    right_keys = [_normalize(word) for word in right]
+    for size in range(min(len(left), len(right)), 0, -1):
+        if left_keys[-size:] != right_keys[:size]:
+            continue
+        if size >= min_overlap or (size == 1 and _completes_item(left, right)):
+            return ' '.join(left[:-size] + right)
+    return merged.rstrip(' ,;') + ', ' + text.lstrip(' ,;')
+
+def merge_ingredient_texts(texts):
+    """Merge OCR text from several photos into one de-duplicated ingredient list"""
+    merged = ''
+    for text in texts:
+        text = _HEADER.sub('', text or '').strip()
+        if text:
+            merged = _join_overlap(merged, text) if merged else text
+
+    items, seen = [], set()
+    for item in _SEPARATORS.split(merged):
+        item = _HEADER.sub('', item).strip(' .')
+        key = _normalize(item)
+        if key and key not in seen:
+            seen.add(key)
+            items.append(item)
+    return ', '.join(items)
+
+class OCRBatchProcessor:
+    """OCR several photos of one product concurrently and merge the text.
+
+    Images run on their own bounded executor (each image's passes still go
+    through the shared OCR worker pool), so a batch takes about as long as
+    its slowest image rather than the sum.
+    """
+
+    def __init__(self, workers=None, max_images=None):
+        self.workers = max(1, workers or Config.OCR_BATCH_WORKERS)
+        self.max_images = max(1, max_images or Config.OCR_BATCH_MAX_IMAGES)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr-batch')
+        return self._executor
+
+    @staticmethod
+    def _timed(image):
+        started = time.perf_counter()
+        try:
+            result = ocr_service.process_image(image)
+        except Exception as e:
+            result = {'success': False, 'error': f'OCR processing error: {e}', 'text': None}
+        return result, time.perf_counter() - started
+
+    def process(self, uploads):
+        """OCR ``[(filename, image_data)]`` and return the merged result with per-image timings"""
+        started = time.perf_counter()
+        images = [OCRImage(data) for _, data in uploads]
+        futures = [self._get_executor().submit(self._timed, image) for image in images]
+
+        per_image, texts = [], []
+        for (filename, _), future in zip(uploads, futures):
+            result, elapsed = future.result()
+            per_image.append({
+                'filename': filename,
+                'success': result['success'],
+                'error': result.get('error'),
+                'source': result.get('source'),
+                'cached': bool(result.get('cached')),
+                'ocr_time': round(elapsed, 3)
+            })
+            if result['success']:
+                texts.append(result['text'])
+
+        merged = merge_ingredient_texts(texts)
+        return {
+            'success': bool(merged),
+            'error': None if merged else 'No text could be extracted from any image',
+            'text': merged or None,
+            'images': per_image,
+            'total_time': round(time.perf_counter() - started, 3)
+        }
+
+# Global instance
+ocr_batch = OCRBatchProcessor()
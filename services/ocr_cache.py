@@ -0,0 +1,133 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from services.state_store import StateDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_results_accessed ON ocr_results (accessed_at);
+"""
+
+class OCRResultCache:
+    """Content-addressed OCR result cache.
+
+    A bounded in-memory LRU sits in front of a SQLite file in the shared
+    state directory, so all workers on the host share the disk tier.
+    Entries expire after ``ttl`` seconds; the disk tier is trimmed by
+    least-recent access once it grows past ``max_bytes``.
+    """
+
+    def __init__(self, memory_items=None, max_bytes=None, ttl=None, filename='ocr_cache.db'):
+        self.memory_items = memory_items or Config.OCR_CACHE_MEMORY_ITEMS
+        self.max_bytes = max_bytes or Config.OCR_CACHE_MAX_BYTES
+        self.ttl = ttl or Config.OCR_CACHE_TTL
+        self.db = StateDB(filename, SCHEMA)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(image_data, settings):
+        """Hash the uploaded bytes together with the settings that shape the output"""
+        digest = hashlib.sha256(image_data)
+        digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, key):
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return dict(entry[1])
+            if entry:
+                del self._memory[key]
+
+        try:
+            row = self.db.execute(
+                'SELECT result, created_at FROM ocr_results WHERE key = ?', (key,)
+            ).fetchone()
+            if row and row[1] + self.ttl > now:
+                self.db.execute('UPDATE ocr_results SET accessed_at = ? WHERE key = ?', (now, key))
+                result = json.loads(row[0])
+                self._remember(key, result, row[1] + self.ttl)
+                self._count('disk_hits')
+                return dict(result)
+        except Exception as e:
+            print(f"⚠️ OCR cache read failed: {e}")
+
+        self._count('misses')
+        return None
+
+    def _remember(self, key, result, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def set(self, key, result):
+        now = time.time()
+        payload = json.dumps(result)
+        self._remember(key, dict(result), now + self.ttl)
+
+        try:
+            with self.db.transaction() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO ocr_results (key, result, size, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, payload, len(payload), now, now)
+                )
+                self._evict(conn, now)
+            self._count('stores')
+        except Exception as e:
+            print(f"⚠️ OCR cache write failed: {e}")
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then least recently used rows beyond the size budget"""
+        evicted = conn.execute('DELETE FROM ocr_results WHERE created_at <= ?', (now - self.ttl,)).rowcount
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM ocr_results').fetchone()[0]
+        if total > self.max_bytes:
+            rows = conn.execute('SELECT key, size FROM ocr_results ORDER BY accessed_at').fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            conn.executemany('DELETE FROM ocr_results WHERE key = ?', stale)
+            evicted += len(stale)
+        if evicted:
+            self._count('evictions', evicted)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        try:
+            count, size = self.db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_results').fetchone()
+            stats['disk_entries'] = count
+            stats['disk_bytes'] = size
+        except Exception:
+            pass
+        return stats
+
+# Global instance
+ocr_cache = OCRResultCache()
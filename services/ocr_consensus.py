@@ -0,0 +1,103 @@
+import re
+
+_PUNCTUATION = re.compile(r'^\W+|\W+$')
+
+def _key(word):
+    """Alignment key: case and surrounding punctuation do not count as a mismatch"""
+    return _PUNCTUATION.sub('', word.lower()) or word
+
+def _tokens(reading):
+    """(word, weight) pairs of a reading; weights are Tesseract confidences in 0..1"""
+    words = reading.get('words') or []
+    if words:
+        return [(word, max(0.01, conf / 100.0)) for word, conf in words]
+    weight = max(0.01, reading.get('confidence', 0.0) / 100.0)
+    return [(word, weight) for word in (reading.get('text') or '').split()]
+
+def _align(pivot, hypothesis):
+    """Levenshtein alignment of two key lists as (pivot_index, hypothesis_index) pairs (None = gap)"""
+    rows, cols = len(pivot), len(hypothesis)
+    cost = [[0] * (cols + 1) for _ in range(rows + 1)]
+    for i in range(1, rows + 1):
+        cost[i][0] = i
+    for j in range(1, cols + 1):
+        cost[0][j] = j
+    for i in range(1, rows + 1):
+        for j in range(1, cols + 1):
+            cost[i][j] = min(cost[i - 1][j] + 1, cost[i][j - 1] + 1,
+                             cost[i - 1][j - 1] + (pivot[i - 1] != hypothesis[j - 1]))
+
+    pairs = []
+    i, j = rows, cols
+    while i or j:
+        if i and j and cost[i][j] == cost[i - 1][j - 1] + (pivot[i - 1] != hypothesis[j - 1]):
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif i and cost[i][j] == cost[i - 1][j] + 1:
+            pairs.append((i - 1, None))
+            i -= 1
+        else:
+            pairs.append((None, j - 1))
+            j -= 1
+    pairs.reverse()
+    return pairs
+
+def merge_readings(readings):
+    """Merge several OCR readings of one image into one consensus reading.
+
+    ROVER-style voting: the most confident reading is the pivot and every
+    other reading is aligned to it word by word. Each pivot position then
+    takes the spelling with the highest summed confidence, where a reading
+    that skips the word votes for dropping it with its mean confidence.
+    Words a reading inserts between pivot words are voted on the same way.
+    Returns {'text', 'words', 'confidence'} or None if nothing was read.
+    """
+    readings = [r for r in readings if r and _tokens(r)]
+    if not readings:
+        return None
+    if len(readings) == 1:
+        return readings[0]
+
+    readings.sort(key=lambda r: r.get('confidence', 0.0), reverse=True)
+    pivot_tokens = _tokens(readings[0])
+    pivot_keys = [_key(word) for word, _ in pivot_tokens]
+
+    # slots[k]: spelling -> weight for pivot word k; gaps[k]: inserted words before pivot word k
+    slots = [{word: weight} for word, weight in pivot_tokens]
+    gaps = [{(): readings[0].get('confidence', 0.0) / 100.0} for _ in range(len(pivot_tokens) + 1)]
+
+    for reading in readings[1:]:
+        tokens = _tokens(reading)
+        absent = max(0.01, reading.get('confidence', 0.0) / 100.0)
+        inserted = {}
+        position = 0
+        for pivot_index, index in _align(pivot_keys, [_key(word) for word, _ in tokens]):
+            if pivot_index is None:
+                inserted.setdefault(position, []).append(tokens[index])
+                continue
+            choice, weight = tokens[index] if index is not None else (None, absent)
+            slots[pivot_index][choice] = slots[pivot_index].get(choice, 0.0) + weight
+            position = pivot_index + 1
+
+        for gap in range(len(gaps)):
+            words = inserted.get(gap, [])
+            key = tuple(word for word, _ in words)
+            weight = sum(w for _, w in words) / len(words) if words else absent
+            gaps[gap][key] = gaps[gap].get(key, 0.0) + weight
+
+    merged = []
+    for position in range(len(pivot_tokens) + 1):
+        insertion, votes = max(gaps[position].items(), key=lambda item: item[1])
+        merged.extend((word, votes) for word in insertion)
+        if position < len(pivot_tokens):
+            word, votes = max(slots[position].items(), key=lambda item: item[1])
+            if word is not None:
+                merged.append((word, votes))
+
+    total = sum(max(0.01, r.get('confidence', 0.0) / 100.0) for r in readings)
+    words = [(word, min(100.0, 100.0 * votes / total)) for word, votes in merged]
+    return {
+        'text': ' '.join(word for word, _ in words),
+        'words': words,
+        'confidence': sum(conf for _, conf in words) / len(words) if words else 0.0
+    }
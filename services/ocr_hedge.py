@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError
+from config import Config
+from services.ocr_pool import percentile
+
+class HedgedOCR:
+    """Race OCR.Space against local Tesseract once OCR.Space is slow.
+
+    The remote call starts alone. If it has not answered within the hedge
+    delay (fixed, or the observed p90 of remote latency), the local engine
+    starts in parallel and the first successful result wins. A loser that
+    has not started yet is cancelled; a running one is left to finish and
+    its result is ignored. Local runs get their own executor so slow remote
+    calls filling the remote pool cannot hold back the hedge.
+
+    ``remote`` returns (result, sent); only calls that actually reached the
+    backend (``sent``) count towards the latency estimate, not instant
+    local refusals such as rate limiting or an open circuit.
+    """
+
+    DEFAULT_DELAY = 3.0  # Used until enough remote latencies have been observed
+    MIN_SAMPLES = 20
+
+    def __init__(self, hedge_delay=None, workers=None):
+        self.fixed_delay = Config.OCR_HEDGE_DELAY if hedge_delay is None else hedge_delay
+        self.workers = max(2, workers or Config.OCR_HEDGE_WORKERS)
+        self._executor = None
+        self._local_executor = None
+        self._lock = threading.Lock()
+        self._remote_latencies = deque(maxlen=200)
+        self._counters = {
+            'requests': 0, 'hedged': 0, 'remote_wins': 0, 'local_wins': 0,
+            'failed': 0, 'tail_saved_total': 0.0
+        }
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr-hedge')
+        return self._executor
+
+    def _get_local_executor(self):
+        if self._local_executor is None:
+            with self._lock:
+                if self._local_executor is None:
+                    self._local_executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                              thread_name_prefix='ocr-hedge-local')
+        return self._local_executor
+
+    def hedge_delay(self):
+        """Seconds to wait for OCR.Space before starting the local engine"""
+        if self.fixed_delay and self.fixed_delay > 0:
+            return self.fixed_delay
+        with self._lock:
+            if len(self._remote_latencies) < self.MIN_SAMPLES:
+                return self.DEFAULT_DELAY
+            return percentile(self._remote_latencies, 90)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def run(self, remote, local):
+        """Return (result, winner) where winner is 'remote', 'local' or None"""
+        executor = self._get_executor()
+        started = time.perf_counter()
+        self._count('requests')
+
+        def timed_remote():
+            result, sent = remote()
+            if sent:
+                with self._lock:
+                    self._remote_latencies.append(time.perf_counter() - started)
+            return result
+
+        remote_future = executor.submit(timed_remote)
+        try:
+            result = remote_future.result(timeout=self.hedge_delay())
+            if result.get('success'):
+                self._count('remote_wins')
+                return result, 'remote'
+            # Remote failed quickly: plain fallback, no race needed
+            local_result = local()
+            if local_result.get('success'):
+                self._count('local_wins')
+                return local_result, 'local'
+            self._count('failed')
+            return local_result, None
+        except TimeoutError:
+            pass
+
+        # OCR.Space is slow: hedge with the local engine
+        self._count('hedged')
+        print(f"🏇 OCR.Space slower than {self.hedge_delay():.1f}s, racing local Tesseract")
+        local_future = self._get_local_executor().submit(local)
+        pending = {remote_future: 'remote', local_future: 'local'}
+        last_result = None
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'success': False, 'error': f'{name} OCR error: {e}', 'text': None}
+                last_result = result
+                if result.get('success'):
+                    won_at = time.perf_counter()
+                    self._count(f'{name}_wins')
+                    if name == 'local':
+                        # A remote call still queued is dropped so it spends no quota or rate tokens
+                        if not remote_future.cancel():
+                            remote_future.add_done_callback(
+                                lambda _: self._count('tail_saved_total', time.perf_counter() - won_at)
+                            )
+                    else:
+                        local_future.cancel()  # Only succeeds if it has not started yet
+                    return result, name
+
+        self._count('failed')
+        return last_result, None
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['hedge_delay'] = round(self.hedge_delay(), 3)
+        local_wins = stats['local_wins']
+        stats['avg_tail_saved'] = round(stats['tail_saved_total'] / local_wins, 3) if local_wins else 0.0
+        stats['tail_saved_total'] = round(stats['tail_saved_total'], 3)
+        return stats
+
+# Global instance
+ocr_hedge = HedgedOCR()
@@ -0,0 +1,114 @@
+import io
+import threading
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+class OCRImage:
+    """An uploaded image read into one buffer and decoded at most once.
+
+    Every OCR stage (cache keys, perceptual hash, OCR.Space upload, local
+    Tesseract) shares the same bytes object and the same decoded grayscale
+    array. Only grayscale is ever decoded, since nothing downstream needs
+    color. Named scratch buffers let preprocessing write thresholds into
+    preallocated arrays instead of allocating fresh ones per pass.
+    """
+
+    def __init__(self, data):
+        self.data = bytes(data)  # No-op for bytes; one copy for bytearray/memoryview
+        self._gray = None
+        self._decoded = False
+        self._scratch = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_upload(cls, image_file):
+        """Wrap an upload (or pass an existing OCRImage through)"""
+        if isinstance(image_file, cls):
+            return image_file
+        image_file.seek(0)
+        return cls(image_file.read())
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def gray(self):
+        """Grayscale decode of the upload (None if it is not a readable image)"""
+        if not self._decoded:
+            with self._lock:
+                if not self._decoded:
+                    self._gray = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_GRAYSCALE)
+                    self._decoded = True
+        return self._gray
+
+    def scratch(self, name, shape):
+        """Preallocated uint8 buffer reused by the preprocessing stage called ``name``"""
+        with self._lock:
+            buffer = self._scratch.get(name)
+            if buffer is None or buffer.shape != tuple(shape):
+                buffer = np.empty(shape, np.uint8)
+                self._scratch[name] = buffer
+            return buffer
+
+    def release(self):
+        """Drop the decoded pixels and scratch buffers once OCR is finished"""
+        with self._lock:
+            self._gray = None
+            self._decoded = False
+            self._scratch.clear()
+
+_MIMETYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'GIF': 'image/gif', 'BMP': 'image/bmp',
+              'TIFF': 'image/tiff', 'WEBP': 'image/webp'}
+
+def prepare_upload(data, max_edge, max_bytes, quality=85):
+    """Shrink an upload for a remote OCR API: returns {'data', 'mimetype', 'filename', 'bytes_in', 'bytes_out'}.
+
+    JPEGs are decoded in draft mode (the decoder skips detail below the
+    target scale), EXIF rotation is applied, and the grayscale image is
+    downscaled to ``max_edge`` and re-encoded, lowering JPEG quality and
+    then size until it fits ``max_bytes``. Screenshots (PNG/GIF/BMP) may
+    stay PNG, which keeps text edges sharp. The original bytes are sent
+    when re-encoding would not make them smaller.
+    """
+    source = Image.open(io.BytesIO(data))
+    source_format = source.format or 'PNG'
+    if source_format == 'JPEG':
+        source.draft('L', (max_edge, max_edge))
+    image = ImageOps.exif_transpose(source).convert('L')
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    def encode(img, fmt, q=None):
+        buffer = io.BytesIO()
+        if fmt == 'JPEG':
+            img.save(buffer, format='JPEG', quality=q, optimize=True)
+        else:
+            img.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+
+    candidates = [(encode(image, 'JPEG', quality), 'JPEG')]
+    if source_format in ('PNG', 'GIF', 'BMP'):
+        candidates.append((encode(image, 'PNG'), 'PNG'))
+    encoded, fmt = min(candidates, key=lambda c: len(c[0]))
+
+    while len(encoded) > max_bytes:
+        if fmt == 'JPEG' and quality > 45:
+            quality -= 15
+        else:
+            image = image.resize((max(1, image.width * 3 // 4), max(1, image.height * 3 // 4)), Image.LANCZOS)
+            fmt = 'JPEG'
+        encoded = encode(image, 'JPEG', quality)
+
+    if len(encoded) >= len(data) and len(data) <= max_bytes and source_format in _MIMETYPES:
+        encoded, fmt = data, source_format
+
+    extension = 'jpg' if fmt == 'JPEG' else fmt.lower()
+    return {
+        'data': encoded,
+        'mimetype': _MIMETYPES.get(fmt, 'application/octet-stream'),
+        'filename': f'ingredients.{extension}',
+        'bytes_in': len(data),
+        'bytes_out': len(encoded)
+    }
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from services.state_store import StateDB
+from services.ocr_pool import percentile
+from services.ocr_service import ocr_service
+from services.ocr_image import OCRImage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_jobs (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_jobs_created ON ocr_jobs (created_at);
+"""
+
+class OCRJobQueue:
+    """Background OCR jobs so upload requests do not hold a web worker.
+
+    Jobs run on a bounded local thread pool; submissions beyond
+    ``max_pending`` are rejected instead of queueing without limit. Job
+    state lives in the shared state directory, so a status poll answered
+    by any gunicorn worker sees the result.
+    """
+
+    def __init__(self, workers=None, max_pending=None, ttl=None, timeout=None, filename='ocr_jobs.db'):
+        self.workers = max(1, workers or Config.OCR_JOB_WORKERS)
+        self.max_pending = max(1, max_pending or Config.OCR_JOB_MAX_PENDING)
+        self.ttl = ttl or Config.OCR_JOB_TTL
+        self.timeout = timeout or Config.OCR_JOB_TIMEOUT
+        self.db = StateDB(filename, SCHEMA)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+        self._recent_waits = deque(maxlen=500)
+        self._recent_runs = deque(maxlen=500)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr-job')
+        return self._executor
+
+    def submit(self, user_id, image_data):
+        """Queue an OCR job and return its id, or None when the queue is full"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counters['rejected'] += 1
+                return None
+            self._pending += 1
+            self._counters['submitted'] += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            with self.db.transaction() as conn:
+                conn.execute('DELETE FROM ocr_jobs WHERE created_at < ?', (now - self.ttl,))
+                conn.execute(
+                    'INSERT INTO ocr_jobs (id, user_id, status, created_at) VALUES (?, ?, ?, ?)',
+                    (job_id, user_id, 'queued', now)
+                )
+            self._get_executor().submit(self._run, job_id, image_data, now)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id, image_data, created_at):
+        started_at = time.time()
+        try:
+            self.db.execute('UPDATE ocr_jobs SET status = ?, started_at = ? WHERE id = ?',
+                            ('running', started_at, job_id))
+            result = ocr_service.process_image(OCRImage(image_data))
+        except Exception as e:
+            print(f"❌ OCR job {job_id} crashed: {e}")
+            result = {'success': False, 'error': f'OCR processing error: {e}', 'text': None}
+
+        finished_at = time.time()
+        status = 'done' if result.get('success') else 'failed'
+        try:
+            self.db.execute(
+                'UPDATE ocr_jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?',
+                (status, json.dumps(result), finished_at, job_id)
+            )
+        except Exception as e:
+            print(f"❌ Could not store OCR job {job_id}: {e}")
+
+        with self._lock:
+            self._pending -= 1
+            self._counters['completed' if status == 'done' else 'failed'] += 1
+            self._recent_waits.append(started_at - created_at)
+            self._recent_runs.append(finished_at - started_at)
+
+    def get(self, job_id, user_id):
+        """Return the job's status and result if it belongs to ``user_id``"""
+        row = self.db.execute(
+            'SELECT status, result, created_at, started_at, finished_at FROM ocr_jobs WHERE id = ? AND user_id = ?',
+            (job_id, user_id)
+        ).fetchone()
+        if not row:
+            return None
+
+        status, result, created_at, started_at, finished_at = row
+        job = {
+            'job_id': job_id,
+            'status': status,
+            'queue_wait': round((started_at or time.time()) - created_at, 3),
+            'result': json.loads(result) if result else None
+        }
+        if finished_at and started_at:
+            job['ocr_time'] = round(finished_at - started_at, 3)
+
+        # A worker that died mid-job never reports back
+        if status in ('queued', 'running') and time.time() - created_at > self.timeout:
+            job['status'] = 'failed'
+            job['result'] = {'success': False, 'error': 'OCR job timed out', 'text': None}
+        return job
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['queue_depth'] = self._pending
+            stats['max_pending'] = self.max_pending
+            stats['workers'] = self.workers
+            stats['p50_queue_wait'] = percentile(self._recent_waits, 50)
+            stats['p90_queue_wait'] = percentile(self._recent_waits, 90)
+            stats['p90_ocr_time'] = percentile(self._recent_runs, 90)
+        return stats
+
+# Global instance
+ocr_jobs = OCRJobQueue()
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import Config
+
+class OCRWorkerPool:
+    """Process-wide worker pool that runs OCR candidates concurrently.
+
+    Tesseract runs outside the GIL (a subprocess for pytesseract, native code
+    for OpenCV), so threads are enough to spread the passes across cores.
+    The pool size is the global concurrency budget; each request is further
+    capped so one upload cannot take every worker.
+    """
+
+    def __init__(self, max_workers=None, per_request_limit=None):
+        self.max_workers = max(1, max_workers or Config.OCR_POOL_SIZE)
+        self.per_request_limit = max(1, per_request_limit or Config.OCR_MAX_PARALLEL_PER_REQUEST)
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # Timing metrics: queue wait (submitted -> started) vs OCR time (started -> finished)
+        self._stats_lock = threading.Lock()
+        self._task_count = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_wait = 0.0
+        self._recent_waits = deque(maxlen=500)
+        self._recent_runs = deque(maxlen=500)
+
+    def _get_executor(self):
+        """Create the executor on first use so forked workers never inherit threads"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='ocr-worker'
+                    )
+                    print(f"🧵 OCR worker pool started with {self.max_workers} workers")
+        return self._executor
+
+    def _timed(self, task, submitted_at):
+        """Wrap a task so queue wait and run time are recorded"""
+        def runner():
+            started_at = time.perf_counter()
+            try:
+                return task()
+            finally:
+                finished_at = time.perf_counter()
+                self._record(started_at - submitted_at, finished_at - started_at)
+        return runner
+
+    def _record(self, wait_time, run_time):
+        with self._stats_lock:
+            self._task_count += 1
+            self._total_wait += wait_time
+            self._total_run += run_time
+            self._max_wait = max(self._max_wait, wait_time)
+            self._recent_waits.append(wait_time)
+            self._recent_runs.append(run_time)
+
+    def run(self, tasks, limit=None):
+        """Run callables concurrently and return their results in input order.
+
+        At most ``limit`` (default: the per-request limit) tasks of this call are
+        in flight at once; the rest are submitted as earlier ones finish.
+        Exceptions raised by a task are re-raised here.
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+
+        limit = max(1, min(limit or self.per_request_limit, self.max_workers))
+        executor = self._get_executor()
+        results = [None] * len(tasks)
+        pending = {}
+        next_index = 0
+
+        while next_index < len(tasks) or pending:
+            # Keep the per-request window full
+            while next_index < len(tasks) and len(pending) < limit:
+                task = self._timed(tasks[next_index], time.perf_counter())
+                pending[executor.submit(task)] = next_index
+                next_index += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+
+        return results
+
+    def get_stats(self):
+        """Return queue wait versus OCR time metrics (seconds)"""
+        with self._stats_lock:
+            count = self._task_count
+            return {
+                'pool_size': self.max_workers,
+                'per_request_limit': self.per_request_limit,
+                'tasks': count,
+                'avg_queue_wait': self._total_wait / count if count else 0.0,
+                'avg_ocr_time': self._total_run / count if count else 0.0,
+                'max_queue_wait': self._max_wait,
+                'p90_queue_wait': percentile(self._recent_waits, 90),
+                'p90_ocr_time': percentile(self._recent_runs, 90)
+            }
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a small sample"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+# Global instance
+ocr_pool = OCRWorkerPool()
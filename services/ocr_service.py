@@ -6,25 +6,112 @@ import io
 import cv2
 import numpy as np
 import os
+import threading
 from config import Config
+from services.ocr_pool import ocr_pool
+from services.tesseract_engine import create_engine
+from services.ocr_cache import ocr_cache
+from services.phash_index import phash_index, dhash, settings_key
+from services.ocr_strategy import ocr_path_stats, ingredient_score
+from services.text_region import locate_text_region, crop_region
+from services.ocr_image import OCRImage, prepare_upload
+from services.rate_limiter import SharedTokenBucket, DailyQuota
+from services.circuit_breaker import CircuitBreaker
+from services.ocr_hedge import ocr_hedge
+from services.tesseract_probe import probe_tesseract
+from services.ocr_consensus import merge_readings
+from services.spell_correction import spell_checker
+from requests.adapters import HTTPAdapter
+import json
+
+def _fresh(name):
+    """Scratch provider that lets OpenCV allocate new output arrays"""
+    return None
 
 class OCRService:
     def __init__(self):
         # Get API key from environment variables via Config with proper error handling
         self.api_key = getattr(Config, 'OCR_SPACE_API_KEY', None)
-        self.endpoint = 'https://api.ocr.space/parse/image'
-        self.last_request_time = 0
-        self.min_interval = 1  # 1 second between requests
-        self.request_count = 0
-        self.daily_limit = 25000  # OCR.Space free tier limit
+        self.endpoint = getattr(Config, 'OCR_SPACE_ENDPOINT', 'https://api.ocr.space/parse/image')
+        self.daily_limit = getattr(Config, 'OCR_SPACE_DAILY_LIMIT', 25000)  # OCR.Space free tier limit
+        self.throttled_count = 0
         
-        # Configure Tesseract OCR to use files from tesseract-OCR folder
-        self.tesseract_available = self._setup_tesseract()
+        # Rate limit and daily quota shared by all workers; never sleeps
+        self.rate_limiter = SharedTokenBucket('ocr.space', getattr(Config, 'OCR_SPACE_RATE', 1.0),
+                                              getattr(Config, 'OCR_SPACE_BURST', 1))
+        self.daily_quota = DailyQuota('ocr.space', self.daily_limit)
         
-        print(f"🔑 OCR Service initialized with API key: {self.api_key[:8] if self.api_key else 'NOT SET'}...")
-        if self.tesseract_available:
-            print("🔤 Tesseract OCR fallback available")
+        # Skip OCR.Space entirely while it is failing (state shared by all workers)
+        self.breaker = CircuitBreaker('ocr.space')
+        
+        # Upload shrinking metrics (this worker only)
+        self.shrink_uploads = getattr(Config, 'OCR_SPACE_SHRINK', True)
+        self._upload_lock = threading.Lock()
+        self._upload_stats = {'uploads': 0, 'bytes_in': 0, 'bytes_sent': 0, 'prepare_time': 0.0, 'request_time': 0.0}
+        
+        # Keep-alive connection pool for OCR.Space
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=getattr(Config, 'OCR_SPACE_POOL_SIZE', 10))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.execution_mode = getattr(Config, 'OCR_EXECUTION_MODE', 'parallel')
+        self.cache_enabled = getattr(Config, 'OCR_CACHE_ENABLED', True)
+        self.phash_enabled = getattr(Config, 'OCR_PHASH_ENABLED', True)
+        self.strategy = getattr(Config, 'OCR_STRATEGY', 'adaptive')
+        self.region_detection = getattr(Config, 'OCR_REGION_DETECTION', True)
+        self.hedge_enabled = getattr(Config, 'OCR_HEDGE_ENABLED', True)
+        self.merge_mode = getattr(Config, 'OCR_MERGE_MODE', 'consensus')
+        self.spell_correction = getattr(Config, 'OCR_SPELL_CORRECTION', True)
         
+        # Tesseract is probed and its engine built on first use, not at import
+        self._tesseract_lock = threading.Lock()
+        self._tesseract_ready = False
+        self._tesseract_available = False
+        self._engine = None
+        
+        print(f"🔑 OCR Service initialized with API key: {self.api_key[:8] if self.api_key else 'NOT SET'}...")
+    
+    def _ensure_tesseract(self):
+        """Probe Tesseract and build the engine once, on first OCR use"""
+        if self._tesseract_ready:
+            return
+        with self._tesseract_lock:
+            if self._tesseract_ready:
+                return
+            started = time.perf_counter()
+            
+            # Configure Tesseract OCR to use files from tesseract-OCR folder
+            available = self._setup_tesseract()
+            
+            # Tesseract backend: warm in-process engine pool, or pytesseract subprocesses
+            self._engine = create_engine(tessdata_path=os.environ.get('TESSDATA_PREFIX'))
+            if self._engine.name != 'pytesseract':
+                available = True
+            
+            self._tesseract_available = available
+            self._tesseract_ready = True
+            if available:
+                print(f"🔤 Tesseract OCR fallback available ({time.perf_counter() - started:.2f}s to initialize)")
+    
+    @property
+    def tesseract_available(self):
+        self._ensure_tesseract()
+        return self._tesseract_available
+    
+    @property
+    def engine(self):
+        self._ensure_tesseract()
+        return self._engine
+    
+    def warm_up(self):
+        """Initialize Tesseract, the spell correction index and engine handles ahead of the first request"""
+        self._ensure_tesseract()
+        if self.spell_correction:
+            spell_checker.warm_up()
+        if self._tesseract_available:
+            self._engine.warm_up()
+        return self._tesseract_available
+    
     def _setup_tesseract(self):
         """Setup Tesseract OCR to use files from tesseract-OCR folder"""
         try:
@@ -92,16 +179,12 @@ class OCRService:
                 else:
                     print("⚠️ Tessdata folder not found in Tesseract directory")
             
-            # Get Tesseract version to verify setup
-            version = pytesseract.get_tesseract_version()
-            print(f"✅ Tesseract OCR initialized: {version}")
-            
-            # List available languages
-            try:
-                languages = pytesseract.get_languages()
-                print(f"🔤 Available languages: {languages}")
-            except:
-                print("⚠️ Could not list available languages")
+            # Verify setup (version and languages are cached per binary)
+            probe = probe_tesseract()
+            if not probe:
+                raise RuntimeError(f"tesseract executable not found ({pytesseract.pytesseract.tesseract_cmd})")
+            print(f"✅ Tesseract OCR initialized: {probe['version']}" + (" (cached probe)" if probe['cached'] else ""))
+            print(f"🔤 Available languages: {probe['languages']}")
             
             return True
             
@@ -136,7 +219,7 @@ class OCRService:
             except Exception as e:
                 print(f"❌ Error downloading Tesseract files: {e}")
     
-    def _tesseract_fallback(self, image_file):
+    def _tesseract_fallback(self, image):
         """Fallback OCR using Tesseract OCR"""
         if not self.tesseract_available:
             return {
@@ -148,39 +231,65 @@ class OCRService:
         try:
             print("🔄 Trying Tesseract OCR fallback...")
             
-            # Read and process image
-            image_data = image_file.read()
+            # Decoded once per upload and shared with the perceptual hash stage
+            gray = image.gray
             
-            # Convert to numpy array for OpenCV processing
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is None:
+            if gray is None:
                 return {
                     'success': False,
                     'error': 'Unable to read image file',
                     'text': None
                 }
             
-            print(f"📷 Image loaded: {image.shape[1]}x{image.shape[0]}")
+            print(f"📷 Image loaded: {gray.shape[1]}x{gray.shape[0]}")
+            
+            # Crop to the ingredient text block so every pass sees far fewer pixels
+            region = None
+            if self.region_detection:
+                gray, region = self._crop_to_text(gray)
             
-            # Preprocess image for better OCR results
-            processed_image = self._preprocess_image(image)
+            # Thresholds are written into buffers preallocated for this image
+            def scratch(name):
+                return image.scratch(name, gray.shape)
             
-            # Perform OCR with different configurations
-            extracted_text = self._extract_text_with_tesseract(processed_image)
+            reading = None
+            if self.strategy == 'adaptive':
+                # Stop at the first confident, ingredient-like read
+                reading = self._adaptive_extract(gray, scratch)
+                extracted_text = reading['text'] if reading else ''
+            else:
+                # Preprocess image for better OCR results
+                processed_image, psm6_reading = self._preprocess_image(gray, scratch)
+                
+                # Perform OCR with different configurations
+                extracted_text = self._extract_text_with_tesseract(processed_image, psm6_reading)
             
             # Clean and validate the extracted text
             cleaned_text = self._clean_text(extracted_text)
             
+            # Fix OCR misreads of known ingredient words (adaptive reads are corrected as they are ranked)
+            spell_confidence = reading.get('spell_confidence') if reading else None
+            if self.spell_correction and not reading and cleaned_text != "No text detected in image.":
+                correction = spell_checker.correct(cleaned_text)
+                cleaned_text = correction['text']
+                spell_confidence = correction['confidence']
+            
             if cleaned_text and cleaned_text != "No text detected in image.":
                 print(f"✅ Tesseract OCR successful! Extracted {len(cleaned_text)} characters")
                 print(f"📋 Preview: {cleaned_text[:100]}...")
-                return {
+                result = {
                     'success': True,
                     'text': cleaned_text,
                     'source': 'tesseract'
                 }
+                if reading:
+                    result['ocr_path'] = reading['path']
+                    result['confidence'] = round(reading['confidence'], 1)
+                if region:
+                    result['region'] = region
+                if spell_confidence is not None:
+                    result['spell_confidence'] = round(spell_confidence, 3)
+                return result
             else:
                 print("❌ No text extracted with Tesseract OCR")
                 return {
@@ -198,12 +307,32 @@ class OCRService:
                 'text': None
             }
     
-    def _preprocess_image(self, image):
-        """Preprocess image to improve Tesseract OCR accuracy"""
+    def _crop_to_text(self, gray):
+        """Crop and deskew to the detected text block; returns (image, region or None)"""
+        try:
+            region = locate_text_region(gray)
+            if region:
+                cropped = crop_region(gray, region)
+                print(f"✂️ Text region {region['w']}x{region['h']} at ({region['x']}, {region['y']}), "
+                      f"skew {region['angle']}° - {gray.size / float(cropped.size):.1f}x fewer pixels")
+                return cropped, region
+        except Exception as e:
+            print(f"⚠️ Text region detection failed, using full image: {e}")
+        return gray, None
+    
+    def _run_candidates(self, tasks):
+        """Run OCR candidate tasks on the worker pool or one after another"""
+        if self.execution_mode == 'parallel':
+            return ocr_pool.run(tasks)
+        return [task() for task in tasks]
+    
+    def _preprocess_image(self, gray, scratch=_fresh):
+        """Preprocess image to improve Tesseract OCR accuracy.
+        
+        Returns the best processed image and its '--psm 6' reading so the
+        extraction pass does not have to recompute it.
+        """
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
             # Apply different preprocessing techniques
             techniques = [
                 self._basic_preprocessing,
@@ -211,87 +340,169 @@ class OCRService:
                 self._adaptive_threshold
             ]
             
-            best_text = ""
+            def make_task(technique):
+                def task():
+                    try:
+                        processed = technique(gray, scratch)
+                        return processed, self.engine.recognize(processed, psm=6)
+                    except Exception as e:
+                        print(f"⚠️ Preprocessing technique failed: {e}")
+                        return None
+                return task
+            
+            best_reading = None
             best_image = gray
             
             # Try different preprocessing techniques and keep the best one
-            for technique in techniques:
-                try:
-                    processed = technique(gray.copy())
-                    text = pytesseract.image_to_string(processed, config='--psm 6')
-                    if len(text.strip()) > len(best_text):
-                        best_text = text.strip()
-                        best_image = processed
-                except Exception as e:
-                    print(f"⚠️ Preprocessing technique failed: {e}")
-                    continue
+            for candidate in self._run_candidates([make_task(t) for t in techniques]):
+                if candidate and len(candidate[1]['text']) > len(best_reading['text'] if best_reading else ''):
+                    best_image, best_reading = candidate
             
-            return best_image
+            return best_image, best_reading
             
         except Exception as e:
             print(f"⚠️ Image preprocessing failed, using original: {e}")
-            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            return gray, None
     
-    def _basic_preprocessing(self, gray):
+    def _adaptive_extract(self, gray, scratch=_fresh):
+        """Run OCR paths in learned order, stopping once a read is good enough.
+        
+        A path is a preprocessing technique plus a PSM. The historically best
+        path runs alone first; if its read is not accepted, the next paths run
+        in parallel batches until one is accepted or the pass budget is spent.
+        Returns the best reading (text, words, confidence, path) or None.
+        """
+        techniques = {
+            'basic': self._basic_preprocessing,
+            'advanced': self._advanced_preprocessing,
+            'adaptive': self._adaptive_threshold
+        }
+        processed = {}
+        # Paths sharing a technique run in parallel; one lock per technique makes them share one buffer
+        locks = {name: threading.Lock() for name in techniques}
+        
+        def get_processed(name):
+            with locks[name]:
+                if name not in processed:
+                    processed[name] = techniques[name](gray, scratch)
+                return processed[name]
+        
+        def make_task(path):
+            def task():
+                technique, psm = path.split('/psm')
+                try:
+                    reading = self.engine.recognize(get_processed(technique), psm=int(psm))
+                    reading['path'] = path
+                    if self.spell_correction:
+                        correction = spell_checker.correct(reading['text'])
+                        reading['text'] = correction['text']
+                        reading['spell_confidence'] = correction['confidence']
+                    reading['score'] = ingredient_score(reading['text'])
+                    return reading
+                except Exception as e:
+                    print(f"⚠️ OCR path {path} failed: {e}")
+                    return None
+            return task
+        
+        paths = ocr_path_stats.order([f'{t}/psm{psm}' for psm in (6, 4, 11, 13, 8) for t in techniques])
+        budget = min(len(paths), Config.OCR_ADAPTIVE_MAX_PASSES)
+        batch_size = 1
+        attempted = []
+        best = None
+        accepted = False
+        
+        while len(attempted) < budget:
+            batch = paths[len(attempted):min(budget, len(attempted) + batch_size)]
+            attempted.extend(batch)
+            
+            for reading in self._run_candidates([make_task(path) for path in batch]):
+                if reading and reading['text'] and (best is None or self._rank(reading) > self._rank(best)):
+                    best = reading
+            
+            # A read made of known ingredient words is good enough even if Tesseract was unsure of it
+            confident = best and (best['confidence'] >= Config.OCR_MIN_CONFIDENCE or
+                                  best.get('spell_confidence', 0.0) >= Config.OCR_SPELL_MIN_CONFIDENCE)
+            if confident and best['score'] >= Config.OCR_MIN_INGREDIENT_SCORE:
+                accepted = True
+                break
+            
+            if self.execution_mode == 'parallel':
+                batch_size = ocr_pool.per_request_limit
+        
+        ocr_path_stats.record(attempted, best['path'] if best else None, accepted)
+        if best:
+            print(f"🏁 OCR path {best['path']} won after {len(attempted)} pass(es) "
+                  f"(confidence {best['confidence']:.0f}, ingredient score {best['score']})")
+        return best
+    
+    @staticmethod
+    def _rank(reading):
+        """Combined quality of a reading: word confidence times ingredient-likeness"""
+        return reading['confidence'] / 100.0 * reading['score']
+    
+    def _basic_preprocessing(self, gray, scratch=_fresh):
         """Basic preprocessing: noise removal and thresholding"""
         # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0, dst=scratch('basic.blur'))
         
         # Apply Otsu's thresholding
-        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                                  dst=scratch('basic.thresh'))
         
         return thresh
     
-    def _advanced_preprocessing(self, gray):
+    def _advanced_preprocessing(self, gray, scratch=_fresh):
         """Advanced preprocessing for difficult images"""
         # Apply median blur to preserve edges while removing noise
-        blurred = cv2.medianBlur(gray, 3)
+        blurred = cv2.medianBlur(gray, 3, dst=scratch('advanced.blur'))
         
         # Apply morphological operations to clean up the image
         kernel = np.ones((2, 2), np.uint8)
-        morphed = cv2.morphologyEx(blurred, cv2.MORPH_CLOSE, kernel)
+        morphed = cv2.morphologyEx(blurred, cv2.MORPH_CLOSE, kernel, dst=scratch('advanced.morph'))
         
         # Adaptive thresholding
         thresh = cv2.adaptiveThreshold(morphed, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, 11, 2)
+                                     cv2.THRESH_BINARY, 11, 2, dst=scratch('advanced.thresh'))
         
         return thresh
     
-    def _adaptive_threshold(self, gray):
+    def _adaptive_threshold(self, gray, scratch=_fresh):
         """Adaptive thresholding for varying lighting conditions"""
         return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                   cv2.THRESH_BINARY, 11, 2)
+                                   cv2.THRESH_BINARY, 11, 2, dst=scratch('adaptive.thresh'))
     
-    def _extract_text_with_tesseract(self, image):
-        """Extract text using multiple Tesseract configurations"""
+    def _extract_text_with_tesseract(self, image, psm6_reading=None, merge_mode=None):
+        """Extract text using multiple Tesseract configurations and merge the readings"""
         configurations = [
-            '--psm 6',  # Uniform block of text
-            '--psm 4',  # Single column of text
-            '--psm 8',  # Single word
-            '--psm 13', # Raw line
-            '--psm 11', # Sparse text
+            (6, None),   # Uniform block of text
+            (4, None),   # Single column of text
+            (8, None),   # Single word
+            (13, None),  # Raw line
+            (11, None),  # Sparse text
+            (6, 'eng'),  # English language specifically
         ]
         
-        all_text = []
+        def make_task(psm, lang):
+            def task():
+                # The preprocessing pass already ran '--psm 6' on this image
+                if (psm, lang) == (6, None) and psm6_reading:
+                    return psm6_reading
+                try:
+                    return self.engine.recognize(image, psm=psm, lang=lang)
+                except Exception as e:
+                    print(f"⚠️ Tesseract config --psm {psm} failed: {e}")
+                    return None
+            return task
         
-        for config in configurations:
-            try:
-                text = pytesseract.image_to_string(image, config=config)
-                if text.strip():
-                    all_text.append(text.strip())
-            except Exception as e:
-                print(f"⚠️ Tesseract config {config} failed: {e}")
-                continue
+        readings = [r for r in self._run_candidates([make_task(*c) for c in configurations]) if r and r['text']]
         
-        # Also try with English language specifically
-        try:
-            text_eng = pytesseract.image_to_string(image, config='--psm 6 -l eng')
-            if text_eng.strip():
-                all_text.append(text_eng.strip())
-        except:
-            pass
+        # One consensus transcript, voted word by word across the readings
+        if (merge_mode or self.merge_mode) == 'consensus':
+            merged = merge_readings(readings)
+            return merged['text'] if merged else ''
         
         # Combine all results, remove duplicates while preserving order
+        all_text = [r['text'] for r in readings]
         seen = set()
         unique_text = []
         for text in all_text:
@@ -326,8 +537,19 @@ class OCRService:
         
         return cleaned_text if cleaned_text else "No text detected in image."
     
-    def _ocr_space_primary(self, image_file):
+    def _ocr_space_primary(self, image):
         """Primary OCR using OCR.Space API"""
+        return self._ocr_space_refusal() or self._ocr_space_request(image)
+    
+    def _ocr_space_sent(self, image):
+        """(result, sent) where sent is False if the call was refused without reaching OCR.Space"""
+        refusal = self._ocr_space_refusal()
+        if refusal:
+            return refusal, False
+        return self._ocr_space_request(image), True
+    
+    def _ocr_space_refusal(self):
+        """Error result if OCR.Space must not be called right now, else None"""
         # Check if API key is available
         if not self.api_key:
             print("❌ OCR.Space API key not configured")
@@ -337,16 +559,46 @@ class OCRService:
                 'text': None
             }
         
+        # Breaker first so an open circuit costs no quota or rate tokens
+        if not self.breaker.allow_request():
+            print("🔌 OCR.Space circuit open, skipping to Tesseract")
+            return {
+                'success': False,
+                'error': 'OCR.Space temporarily unavailable',
+                'text': None
+            }
+        
+        # From here on, every refusal hands back a half-open probe the breaker may have granted
+        if not self.daily_quota.try_consume():
+            self.breaker.release_probe()
+            self.throttled_count += 1
+            print(f"⏳ OCR.Space daily limit of {self.daily_limit} requests reached")
+            return {
+                'success': False,
+                'error': 'OCR.Space daily limit reached',
+                'text': None
+            }
+        
+        # Rate limiting: when the shared bucket is empty go straight to Tesseract instead of waiting
+        if not self.rate_limiter.try_acquire():
+            self.daily_quota.refund()
+            self.breaker.release_probe()
+            self.throttled_count += 1
+            print("⏳ OCR.Space rate limit reached, skipping to Tesseract")
+            return {
+                'success': False,
+                'error': 'OCR.Space rate limit reached',
+                'text': None
+            }
+        return None
+    
+    def _ocr_space_request(self, image):
+        """Send the upload to OCR.Space and parse its answer"""
+        recorded = False
         try:
-            # Rate limiting
-            current_time = time.time()
-            time_since_last = current_time - self.last_request_time
-            if time_since_last < self.min_interval:
-                sleep_time = self.min_interval - time_since_last
-                time.sleep(sleep_time)
-            
-            # Read image data
-            image_data = image_file.read()
+            # Downscaled copy for the upload; cache keys still use the original bytes
+            upload = self._prepare_upload(image)
+            image_data = upload['data']
             file_size = len(image_data)
             
             print(f"📦 Processing OCR - Size: {file_size} bytes")
@@ -362,26 +614,39 @@ class OCRService:
             }
             
             files = {
-                'image': ('ingredients.png', image_data, 'image/png')
+                'image': (upload['filename'], image_data, upload['mimetype'])
             }
             
             print(f"🌐 Sending to OCR.Space... (Size: {file_size} bytes)")
             
             # Send request
-            response = requests.post(
-                self.endpoint, 
-                files=files, 
-                data=payload, 
-                timeout=30
-            )
-            
-            self.last_request_time = time.time()
+            started = time.perf_counter()
+            recorded = True
+            try:
+                response = self.session.post(
+                    self.endpoint, 
+                    files=files, 
+                    data=payload, 
+                    timeout=30
+                )
+                result = response.json() if response.status_code == 200 else None
+            except Exception:
+                self.breaker.record(False, time.perf_counter() - started)
+                raise
+            request_time = time.perf_counter() - started
+            # Healthy only if OCR.Space answered with a parsed result it did not flag as failed
+            self.breaker.record(isinstance(result, dict) and not result.get('IsErroredOnProcessing'), request_time)
+            with self._upload_lock:
+                self._upload_stats['uploads'] += 1
+                self._upload_stats['bytes_in'] += upload['bytes_in']
+                self._upload_stats['bytes_sent'] += upload['bytes_out']
+                self._upload_stats['prepare_time'] += upload['prepare_time']
+                self._upload_stats['request_time'] += request_time
+            print(f"⏱️ OCR.Space answered in {request_time:.2f}s (prepared in {upload['prepare_time'] * 1000:.0f}ms)")
             
             print(f"📰 OCR.Space response status: {response.status_code}")
             
             if response.status_code == 200:
-                result = response.json()
-                
                 # Check for API errors
                 if result.get('IsErroredOnProcessing'):
                     error_message = result.get('ErrorMessage', 'Unknown error from OCR.Space')
@@ -446,6 +711,9 @@ class OCRService:
                 'text': None
             }
         except Exception as e:
+            if not recorded:
+                # Failed before sending (preparing the upload): free a half-open probe for the next caller
+                self.breaker.release_probe()
             error_msg = f"OCR processing error: {str(e)}"
             print(f"❌ {error_msg}")
             return {
@@ -454,15 +722,115 @@ class OCRService:
                 'text': None
             }
     
+    def _prepare_upload(self, image):
+        """Downscaled grayscale re-encode of the upload for OCR.Space, or the original bytes"""
+        started = time.perf_counter()
+        upload = None
+        if self.shrink_uploads:
+            try:
+                upload = prepare_upload(image.data, Config.OCR_SPACE_MAX_EDGE, Config.OCR_SPACE_MAX_BYTES,
+                                        Config.OCR_SPACE_JPEG_QUALITY)
+                if upload['bytes_out'] < upload['bytes_in']:
+                    print(f"📉 Upload shrunk {upload['bytes_in'] / 1024.0:.0f}KB -> {upload['bytes_out'] / 1024.0:.0f}KB "
+                          f"({1 - upload['bytes_out'] / float(upload['bytes_in']):.0%} saved)")
+            except Exception as e:
+                print(f"⚠️ Could not shrink upload, sending original: {e}")
+        if upload is None:
+            upload = {'data': image.data, 'mimetype': 'image/png', 'filename': 'ingredients.png',
+                      'bytes_in': image.size, 'bytes_out': image.size}
+        upload['prepare_time'] = time.perf_counter() - started
+        return upload
+    
+    def _upload_summary(self):
+        with self._upload_lock:
+            stats = dict(self._upload_stats)
+        uploads = stats['uploads']
+        return {
+            'uploads': uploads,
+            'bytes_in': stats['bytes_in'],
+            'bytes_sent': stats['bytes_sent'],
+            'bytes_saved_ratio': round(1 - stats['bytes_sent'] / float(stats['bytes_in']), 3) if stats['bytes_in'] else 0.0,
+            'avg_prepare_time': round(stats['prepare_time'] / uploads, 4) if uploads else 0.0,
+            'avg_request_time': round(stats['request_time'] / uploads, 4) if uploads else 0.0
+        }
+    
+    def _cache_settings(self):
+        """Settings that change OCR output, mixed into the cache key"""
+        return {
+            'ocr_space': bool(self.api_key),
+            # From config, so a cache hit does not have to start Tesseract
+            'engine': Config.OCR_TESSERACT_BACKEND.lower(),
+            'strategy': self.strategy,
+            'region_detection': self.region_detection,
+            'merge_mode': self.merge_mode,
+            'spell_correction': self.spell_correction
+        }
+    
+    def _perceptual_hash(self, image):
+        """dHash of the decoded grayscale upload, or None if it cannot be decoded"""
+        try:
+            gray = image.gray
+            return dhash(gray) if gray is not None else None
+        except Exception as e:
+            print(f"⚠️ Perceptual hash failed: {e}")
+            return None
+    
     def process_image(self, image_file):
+        """Process an upload (file object or OCRImage), serving repeats from the caches"""
+        # Read the upload into one buffer; every stage below shares it
+        image = OCRImage.from_upload(image_file)
+        try:
+            return self._process_cached(image)
+        finally:
+            image.release()
+    
+    def _process_cached(self, image):
+        """Try the exact and near-duplicate caches before running OCR"""
+        if not (self.cache_enabled or self.phash_enabled):
+            return self._process_uncached(image)
+        
+        # Exact repeat of an earlier upload
+        settings = self._cache_settings()
+        cache_key = None
+        if self.cache_enabled:
+            cache_key = ocr_cache.make_key(image.data, settings)
+            cached = ocr_cache.get(cache_key)
+            if cached:
+                print(f"⚡ OCR cache hit ({cached.get('source', 'unknown')})")
+                cached['cached'] = True
+                return cached
+        
+        # Another photo of a label we have already read
+        image_hash = None
+        if self.phash_enabled:
+            image_hash = self._perceptual_hash(image)
+            match = phash_index.lookup(image_hash, settings_key(settings)) if image_hash is not None else None
+            if match:
+                result = json.loads(match[0])
+                print(f"⚡ Near-duplicate image (distance {match[1]}), reusing OCR text")
+                if cache_key:
+                    ocr_cache.set(cache_key, result)
+                # Only this response came from a near-duplicate; the cached copy stays plain
+                return dict(result, cached=True, hash_distance=match[1])
+        
+        result = self._process_uncached(image)
+        if result['success']:
+            if cache_key:
+                ocr_cache.set(cache_key, result)
+            if image_hash is not None:
+                phash_index.add(image_hash, json.dumps(result), settings_key(settings))
+        return result
+    
+    def _process_uncached(self, image):
         """Process image using OCR.Space API with Tesseract OCR fallback"""
-        # Reset file pointer to beginning
-        image_file.seek(0)
+        # Start Tesseract alongside OCR.Space when OCR.Space is slow
+        if self.api_key and self.hedge_enabled:
+            return self._process_hedged(image)
         
         # Try OCR.Space first (if API key is available)
         if self.api_key:
             print("🔄 Attempting OCR.Space...")
-            result = self._ocr_space_primary(image_file)
+            result = self._ocr_space_primary(image)
             
             if result['success']:
                 return result
@@ -472,8 +840,7 @@ class OCRService:
         
         # If OCR.Space fails or is not available, try Tesseract OCR fallback
         print("🔄 Using Tesseract OCR fallback...")
-        image_file.seek(0)  # Reset file pointer again
-        fallback_result = self._tesseract_fallback(image_file)
+        fallback_result = self._tesseract_fallback(image)
         
         if fallback_result['success']:
             return fallback_result
@@ -486,5 +853,41 @@ class OCRService:
                     (result.get('error', '') or fallback_result.get('error', '')),
             'text': None
         }
+    
+    def _process_hedged(self, image):
+        """Race OCR.Space against local Tesseract once the hedge delay passes"""
+        print("🔄 Attempting OCR.Space (hedged)...")
+        result, winner = ocr_hedge.run(
+            lambda: self._ocr_space_sent(image),
+            lambda: self._tesseract_fallback(image)
+        )
+        if winner:
+            return result
+        
+        print("❌ All OCR methods failed")
+        return {
+            'success': False,
+            'error': 'All OCR methods failed. ' + (result.get('error', '') if result else ''),
+            'text': None
+        }
+    
+    def get_stats(self):
+        """Return OCR execution metrics"""
+        return {
+            'execution_mode': self.execution_mode,
+            'ocr_space': {
+                'daily_used': self.daily_quota.used(),
+                'daily_limit': self.daily_limit,
+                'throttled': self.throttled_count,
+                'breaker': self.breaker.get_stats(),
+                'upload': self._upload_summary()
+            },
+            'pool': ocr_pool.get_stats(),
+            'engine': self._engine.get_stats() if self._engine else 'not initialized',
+            'cache': ocr_cache.get_stats() if self.cache_enabled else None,
+            'phash': phash_index.get_stats() if self.phash_enabled else None,
+            'strategy': ocr_path_stats.get_stats() if self.strategy == 'adaptive' else self.strategy,
+            'hedge': ocr_hedge.get_stats() if self.hedge_enabled else None
+        }
 
 ocr_service = OCRService()
\ No newline at end of file
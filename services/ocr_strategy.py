@@ -0,0 +1,117 @@
+import re
+import threading
+import time
+from services.state_store import StateDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_path_stats (
+    path TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Words that show up on almost every cosmetic/household ingredient panel
+INGREDIENT_KEYWORDS = (
+    'ingredient', 'aqua', 'water', 'acid', 'sodium', 'glycer', 'extract', 'oil',
+    'alcohol', 'parfum', 'fragrance', 'sulfate', 'chloride', 'benzoate', 'citrate',
+    'butter', 'vitamin', 'tocopher', 'potassium', 'betaine', 'glycol', 'cetearyl'
+)
+
+def ingredient_score(text):
+    """Rough 0-1 score of how much ``text`` reads like an ingredient list"""
+    if not text:
+        return 0.0
+
+    visible = re.sub(r'\s', '', text)
+    words = re.findall(r'[A-Za-z]{2,}', text)
+    if not visible or not words:
+        return 0.0
+
+    # Mostly letters rather than OCR noise
+    alpha_ratio = sum(len(word) for word in words) / len(visible)
+    # Ingredient lists are comma separated
+    separator_score = min(1.0, text.count(',') / 3.0)
+    lowered = text.lower()
+    keyword_score = min(1.0, sum(1 for keyword in INGREDIENT_KEYWORDS if keyword in lowered) / 2.0)
+
+    return round(0.5 * alpha_ratio + 0.3 * separator_score + 0.2 * keyword_score, 3)
+
+class OCRPathStats:
+    """Historical win rates of OCR paths (preprocessing technique + PSM).
+
+    Stored in the shared state directory so every worker learns from every
+    upload. Paths are ranked by their smoothed win rate; paths never tried
+    keep their default position behind proven winners.
+    """
+
+    def __init__(self, filename='ocr_strategy.db', refresh_interval=30.0):
+        self.db = StateDB(filename, SCHEMA)
+        self.refresh_interval = refresh_interval
+        self._rates = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._counters = {'images': 0, 'passes': 0, 'early_exits': 0, 'winners': {}}
+
+    def _load(self):
+        now = time.time()
+        if now - self._loaded_at < self.refresh_interval:
+            return
+        try:
+            rows = self.db.execute('SELECT path, attempts, wins FROM ocr_path_stats').fetchall()
+            with self._lock:
+                self._rates = {path: (wins + 1) / (attempts + 2) for path, attempts, wins in rows}
+                self._loaded_at = now
+        except Exception as e:
+            print(f"⚠️ Could not load OCR path stats: {e}")
+
+    def order(self, paths):
+        """Sort paths by learned win rate, keeping the default order for ties"""
+        self._load()
+        with self._lock:
+            rates = dict(self._rates)
+        default_rank = {path: i for i, path in enumerate(paths)}
+        return sorted(paths, key=lambda path: (-rates.get(path, 0.5), default_rank[path]))
+
+    def record(self, attempted, winner, early_exit):
+        """Count one image: every attempted path, the winner and whether it exited early"""
+        with self._lock:
+            self._counters['images'] += 1
+            self._counters['passes'] += len(attempted)
+            if early_exit:
+                self._counters['early_exits'] += 1
+            if winner:
+                self._counters['winners'][winner] = self._counters['winners'].get(winner, 0) + 1
+
+        try:
+            with self.db.transaction() as conn:
+                for path in attempted:
+                    conn.execute(
+                        'INSERT INTO ocr_path_stats (path, attempts, wins) VALUES (?, 1, ?) '
+                        'ON CONFLICT(path) DO UPDATE SET attempts = attempts + 1, wins = wins + excluded.wins',
+                        (path, 1 if path == winner else 0)
+                    )
+            self._loaded_at = 0.0  # Pick up the new counts on the next ordering
+        except Exception as e:
+            print(f"⚠️ Could not record OCR path stats: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters['winners'] = dict(self._counters['winners'])
+        images = counters['images']
+        counters['avg_passes'] = counters['passes'] / images if images else 0.0
+        try:
+            rows = self.db.execute(
+                'SELECT path, attempts, wins FROM ocr_path_stats ORDER BY wins DESC'
+            ).fetchall()
+            counters['paths'] = {
+                path: {'attempts': attempts, 'wins': wins, 'win_rate': wins / attempts if attempts else 0.0}
+                for path, attempts, wins in rows
+            }
+        except Exception:
+            pass
+        return counters
+
+# Global instance
+ocr_path_stats = OCRPathStats()
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import threading
+import time
+import cv2
+import numpy as np
+from config import Config
+from services.state_store import StateDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS phash_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash INTEGER NOT NULL,
+    settings TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+HASH_BITS = 64
+
+def dhash(gray, size=8):
+    """64-bit difference hash of a grayscale OpenCV image"""
+    resized = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = resized[:, 1:] > resized[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def settings_key(settings):
+    """Short digest of the OCR settings an entry was produced with"""
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << HASH_BITS) if value >= (1 << (HASH_BITS - 1)) else value
+
+def _to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+class PerceptualHashIndex:
+    """Multi-index Hamming index of perceptual hashes of OCR'd images.
+
+    The 64-bit hash is split into ``max_distance + 1`` chunks with one hash
+    table each. By the pigeonhole principle any hash within ``max_distance``
+    bits matches at least one chunk exactly, so a lookup only verifies the
+    few entries sharing a chunk instead of scanning the whole index.
+    Entries live in SQLite in the shared state directory; rows written by
+    other workers are picked up incrementally. An entry only matches lookups
+    made with the same OCR settings. Entries expire after ``ttl`` seconds and
+    at most ``max_entries`` are kept, dropping the oldest.
+    """
+
+    def __init__(self, max_distance=None, filename='phash_index.db', sync_interval=1.0, ttl=None, max_entries=None):
+        self.max_distance = Config.OCR_PHASH_MAX_DISTANCE if max_distance is None else max_distance
+        self.ttl = ttl or Config.OCR_PHASH_TTL
+        self.max_entries = max_entries or Config.OCR_PHASH_MAX_ENTRIES
+        self.chunk_count = min(self.max_distance + 1, 16)
+        self.db = StateDB(filename, SCHEMA)
+        self.sync_interval = sync_interval
+        self._chunks = self._chunk_layout(self.chunk_count)
+        self._tables = [{} for _ in self._chunks]
+        self._hashes = {}  # row id -> (hash, settings key)
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chunk_layout(count):
+        """(shift, mask) pairs splitting the hash into ``count`` near-equal chunks"""
+        layout = []
+        shift = 0
+        for i in range(count):
+            width = HASH_BITS // count + (1 if i < HASH_BITS % count else 0)
+            layout.append((shift, (1 << width) - 1))
+            shift += width
+        return layout
+
+    def _insert(self, row_id, value, settings):
+        self._hashes[row_id] = (value, settings)
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((value >> shift) & mask, []).append(row_id)
+
+    def _remove(self, row_id):
+        value, _ = self._hashes.pop(row_id)
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            chunk = (value >> shift) & mask
+            ids = table.get(chunk, [])
+            if row_id in ids:
+                ids.remove(row_id)
+            if not ids:
+                table.pop(chunk, None)
+
+    def _sync(self, force=False):
+        """Load rows added since the last sync (including other workers' rows) and forget evicted ones"""
+        now = time.time()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        rows = self.db.execute(
+            'SELECT id, hash, settings FROM phash_entries WHERE id > ? ORDER BY id', (self._last_id,)
+        ).fetchall()
+        # Rows are evicted oldest first, so everything below the smallest id left is gone
+        oldest = self.db.execute('SELECT MIN(id) FROM phash_entries').fetchone()[0]
+        with self._lock:
+            for row_id, value, settings in rows:
+                if row_id > self._last_id:
+                    self._insert(row_id, _to_unsigned(value), settings)
+                    self._last_id = row_id
+            for row_id in [row_id for row_id in self._hashes if oldest is None or row_id < oldest]:
+                self._remove(row_id)
+            self._last_sync = now
+
+    def _nearest(self, value, settings):
+        """Return (row_id, distance) of the closest entry within max_distance made with ``settings``"""
+        best = None
+        with self._lock:
+            if self.max_distance >= 16:
+                # Beyond the pigeonhole guarantee: fall back to a linear scan
+                candidates = self._hashes.keys()
+            else:
+                candidates = set()
+                for table, (shift, mask) in zip(self._tables, self._chunks):
+                    candidates.update(table.get((value >> shift) & mask, ()))
+            for row_id in candidates:
+                stored, stored_settings = self._hashes[row_id]
+                if stored_settings != settings:
+                    continue
+                distance = (stored ^ value).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (row_id, distance)
+        return best
+
+    def lookup(self, value, settings):
+        """Return (stored result JSON, distance) for a near-duplicate image OCR'd with ``settings``, or None"""
+        try:
+            self._sync()
+            match = self._nearest(value, settings)
+            if not match:
+                return None
+            row = self.db.execute('SELECT result FROM phash_entries WHERE id = ? AND created_at > ?',
+                                  (match[0], time.time() - self.ttl)).fetchone()
+            return (row[0], match[1]) if row else None
+        except Exception as e:
+            print(f"⚠️ Perceptual hash lookup failed: {e}")
+            return None
+
+    def add(self, value, result_json, settings):
+        """Index an OCR'd image unless an identical hash with the same settings is already stored"""
+        try:
+            self._sync(force=True)
+            match = self._nearest(value, settings)
+            if match and match[1] == 0:
+                return
+            now = time.time()
+            with self.db.transaction() as conn:
+                conn.execute(
+                    'INSERT INTO phash_entries (hash, settings, result, created_at) VALUES (?, ?, ?, ?)',
+                    (_to_signed(value), settings, result_json, now)
+                )
+                conn.execute('DELETE FROM phash_entries WHERE created_at <= ?', (now - self.ttl,))
+                conn.execute('DELETE FROM phash_entries WHERE id <= (SELECT MAX(id) FROM phash_entries) - ?',
+                             (self.max_entries,))
+            self._sync(force=True)
+        except Exception as e:
+            print(f"⚠️ Perceptual hash insert failed: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._hashes),
+                'max_entries': self.max_entries,
+                'max_distance': self.max_distance,
+                'chunks': self.chunk_count
+            }
+
+# Global instance
+phash_index = PerceptualHashIndex()
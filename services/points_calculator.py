@@ -12,6 +12,31 @@ class PointsCalculator:
         multiplier = rating_multipliers.get(rating, 1.0)
         return max(0, min(100, int(base_points * multiplier)))
     
+    @staticmethod
+    def rating_for_points(points):
+        """Rating band of a 0-100 impact score (the bands the analysis prompt uses)"""
+        if points >= 80:
+            return 'friendly'
+        if points >= 40:
+            return 'moderate'
+        if points >= 10:
+            return 'harmful'
+        return 'hazardous'
+    
+    @staticmethod
+    def combine_ingredient_scores(scores):
+        """Combine per-ingredient scores (label order) into one product score 0-100.
+
+        Labels list ingredients by quantity, so earlier ones weigh more. The
+        worst ingredient caps the result: one hazardous ingredient in a
+        mostly harmless formula still makes the product harmful.
+        """
+        if not scores:
+            return 50
+        weights = [1.0 / (position + 1) ** 0.5 for position in range(len(scores))]
+        mean = sum(w * s for w, s in zip(weights, scores)) / sum(weights)
+        return max(0, min(100, int(round(min(mean, min(scores) + 40)))))
+    
     @staticmethod
     def get_rating_color(rating):
         colors = {
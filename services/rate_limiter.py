@@ -0,0 +1,110 @@
+import time
+from datetime import datetime
+from services.state_store import StateDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_quotas (
+    name TEXT NOT NULL,
+    day TEXT NOT NULL,
+    used INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, day)
+);
+"""
+
+# One database for every limiter; each row is locked by a short write transaction
+_limits_db = StateDB('rate_limits.db', SCHEMA)
+
+class SharedTokenBucket:
+    """Token bucket shared by every worker process on the host.
+
+    ``rate`` tokens are added per second up to ``capacity``. Callers never
+    sleep: ``try_acquire`` answers immediately so they can take another path
+    when the bucket is empty.
+    """
+
+    def __init__(self, name, rate, capacity=1, db=None):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(max(1, capacity))
+        self.db = db or _limits_db
+
+    def try_acquire(self, tokens=1):
+        now = time.time()
+        try:
+            with self.db.transaction() as conn:
+                row = conn.execute(
+                    'SELECT tokens, updated_at FROM token_buckets WHERE name = ?', (self.name,)
+                ).fetchone()
+                available = self.capacity
+                if row:
+                    available = min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+
+                acquired = available >= tokens
+                if acquired:
+                    available -= tokens
+                conn.execute(
+                    'INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+                    (self.name, available, now)
+                )
+                return acquired
+        except Exception as e:
+            # Fail open: a broken state file must not take the service down
+            print(f"⚠️ Rate limiter '{self.name}' unavailable: {e}")
+            return True
+
+class DailyQuota:
+    """Per-day request counter shared by every worker process (UTC days)"""
+
+    def __init__(self, name, limit, db=None):
+        self.name = name
+        self.limit = limit
+        self.db = db or _limits_db
+
+    @staticmethod
+    def _today():
+        return datetime.utcnow().strftime('%Y-%m-%d')
+
+    def try_consume(self, amount=1):
+        """Count ``amount`` requests against today's quota if it has room"""
+        day = self._today()
+        try:
+            with self.db.transaction() as conn:
+                row = conn.execute(
+                    'SELECT used FROM daily_quotas WHERE name = ? AND day = ?', (self.name, day)
+                ).fetchone()
+                used = row[0] if row else 0
+                if used + amount > self.limit:
+                    return False
+                conn.execute(
+                    'INSERT OR REPLACE INTO daily_quotas (name, day, used) VALUES (?, ?, ?)',
+                    (self.name, day, used + amount)
+                )
+                conn.execute('DELETE FROM daily_quotas WHERE name = ? AND day < ?', (self.name, day))
+                return True
+        except Exception as e:
+            print(f"⚠️ Daily quota '{self.name}' unavailable: {e}")
+            return True
+
+    def refund(self, amount=1):
+        """Give back requests counted by try_consume that were never sent"""
+        try:
+            self.db.execute(
+                'UPDATE daily_quotas SET used = MAX(0, used - ?) WHERE name = ? AND day = ?',
+                (amount, self.name, self._today())
+            )
+        except Exception as e:
+            print(f"⚠️ Daily quota '{self.name}' unavailable: {e}")
+
+    def used(self):
+        try:
+            row = self.db.execute(
+                'SELECT used FROM daily_quotas WHERE name = ? AND day = ?', (self.name, self._today())
+            ).fetchone()
+            return row[0] if row else 0
+        except Exception:
+            return 0
@@ -0,0 +1,181 @@
+import mmap
+import re
+import threading
+from config import Config
+
+_TOKEN = re.compile(r'[A-Za-z0-9]+')
+
+def _distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it is known to exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class SymSpell:
+    """Symmetric-delete spelling index (SymSpell) over the ingredient vocabulary.
+
+    Every word's deletions (up to ``max_distance`` characters, taken from its
+    first ``prefix_length`` characters) are precomputed, so a lookup only
+    generates the deletions of the misspelled token and checks the few
+    dictionary words that share one, instead of scanning the vocabulary.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = {}  # word -> rank (lower is more common)
+        self.deletes = {}
+
+    def _edits(self, word, distance, out):
+        distance += 1
+        for i in range(len(word)):
+            delete = word[:i] + word[i + 1:]
+            if delete not in out:
+                out.add(delete)
+                if distance < self.max_distance:
+                    self._edits(delete, distance, out)
+        return out
+
+    def _deletes_of(self, word):
+        prefix = word[:self.prefix_length]
+        return self._edits(prefix, 0, {prefix})
+
+    def add(self, word):
+        if word in self.words:
+            return
+        self.words[word] = len(self.words)
+        for delete in self._deletes_of(word):
+            self.deletes.setdefault(delete, []).append(word)
+
+    def load(self, path):
+        """Index a one-word-per-line vocabulary file read through a memory map"""
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for line in iter(data.readline, b''):
+                word = line.strip().decode('utf-8')
+                if word and not word.startswith('#'):
+                    self.add(word.lower())
+        return self
+
+    def lookup(self, word, max_distance=None):
+        """Closest vocabulary word as (word, distance), or None if nothing is close enough"""
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if word in self.words:
+            return word, 0
+
+        # Ties go to the closer length (OCR rarely drops whole syllables), then the more common word
+        best, best_rank = None, None
+        for delete in self._deletes_of(word):
+            for candidate in self.deletes.get(delete, ()):
+                distance = _distance(word, candidate, best[1] if best else limit)
+                if distance > limit:
+                    continue
+                rank = (distance, abs(len(candidate) - len(word)), self.words[candidate])
+                if best is None or rank < best_rank:
+                    best, best_rank = (candidate, distance), rank
+        return best
+
+def _match_case(original, corrected):
+    letters = [c for c in original if c.isalpha()]
+    if sum(c.isupper() for c in letters) * 2 > len(letters):
+        return corrected.upper()
+    if original[:1].isupper():
+        return corrected.capitalize()
+    return corrected
+
+class IngredientSpellChecker:
+    """Corrects OCR noise in ingredient lists against a known vocabulary.
+
+    Each comma-separated item is corrected word by word; words that are
+    short, numeric, or already known are left alone. The index is built
+    once per process, on first use or from ``ocr_service.warm_up()``.
+    """
+
+    def __init__(self, path=None, max_distance=None):
+        self.path = path or Config.OCR_SPELL_VOCABULARY
+        self.max_distance = max_distance or Config.OCR_SPELL_MAX_DISTANCE
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = SymSpell(self.max_distance).load(self.path)
+                    print(f"📖 Spell correction index built: {len(self._index.words)} words, "
+                          f"{len(self._index.deletes)} deletes")
+        return self._index
+
+    def warm_up(self):
+        """Build the index now instead of on the first correction; returns the vocabulary size"""
+        return len(self.index.words)
+
+    def correct_word(self, token):
+        """Return (corrected token, confidence 0..1).
+
+        Words with no close vocabulary match are kept as they are: plain
+        words (brands, places, label text) score ``OCR_SPELL_UNKNOWN_CONFIDENCE``,
+        tokens mixing letters and digits score 0 as likely OCR noise.
+        """
+        word = token.lower()
+        if not any(c.isalpha() for c in word):
+            return token, 1.0
+        # Short words are only touched when a digit shows an OCR confusion ('0IL')
+        if len(word) < 4 and (len(word) < 3 or word.isalpha()):
+            return token, 1.0
+        limit = min(self.max_distance, 2 if len(word) >= Config.OCR_SPELL_LONG_WORD else 1)
+        match = self.index.lookup(word, max_distance=limit)
+        if (not match or match[1]) and 'rn' in word:
+            # 'm' read as 'rn' is the most common OCR confusion and costs two edits
+            alternative = self.index.lookup(word.replace('rn', 'm'), max_distance=limit - 1)
+            if alternative and (not match or alternative[1] + 1 < match[1]):
+                match = (alternative[0], alternative[1] + 1)
+        similarity = 1.0 - match[1] / float(len(word)) if match else 0.0
+        # A digit inside a word is itself a sign of an OCR confusion, so only plain words need to be this close
+        if not match or (word.isalpha() and similarity < Config.OCR_SPELL_MIN_SIMILARITY):
+            return token, Config.OCR_SPELL_UNKNOWN_CONFIDENCE if word.isalpha() else 0.0
+        corrected, distance = match
+        return _match_case(token, corrected) if distance else token, similarity
+
+    def correct(self, text):
+        """Return {'text', 'confidence', 'corrections', 'items'} for an OCR'd ingredient list"""
+        confidences = []
+        corrections = [0]
+        item_scores = []
+
+        def replace(m):
+            corrected, confidence = self.correct_word(m.group(0))
+            confidences.append(confidence)
+            item_confidences.append(confidence)
+            if corrected != m.group(0):
+                corrections[0] += 1
+            return corrected
+
+        items = []
+        for item in (text or '').split(','):
+            item_confidences = []
+            items.append(_TOKEN.sub(replace, item))
+            if item_confidences:
+                item_scores.append(round(sum(item_confidences) / len(item_confidences), 3))
+
+        return {
+            'text': ','.join(items),
+            'confidence': sum(confidences) / len(confidences) if confidences else 0.0,
+            'corrections': corrections[0],
+            'items': item_scores
+        }
+
+# Global instance
+spell_checker = IngredientSpellChecker()
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import threading
+from config import Config
+
+def state_path(filename):
+    """Path of a file in the shared state directory (created on demand)"""
+    os.makedirs(Config.STATE_DIR, exist_ok=True)
+    return os.path.join(Config.STATE_DIR, filename)
+
+class StateDB:
+    """Small SQLite database in the shared state directory.
+
+    Every gunicorn worker on the host opens the same file, so it doubles as
+    cross-process shared state. WAL mode lets readers run alongside a writer;
+    each thread gets its own connection.
+    """
+
+    def __init__(self, filename, schema):
+        self.filename = filename
+        self.schema = schema
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(state_path(self.filename), timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(self.schema)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def transaction(self):
+        """Context manager for a write transaction that locks the database up front"""
+        return _Transaction(self.conn)
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager, ExitStack
+import pytesseract
+from PIL import Image
+from config import Config
+
+class PytesseractBackend:
+    """Subprocess backend: every call forks the tesseract binary"""
+    name = 'pytesseract'
+
+    def image_to_string(self, image, psm=6, lang=None):
+        config = f'--psm {psm}'
+        if lang:
+            config += f' -l {lang}'
+        return pytesseract.image_to_string(image, config=config)
+
+    def recognize(self, image, psm=6, lang=None):
+        """Text plus per-word (word, confidence) pairs from ``image_to_data``"""
+        config = f'--psm {psm}'
+        if lang:
+            config += f' -l {lang}'
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+
+        words = []
+        lines = {}
+        for i, word in enumerate(data['text']):
+            word = (word or '').strip()
+            conf = float(data['conf'][i])
+            if not word or conf < 0:
+                continue
+            words.append((word, conf))
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line_key, []).append(word)
+
+        text = '\n'.join(' '.join(line) for line in lines.values())
+        return _reading(text, words)
+
+    def warm_up(self, count=None):
+        pass
+
+    def get_stats(self):
+        return {'backend': self.name}
+
+class TesserocrBackend:
+    """In-process backend holding warm libtesseract handles.
+
+    Each handle loads the traineddata once when it is created and is then
+    checked out per call, so recognition never pays the model load again.
+    Handles are created lazily up to ``pool_size`` per language.
+    """
+    name = 'tesserocr'
+
+    def __init__(self, tessdata_path=None, default_lang='eng', pool_size=None):
+        import tesserocr  # Optional dependency, checked by create_engine()
+        self._tesserocr = tesserocr
+        self.tessdata_path = tessdata_path
+        self.default_lang = default_lang
+        self.pool_size = max(1, pool_size or Config.OCR_ENGINE_POOL_SIZE)
+        self._pools = {}
+        self._created = {}
+        self._lock = threading.Lock()
+
+    def _new_handle(self, lang):
+        kwargs = {'lang': lang}
+        if self.tessdata_path:
+            kwargs['path'] = self.tessdata_path.rstrip('/\\') + os.sep
+        return self._tesserocr.PyTessBaseAPI(**kwargs)
+
+    @contextmanager
+    def _checkout(self, lang):
+        """Borrow a warm handle for ``lang``, creating one if the pool is not full"""
+        with self._lock:
+            pool = self._pools.setdefault(lang, queue.LifoQueue())
+            can_create = pool.empty() and self._created.get(lang, 0) < self.pool_size
+            if can_create:
+                self._created[lang] = self._created.get(lang, 0) + 1
+
+        if can_create:
+            try:
+                api = self._new_handle(lang)
+            except Exception:
+                with self._lock:
+                    self._created[lang] -= 1
+                raise
+        else:
+            api = pool.get()
+
+        try:
+            yield api
+        finally:
+            api.Clear()
+            pool.put(api)
+
+    def image_to_string(self, image, psm=6, lang=None):
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
+        with self._checkout(lang or self.default_lang) as api:
+            api.SetPageSegMode(psm)
+            api.SetImage(image)
+            return api.GetUTF8Text()
+
+    def recognize(self, image, psm=6, lang=None):
+        """Text plus per-word (word, confidence) pairs from the result iterator"""
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
+        level = self._tesserocr.RIL.WORD
+        with self._checkout(lang or self.default_lang) as api:
+            api.SetPageSegMode(psm)
+            api.SetImage(image)
+            text = api.GetUTF8Text()
+            words = []
+            iterator = api.GetIterator()
+            if iterator is not None:
+                for item in self._tesserocr.iterate_level(iterator, level):
+                    word = item.GetUTF8Text(level)
+                    if word and word.strip():
+                        words.append((word.strip(), item.Confidence(level)))
+        return _reading(text, words)
+
+    def warm_up(self, count=None):
+        """Initialize handles for the default language up front"""
+        count = min(count or self.pool_size, self.pool_size)
+        with ExitStack() as stack:
+            for _ in range(count):
+                stack.enter_context(self._checkout(self.default_lang))
+        print(f"🔥 Warmed {count} Tesseract engine handle(s)")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'backend': self.name,
+                'pool_size': self.pool_size,
+                'handles': dict(self._created),
+                'idle': {lang: pool.qsize() for lang, pool in self._pools.items()}
+            }
+
+def _reading(text, words):
+    """Recognition result shared by both backends"""
+    confidences = [conf for _, conf in words]
+    return {
+        'text': (text or '').strip(),
+        'words': words,
+        'confidence': sum(confidences) / len(confidences) if confidences else 0.0
+    }
+
+def create_engine(backend=None, tessdata_path=None, pool_size=None):
+    """Build the configured Tesseract backend, falling back to pytesseract"""
+    backend = (backend or Config.OCR_TESSERACT_BACKEND).lower()
+    if backend in ('tesserocr', 'auto'):
+        try:
+            engine = TesserocrBackend(tessdata_path=tessdata_path, pool_size=pool_size)
+            engine.warm_up(1)  # Fail over now rather than on the first upload
+            print(f"⚙️ Using in-process Tesseract engine pool ({engine.pool_size} handles)")
+            return engine
+        except ImportError:
+            if backend == 'tesserocr':
+                print("⚠️ tesserocr not installed, falling back to pytesseract")
+        except Exception as e:
+            print(f"⚠️ Tesseract engine pool unavailable, falling back to pytesseract: {e}")
+    return PytesseractBackend()
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import time
+import pytesseract
+from services.state_store import StateDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tesseract_probes (
+    binary TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    version TEXT NOT NULL,
+    languages TEXT NOT NULL,
+    probed_at REAL NOT NULL
+);
+"""
+
+_probe_db = StateDB('tesseract_probe.db', SCHEMA)
+
+def resolve_binary(cmd=None):
+    """Absolute path of the tesseract executable pytesseract will run, or None"""
+    cmd = cmd or pytesseract.pytesseract.tesseract_cmd
+    if os.path.isfile(cmd):
+        return os.path.abspath(cmd)
+    return shutil.which(cmd)
+
+def probe_tesseract(db=None):
+    """Return {'binary', 'version', 'languages', 'cached'} or None if tesseract is missing.
+
+    ``tesseract --version`` and ``--list-langs`` each start a subprocess, so
+    their answers are stored per binary path and reused until the binary's
+    mtime changes (i.e. it is upgraded or replaced).
+    """
+    db = db or _probe_db
+    binary = resolve_binary()
+    if not binary:
+        return None
+    mtime = os.stat(binary).st_mtime
+
+    try:
+        row = db.execute(
+            'SELECT version, languages FROM tesseract_probes WHERE binary = ? AND mtime = ?', (binary, mtime)
+        ).fetchone()
+        if row:
+            return {'binary': binary, 'version': row[0], 'languages': json.loads(row[1]), 'cached': True}
+    except Exception as e:
+        print(f"⚠️ Tesseract probe cache unavailable: {e}")
+
+    version = str(pytesseract.get_tesseract_version())
+    try:
+        languages = pytesseract.get_languages()
+    except Exception:
+        languages = []
+
+    try:
+        db.execute(
+            'INSERT OR REPLACE INTO tesseract_probes (binary, mtime, version, languages, probed_at) VALUES (?, ?, ?, ?, ?)',
+            (binary, mtime, version, json.dumps(languages), time.time())
+        )
+    except Exception as e:
+        print(f"⚠️ Could not cache Tesseract probe: {e}")
+    return {'binary': binary, 'version': version, 'languages': languages, 'cached': False}
@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+from config import Config
+
+def _contours(mask):
+    # OpenCV 3 returns (image, contours, hierarchy), OpenCV 4 (contours, hierarchy)
+    return cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+
+def _skew_angle(line_mask):
+    """Median angle (degrees) of the text lines in a binary mask"""
+    angles = []
+    for contour in _contours(line_mask):
+        _, (width, height), angle = cv2.minAreaRect(contour)
+        long_side, short_side = max(width, height), min(width, height)
+        # Only elongated blobs are text lines
+        if long_side < 20 or long_side < 3 * short_side:
+            continue
+        if width < height:
+            angle += 90
+        angle = ((angle + 90) % 180) - 90
+        if abs(angle) <= 45:
+            angles.append(angle)
+    return float(np.median(angles)) if angles else 0.0
+
+def _merge_lines(boxes, max_gap):
+    """Greedily merge line boxes (sorted by top edge) into text blocks"""
+    blocks = []
+    for x, y, w, h in boxes:
+        for i, (bx, by, bw, bh) in enumerate(blocks):
+            overlaps = x < bx + bw and bx < x + w
+            if overlaps and y - (by + bh) <= max_gap:
+                x0, y0 = min(x, bx), min(y, by)
+                blocks[i] = (x0, y0, max(x + w, bx + bw) - x0, max(y + h, by + bh) - y0)
+                break
+        else:
+            blocks.append((x, y, w, h))
+    return blocks
+
+def locate_text_region(gray, max_edge=None, padding=0.03):
+    """Find the densest block of text in a grayscale image.
+
+    Works on a copy downscaled to ``max_edge`` pixels: a morphological
+    gradient highlights character strokes, horizontal closing joins them
+    into lines and nearby lines are stacked into blocks. The block holding
+    the most text pixels wins. Returns a dict with the box in full-resolution
+    coordinates and the skew angle, or None when no useful crop exists.
+    """
+    max_edge = max_edge or Config.OCR_REGION_MAX_EDGE
+    height, width = gray.shape[:2]
+    scale = min(1.0, float(max_edge) / max(height, width))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    # Character strokes have strong local contrast
+    gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, strokes = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Characters -> lines
+    lines = cv2.morphologyEx(strokes, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3)))
+    boxes = [cv2.boundingRect(c) for c in _contours(lines)]
+    boxes = [box for box in boxes if box[2] >= 2 * box[3] and box[2] * box[3] >= 30]
+    if not boxes:
+        return None
+
+    # Lines -> blocks: stack lines closer than ~1.5 line heights that overlap horizontally
+    line_height = float(np.median([box[3] for box in boxes]))
+    blocks = _merge_lines(sorted(boxes, key=lambda box: box[1]), 1.5 * line_height)
+
+    small_area = small.shape[0] * small.shape[1]
+    best = None
+    for x, y, w, h in blocks:
+        if w * h < 0.005 * small_area:
+            continue
+        text_pixels = cv2.countNonZero(strokes[y:y + h, x:x + w])
+        # Very dense blocks are photos or solid graphics, not text
+        if text_pixels > 0.6 * w * h:
+            continue
+        if best is None or text_pixels > best[0]:
+            best = (text_pixels, x, y, w, h)
+
+    if best is None:
+        return None
+
+    _, x, y, w, h = best
+    angle = _skew_angle(lines[y:y + h, x:x + w])
+
+    # Back to full resolution with a little padding around the glyphs
+    pad_x, pad_y = int(w * padding) + 2, int(h * padding) + 2
+    x0 = max(0, int((x - pad_x) / scale))
+    y0 = max(0, int((y - pad_y) / scale))
+    x1 = min(width, int((x + w + pad_x) / scale))
+    y1 = min(height, int((y + h + pad_y) / scale))
+
+    # Cropping away less than 10% is not worth the risk of clipping text
+    if (x1 - x0) * (y1 - y0) > 0.9 * width * height and abs(angle) < 0.5:
+        return None
+
+    return {'x': x0, 'y': y0, 'w': x1 - x0, 'h': y1 - y0, 'angle': round(angle, 2)}
+
+def crop_region(image, region):
+    """Crop ``image`` (gray or BGR) to ``region`` and undo its skew"""
+    crop = image[region['y']:region['y'] + region['h'], region['x']:region['x'] + region['w']]
+    angle = region.get('angle', 0.0)
+    if abs(angle) < 0.5:
+        return crop
+
+    h, w = crop.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), angle, 1.0)
+    return cv2.warpAffine(crop, matrix, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
@@ -0,0 +1,40 @@
+"""Merging the OCR text of several photos of one label.
+
+Run with ``python -m pytest tests`` (or ``python -m unittest discover tests``).
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Shared state (rate limits, breaker) goes to a throwaway directory; set before config is imported
+os.environ.setdefault('AURA_STATE_DIR', tempfile.mkdtemp(prefix='aura_test_state_'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ocr_batch import merge_ingredient_texts
+
+
+class MergeIngredientTextsTest(unittest.TestCase):
+
+    def test_photos_without_overlap_are_joined_as_separate_items(self):
+        self.assertEqual(merge_ingredient_texts(['Water, Salt', 'Sugar, Flour']), 'Water, Salt, Sugar, Flour')
+
+    def test_overlap_keeps_the_separator_after_the_seam(self):
+        merged = merge_ingredient_texts(['Aqua, Glycerin, Citric Acid', 'Citric Acid, Sodium Benzoate'])
+        self.assertEqual(merged, 'Aqua, Glycerin, Citric Acid, Sodium Benzoate')
+
+    def test_one_word_seam_that_completes_an_item_is_kept_once(self):
+        merged = merge_ingredient_texts(['Aqua, Glycerin, Cocamidopropyl', 'Cocamidopropyl Betaine, Sodium Benzoate'])
+        self.assertEqual(merged, 'Aqua, Glycerin, Cocamidopropyl Betaine, Sodium Benzoate')
+
+    def test_one_word_inside_items_is_not_a_seam(self):
+        merged = merge_ingredient_texts(['Water, Citric Acid', 'Acid Blue 9, Salt'])
+        self.assertEqual(merged, 'Water, Citric Acid, Acid Blue 9, Salt')
+
+    def test_headers_and_repeated_items_are_dropped(self):
+        merged = merge_ingredient_texts(['Ingredients: Water, Salt,', 'INGREDIENTS: Salt, Sugar'])
+        self.assertEqual(merged, 'Water, Salt, Sugar')
+
+
+if __name__ == '__main__':
+    unittest.main()
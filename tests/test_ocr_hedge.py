@@ -0,0 +1,134 @@
+"""Hedged OCR against a local stub of the OCR.Space endpoint.
+
+Run with ``python -m pytest tests`` (or ``python -m unittest discover tests``).
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Shared state (rate limits, breaker) goes to a throwaway directory; set before config is imported
+os.environ.setdefault('AURA_STATE_DIR', tempfile.mkdtemp(prefix='aura_test_state_'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.ocr_hedge import HedgedOCR
+from services.ocr_image import OCRImage
+from services.ocr_service import OCRService
+
+
+class StubOCRSpace(BaseHTTPRequestHandler):
+    """Answers like OCR.Space after ``delay`` seconds and counts requests"""
+
+    delay = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        with StubOCRSpace.lock:
+            StubOCRSpace.requests += 1
+        time.sleep(StubOCRSpace.delay)
+        body = json.dumps({'ParsedResults': [{'ParsedText': 'INGREDIENTS: sugar, salt'}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def local_tesseract(seconds=0.05):
+    def run():
+        time.sleep(seconds)
+        return {'success': True, 'text': 'sugar, salt', 'source': 'tesseract'}
+    return run
+
+
+class HedgedOCRTest(unittest.TestCase):
+
+    CONFIG = {'OCR_SPACE_RATE': 1000.0, 'OCR_SPACE_BURST': 1000, 'OCR_SPACE_SHRINK': False}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOCRSpace)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        # Config may already be imported by another test module, so override it rather than the environment
+        cls.saved_config = {name: getattr(Config, name) for name in cls.CONFIG}
+        for name, value in cls.CONFIG.items():
+            setattr(Config, name, value)
+        cls.service = OCRService()
+        cls.service.api_key = 'stub-key'
+        cls.service.endpoint = f'http://127.0.0.1:{cls.server.server_port}/parse/image'
+        cls.image = OCRImage(b'not really an image')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        for name, value in cls.saved_config.items():
+            setattr(Config, name, value)
+
+    def setUp(self):
+        StubOCRSpace.delay = 0.0
+        StubOCRSpace.requests = 0
+
+    def remote(self):
+        return self.service._ocr_space_sent(self.image)
+
+    def test_fast_remote_wins_without_hedging(self):
+        hedge = HedgedOCR(hedge_delay=1.0, workers=2)
+        result, winner = hedge.run(self.remote, local_tesseract())
+        self.assertEqual(winner, 'remote')
+        self.assertEqual(result['source'], 'ocr.space')
+        self.assertEqual(hedge.get_stats()['hedged'], 0)
+
+    def test_slow_remote_is_hedged_by_local(self):
+        StubOCRSpace.delay = 1.0
+        hedge = HedgedOCR(hedge_delay=0.2, workers=2)
+        started = time.perf_counter()
+        result, winner = hedge.run(self.remote, local_tesseract())
+        self.assertEqual(winner, 'local')
+        self.assertLess(time.perf_counter() - started, 0.8)
+        self.assertEqual(hedge.get_stats()['hedged'], 1)
+
+    def test_local_hedge_does_not_queue_behind_slow_remote_calls(self):
+        StubOCRSpace.delay = 1.5
+        hedge = HedgedOCR(hedge_delay=0.1, workers=2)
+        timings = []
+
+        def request():
+            started = time.perf_counter()
+            _, winner = hedge.run(self.remote, local_tesseract())
+            timings.append((winner, time.perf_counter() - started))
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([winner for winner, _ in timings], ['local'] * 4)
+        self.assertLess(max(seconds for _, seconds in timings), 1.0)
+        # The remote calls still queued when local won were cancelled before reaching the server
+        self.assertEqual(StubOCRSpace.requests, 2)
+
+    def test_local_refusals_do_not_count_as_remote_latency(self):
+        hedge = HedgedOCR(hedge_delay=0, workers=2)
+        refused = {'success': False, 'error': 'OCR.Space rate limit reached', 'text': None}
+        for _ in range(HedgedOCR.MIN_SAMPLES + 5):
+            hedge.run(lambda: (refused, False), local_tesseract(0))
+        self.assertEqual(hedge.hedge_delay(), HedgedOCR.DEFAULT_DELAY)
+
+        hedge.run(self.remote, local_tesseract(0))
+        self.assertEqual(len(hedge._remote_latencies), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
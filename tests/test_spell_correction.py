@@ -0,0 +1,52 @@
+"""Spell correction of OCR'd ingredient lists against the shipped vocabulary.
+
+Run with ``python -m pytest tests`` (or ``python -m unittest discover tests``).
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.spell_correction import IngredientSpellChecker
+
+checker = IngredientSpellChecker()
+
+
+class SpellCorrectionTest(unittest.TestCase):
+
+    def test_misreads_are_corrected(self):
+        result = checker.correct('Aqua, Glycerln, Sodlum Benzoate, Citrlc Acid, Xanthan Gurn')
+        self.assertEqual(result['text'], 'Aqua, Glycerin, Sodium Benzoate, Citric Acid, Xanthan Gum')
+        self.assertEqual(result['corrections'], 4)
+
+    def test_digit_confusions_in_short_words_are_corrected(self):
+        self.assertEqual(checker.correct('Water, 0IL')['text'], 'Water, OIL')
+
+    def test_brand_and_country_names_pass_through(self):
+        for text in ('Made in France by LOreal Paris', 'Product of Italy. Packed in Germany'):
+            result = checker.correct(text)
+            self.assertEqual(result['text'], text)
+            self.assertEqual(result['corrections'], 0)
+
+    def test_correct_words_outside_the_vocabulary_are_neutral(self):
+        for word in ('Distributed', 'Walmart', 'Stores', 'France'):
+            self.assertEqual(checker.correct_word(word), (word, Config.OCR_SPELL_UNKNOWN_CONFIDENCE))
+
+        result = checker.correct('Water, Glycerin, Distributed by Walmart Stores')
+        self.assertEqual(result['text'], 'Water, Glycerin, Distributed by Walmart Stores')
+        self.assertGreater(result['confidence'], 0.7)
+
+    def test_two_edits_only_for_long_words(self):
+        # 'France' is two edits from 'orange' but too short for a second edit
+        self.assertEqual(checker.correct_word('France')[0], 'France')
+        # 'Glycerine' read as 'Glvcerlne' is two edits on a long word
+        self.assertEqual(checker.correct_word('Glvcerlne')[0], 'Glycerine')
+
+    def test_unmatched_noise_scores_zero(self):
+        self.assertEqual(checker.correct_word('x7qz9k'), ('x7qz9k', 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import io
+import random
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Common label ingredients; samples draw from this list so the corpus is reproducible
+INGREDIENTS = [
+    'water', 'sugar', 'salt', 'wheat flour', 'palm oil', 'sunflower oil', 'corn syrup',
+    'high fructose corn syrup', 'citric acid', 'ascorbic acid', 'natural flavors',
+    'artificial flavors', 'soy lecithin', 'milk powder', 'whey protein', 'cocoa butter',
+    'cocoa mass', 'vanilla extract', 'baking soda', 'yeast', 'maltodextrin', 'dextrose',
+    'modified corn starch', 'xanthan gum', 'guar gum', 'sodium benzoate', 'potassium sorbate',
+    'monosodium glutamate', 'caramel color', 'red 40', 'yellow 5', 'titanium dioxide',
+    'carrageenan', 'aspartame', 'sucralose', 'stevia leaf extract', 'rice flour', 'oat fiber',
+    'sea salt', 'garlic powder', 'onion powder', 'paprika extract', 'tomato paste',
+    'vinegar', 'egg yolk', 'butter', 'cream', 'honey', 'almonds', 'peanuts', 'hazelnuts',
+    'vitamin e', 'niacin', 'riboflavin', 'folic acid', 'iron', 'calcium carbonate'
+]
+
+DISTORTIONS = ['clean', 'blur', 'rotation', 'glare', 'low_contrast', 'curved']
+
+def _font(size):
+    for name in ('DejaVuSans.ttf', 'Arial.ttf', 'arial.ttf', 'LiberationSans-Regular.ttf'):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+def _wrap(draw, text, font, width):
+    lines, line = [], ''
+    for word in text.split(' '):
+        candidate = f'{line} {word}'.strip()
+        if line and draw.textlength(candidate, font=font) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+def render_label(text, rng, width=900, font_size=30, ink=20, paper=235):
+    """Render ``text`` as a label: dark text on light paper with a margin around it"""
+    font = _font(font_size)
+    scratch = ImageDraw.Draw(Image.new('L', (1, 1)))
+    lines = _wrap(scratch, text, font, width - 120)
+    line_height = int(font_size * 1.35)
+    image = Image.new('L', (width, line_height * len(lines) + 160), paper)
+    draw = ImageDraw.Draw(image)
+    top = 80 + rng.randint(-10, 10)
+    for i, line in enumerate(lines):
+        draw.text((60, top + i * line_height), line, fill=ink, font=font)
+    return image
+
+def distort(image, name, rng):
+    """Apply one named distortion to a grayscale label image"""
+    if name == 'blur':
+        return image.filter(ImageFilter.GaussianBlur(radius=rng.uniform(1.2, 2.0)))
+    if name == 'rotation':
+        angle = rng.choice([-1, 1]) * rng.uniform(3, 8)
+        return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=235)
+    if name == 'glare':
+        pixels = np.asarray(image, np.float32)
+        h, w = pixels.shape
+        cy, cx = rng.uniform(0.2, 0.8) * h, rng.uniform(0.2, 0.8) * w
+        yy, xx = np.mgrid[0:h, 0:w]
+        spot = np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * (0.25 * max(h, w)) ** 2))
+        return Image.fromarray(np.clip(pixels + spot * 170, 0, 255).astype(np.uint8))
+    if name == 'low_contrast':
+        pixels = np.asarray(image, np.float32)
+        return Image.fromarray((150 + (pixels - 20) * (45 / 215.0)).astype(np.uint8))
+    if name == 'curved':
+        # Text printed on a bottle: rows bend along a shallow arc
+        pixels = np.asarray(image)
+        h, w = pixels.shape
+        amplitude = rng.uniform(8, 16)
+        shifts = (amplitude * np.sin(np.linspace(0, np.pi, w))).astype(int)
+        out = np.full((h + int(amplitude) + 1, w), 235, np.uint8)
+        for x in range(w):
+            out[shifts[x]:shifts[x] + h, x] = pixels[:, x]
+        return Image.fromarray(out)
+    return image
+
+def generate_corpus(size=30, seed=1234):
+    """Reproducible list of {'id', 'distortion', 'text', 'image'} samples (image is PNG bytes)"""
+    rng = random.Random(seed)
+    samples = []
+    for index in range(size):
+        items = rng.sample(INGREDIENTS, rng.randint(5, 14))
+        text = 'INGREDIENTS: ' + ', '.join(items) + '.'
+        if rng.random() < 0.5:
+            text = text.upper()
+        distortion = DISTORTIONS[index % len(DISTORTIONS)]
+        image = distort(render_label(text, rng), distortion, rng)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        samples.append({'id': index, 'distortion': distortion, 'text': text, 'image': buffer.getvalue()})
+    return samples
+
+def edit_distance(reference, hypothesis):
+    """Levenshtein distance between two sequences (strings or token lists)"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_item in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_item in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_item != hyp_item)))
+        previous = current
+    return previous[-1]
+
+def _normalize(text):
+    return ' '.join((text or '').split())
+
+def character_error_rate(reference, hypothesis):
+    reference, hypothesis = _normalize(reference), _normalize(hypothesis)
+    return edit_distance(reference, hypothesis) / float(max(1, len(reference)))
+
+def word_error_rate(reference, hypothesis):
+    reference, hypothesis = _normalize(reference).split(), _normalize(hypothesis).split()
+    return edit_distance(reference, hypothesis) / float(max(1, len(reference)))